@@ -0,0 +1,181 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass, field
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional – ohne Paket gibt es nur gzip-Varianten
+    brotli = None
+
+# ----------------------------------------
+# Statische Dateien mit Fingerabdruck und vorkomprimierten Varianten
+# ----------------------------------------
+# Beim Start wird jede Datei unter `static/` einmal gehasht und komprimiert:
+#   style.css → /static/style.3f2a9c1b7d4e.css  (+ gzip, + brotli falls installiert)
+# Templates verlinken über `asset_url("style.css")` immer die gehashte Adresse.
+# Da sich deren Inhalt nie ändert, darf der Browser sie ein Jahr lang cachen.
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+HASH_LENGTH = 12
+
+# Inhalte, bei denen sich Kompression lohnt (Bilder/Fonts sind meist schon komprimiert)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "application/xml")
+
+
+@dataclass(frozen=True)
+class Asset:
+    """Eine statische Datei mit gehashtem Namen und ihren Kodierungsvarianten."""
+    path: str
+    hashed_path: str
+    content_type: str
+    digest: str
+    variants: dict = field(default_factory=dict)  # Kodierung ("br", "gzip", "identity") → Bytes
+
+    def etag(self, encoding="identity"):
+        """ETag je Kodierung – jede Variante ist eine eigene Repräsentation."""
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+def _compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def build_asset(path, data):
+    """
+    Erzeugt ein Asset: Inhaltshash im Dateinamen plus gzip-/brotli-Variante,
+    sofern sie kleiner ist als das Original.
+
+    :param path: Relativer Pfad mit "/" (z. B. "css/style.css")
+    :param data: Dateiinhalt
+    """
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(path)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    variants = {"identity": data}
+    if _compressible(content_type):
+        candidates = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(data, quality=11)
+        variants.update({enc: body for enc, body in candidates.items() if len(body) < len(data)})
+    return Asset(path=path, hashed_path=f"{stem}.{digest}{ext}", content_type=content_type,
+                 digest=digest, variants=variants)
+
+
+def accepted_encodings(header):
+    """
+    Kodierungen aus `Accept-Encoding` mit q > 0 (z. B. "gzip, br;q=0.8, deflate;q=0").
+    """
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+class AssetManifest:
+    """
+    Liste aller statischen Dateien eines Verzeichnisses mit gehashten Namen.
+    Wird beim ersten Zugriff (bzw. beim Aufwärmen des Workers) einmal gebaut.
+    """
+
+    def __init__(self, directory, prefix="/static"):
+        self.directory = directory
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._tables = None  # (Pfad → Asset, gehashter Pfad → Asset), wird atomar ersetzt
+
+    def build(self):
+        """Liest, hasht und komprimiert alle Dateien (versteckte Dateien ausgenommen)."""
+        by_path = {}
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for filename in sorted(files):
+                if filename.startswith("."):
+                    continue
+                full_path = os.path.join(root, filename)
+                path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    by_path[path] = build_asset(path, f.read())
+        self._tables = (by_path, {asset.hashed_path: asset for asset in by_path.values()})
+        return by_path
+
+    def _get_tables(self):
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    self.build()
+        return self._tables
+
+    @property
+    def assets(self):
+        """Relativer Pfad → Asset (baut das Manifest bei Bedarf)."""
+        return self._get_tables()[0]
+
+    def url(self, path):
+        """
+        URL mit Fingerabdruck; unbekannte Dateien bekommen die normale Adresse.
+        """
+        path = path.lstrip("/")
+        asset = self.assets.get(path)
+        return f"{self.prefix}/{asset.hashed_path if asset else path}"
+
+    def by_hashed_path(self, hashed_path):
+        """Asset zu einem gehashten Pfad oder None."""
+        return self._get_tables()[1].get(hashed_path)
+
+
+# Instanz für globale Nutzung im Projekt
+asset_manifest = AssetManifest(os.getenv("STATIC_DIR") or "static")
+
+
+def asset_url(path):
+    """Jinja-Helfer: `{{ asset_url('style.css') }}` → `/static/style.<hash>.css`."""
+    return asset_manifest.url(path)
+
+
+class AssetStaticFiles(StaticFiles):
+    """
+    `StaticFiles` mit Sonderbehandlung für gehashte Adressen:
+    ein Jahr cachebar (`immutable`), vorkomprimierte Variante passend zu
+    `Accept-Encoding`, 304 bei passendem `If-None-Match`. Alle anderen Pfade
+    liefert weiterhin `StaticFiles` aus.
+    """
+
+    def __init__(self, *, directory, manifest, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path, scope):
+        asset = self.manifest.by_hashed_path(path.replace(os.sep, "/"))
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding"))
+        encoding = next((enc for enc in ("br", "gzip") if enc in accepted and enc in asset.variants), "identity")
+
+        etag = asset.etag(encoding)
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag, "Vary": "Accept-Encoding"}
+        if_none_match = request_headers.get("if-none-match", "")
+        if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.variants[encoding], media_type=asset.content_type, headers=headers)
@@ -1,20 +1,47 @@
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 import time
 import os
+import hmac
+from dataclasses import dataclass, replace
+from typing import Optional
 from dotenv import load_dotenv
+from cache import LRUCache
 
 # Lade Umgebungsvariablen (z. B. SECRET_KEY)
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
-# Passwort-Kontext für sichere Hashing-Methoden (bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Passwort-Kontext für sichere Hashing-Methoden (bcrypt), gemeinsam mit models.py
+from password_hashing import pwd_context, password_hasher, hash_password_async, verify_password_async
 
 # Ablaufzeit des Tokens in Sekunden (24 Stunden)
 TOKEN_EXPIRE_SECONDS = 60 * 60 * 24
 
+# Cache für bereits verifizierte Tokens: Token → Claims + Benutzer-ID.
+# Einträge laufen spätestens mit `exp` des Tokens ab, zusätzlich nach TOKEN_CACHE_TTL Sekunden.
+# Logout und das Löschen eines Benutzers entfernen die Einträge nur im eigenen Worker-Prozess;
+# in den übrigen Workern bleibt ein Token bis zu TOKEN_CACHE_TTL Sekunden weiter gültig.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class VerifiedToken:
+    """Ergebnis einer erfolgreichen Token-Prüfung (wird im Token-Cache abgelegt)."""
+    claims: dict
+    username: str
+    expires_at: float
+    user_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Aufgelöster, eingeloggter Benutzer für die Dauer eines Requests."""
+    id: int
+    username: str
+
 def create_access_token(data: dict, expires_delta: int = TOKEN_EXPIRE_SECONDS):
     """
     Erzeuge ein JWT-Zugriffstoken mit Ablaufzeit.
@@ -26,30 +53,68 @@ def create_access_token(data: dict, expires_delta: int = TOKEN_EXPIRE_SECONDS):
     payload.update({"exp": time.time() + expires_delta})
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str):
+def decode_token(token: str):
     """
-    Verifiziere ein JWT-Token und extrahiere den Benutzername (sub).
+    Verifiziere ein JWT-Token (Signatur + Ablauf), bereits geprüfte Tokens aus dem Cache.
     :param token: Das übergebene JWT-Token
-    :return: Benutzername oder None, wenn ungültig
+    :return: VerifiedToken oder None, wenn ungültig
     """
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
+    username = payload.get("sub")
+    if not username:
+        return None
+    expires_at = float(payload.get("exp", time.time() + TOKEN_CACHE_TTL))
+    verified = VerifiedToken(claims=payload, username=username, expires_at=expires_at)
+    token_cache.set(token, verified, expires_at=expires_at)
+    return verified
+
+def invalidate_user_tokens(username: str):
+    """
+    Entferne alle gecachten Tokens eines Benutzers (z. B. nach dem Löschen des Kontos).
+    :param username: Benutzername (Claim `sub`)
+    :return: Anzahl entfernter Cache-Einträge
+    """
+    return token_cache.discard_where(lambda verified: verified.username == username)
+
+def verify_token(token: str):
+    """
+    Verifiziere ein JWT-Token und extrahiere den Benutzername (sub).
+    :param token: Das übergebene JWT-Token
+    :return: Benutzername oder None, wenn ungültig
+    """
+    verified = decode_token(token)
+    return verified.username if verified else None
 
 # ---------------------------------------
 # FastAPI-spezifische Login-/Logout-Logik
 # ---------------------------------------
 
 from fastapi import APIRouter, Form, Request, Depends, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User
-from db import get_db
+from db import get_async_db
+from cart_store import cart_store
+from assets import asset_url
+
+@event.listens_for(User, "after_delete")
+def _evict_deleted_user(mapper, connection, user):
+    """
+    Gelöschte Benutzer verlieren sofort ihre gecachten Tokens (gilt für `session.delete(user)`,
+    nicht für Bulk-`delete(User)`-Statements – dort greift nur TOKEN_CACHE_TTL).
+    """
+    invalidate_user_tokens(user.username)
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url  # gehashte URLs für statische Dateien
 router = APIRouter()
 
 def get_current_user_optional(request: Request):
@@ -64,8 +129,42 @@ def get_current_user_optional(request: Request):
         return username
     return None
 
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Dependency: Löst den eingeloggten Benutzer einmal pro Request auf.
+    Signaturprüfung und Benutzer-Lookup werden pro Token gecacht, sodass
+    authentifizierte Seitenaufrufe in der Regel ohne DB-Zugriff auskommen.
+    :return: AuthenticatedUser oder None
+    """
+    token = request.cookies.get("access_token")
+    if not token:
+        return None
+    verified = decode_token(token)
+    if verified is None:
+        return None
+
+    if verified.user_id is None:
+        user_id = (await db.execute(select(User.id).filter_by(username=verified.username))).scalar()
+        if user_id is None:
+            return None
+        verified = replace(verified, user_id=user_id)
+        token_cache.set(token, verified, expires_at=verified.expires_at)
+
+    return AuthenticatedUser(id=verified.user_id, username=verified.username)
+
+def require_api_key(request: Request):
+    """
+    Dependency für interne/administrative API-Endpunkte (z. B. Bestellimport).
+    Erwartet den Header `X-API-Key` mit dem Wert aus ADMIN_API_KEY.
+    Ist ADMIN_API_KEY nicht gesetzt, sind diese Endpunkte deaktiviert.
+    """
+    expected = os.getenv("ADMIN_API_KEY")
+    provided = request.headers.get("X-API-Key", "")
+    if not expected or not hmac.compare_digest(provided.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Ungültiger oder fehlender API-Schlüssel.")
+
 @router.get("/login")
-def login_page(request: Request):
+async def login_page(request: Request):
     """
     Zeige die Login-Seite.
     """
@@ -76,19 +175,20 @@ def login_page(request: Request):
     })
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Verarbeite Login-Formular, validiere Benutzer.
     Bei Erfolg: Setze JWT-Cookie und leite weiter.
     """
-    db_user = db.query(User).filter_by(username=username).first()
-    
-    if db_user and db_user.verify_password(password):
+    db_user = (await db.execute(select(User).filter_by(username=username))).scalars().first()
+
+    # bcrypt ist bewusst langsam – läuft im Prozesspool statt im Event-Loop
+    if db_user and await verify_password_async(password, db_user.password):
         token = create_access_token({"sub": username})
         response = RedirectResponse("/", status_code=303)
         response.set_cookie(key="access_token", value=token, httponly=True)
@@ -100,37 +200,51 @@ def login(
     })
 
 @router.get("/register")
-def register_page(request: Request):
+async def register_page(request: Request):
     """
     Zeige die Registrierungsseite.
     """
     return templates.TemplateResponse("register.html", {"request": request})
 
 @router.post("/register")
-def register(
+async def register(
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Verarbeite Registrierung:
     Erstelle neuen Benutzer mit sicherem Passwort-Hashing.
     """
-    if db.query(User).filter_by(username=username).first():
+    if (await db.execute(select(User).filter_by(username=username))).scalars().first():
         raise HTTPException(status_code=400, detail="Benutzer existiert bereits.")
 
-    user = User(username=username, password=password)  # Hashing erfolgt im Model
+    # bcrypt-Hashing im Prozesspool, das Model übernimmt den fertigen Hash
+    hashed = await hash_password_async(password)
+    user = User(username=username, password=hashed, already_hashed=True)
     db.add(user)
-    db.commit()
+    await db.commit()
 
     return RedirectResponse("/login", status_code=303)
 
 @router.get("/logout")
-def logout(request: Request):
+async def logout(request: Request):
     """
     Logge den Benutzer aus, lösche Session & Cookie.
     """
     response = RedirectResponse("/", status_code=303)
+    token = request.cookies.get("access_token")
+    if token:
+        token_cache.pop(token)
     response.delete_cookie(key="access_token")
-    request.session.pop("cart", None)
+    cart_id = request.session.pop("cart_id", None)
+    if cart_id:
+        await cart_store.clear_async(cart_id)
     return response
+
+@router.get("/health/password-hashing")
+async def password_hashing_stats():
+    """
+    Liefert Auslastung und Queue-Zeiten des bcrypt-Prozesspools (pro Worker-Prozess).
+    """
+    return JSONResponse(password_hasher.stats())
@@ -0,0 +1,77 @@
+# bench_compression.py: Eingesparte Bytes vs. zusätzliche CPU-Zeit für die Katalogseite
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    python benchmarks/bench_compression.py --products 24 100 1000 --levels 1 6 9
+'''
+
+import argparse
+import gzip
+import time
+from markupsafe import Markup
+from auth import templates
+from catalog import CatalogProduct
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def messen(func, *args, wiederholungen=20):
+    """Führt `func` mehrfach aus und liefert die mittlere Laufzeit in Sekunden."""
+    start = time.perf_counter()
+    for _ in range(wiederholungen):
+        func(*args)
+    return (time.perf_counter() - start) / wiederholungen
+
+
+def katalogseite(anzahl, rabatt=False):
+    """Rendert die echte Startseite (index.html + Produktliste) für `anzahl` Produkte."""
+    produkte = [
+        CatalogProduct(id=i, name=f"Produkt {i} – CRM-System", description="Kundenverwaltung für Unternehmen",
+                       price=9.99 + i % 90)
+        for i in range(1, anzahl + 1)
+    ]
+    liste = templates.get_template("_product_list.html").render(
+        products=produkte, rabatt=rabatt, next_url="/?cursor=x", prev_url=None,
+    )
+    return templates.get_template("index.html").render(
+        product_list=Markup(liste), cart=[], related=[], username=None, rabatt=rabatt,
+        search="", sort="id", success="", error="", gesamtpreis=0, product_count=0,
+    ).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für die Antwort-Komprimierung der Katalogseite")
+    parser.add_argument("--products", type=int, nargs="+", default=[24, 100, 1000], help="Produkte pro Seite")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9], help="gzip-Level")
+    parser.add_argument("--br-levels", type=int, nargs="+", default=[1, 5, 11], help="brotli-Qualitäten")
+    args = parser.parse_args()
+
+    print(f"{'Produkte':>9}{'Variante':>12}{'Bytes':>11}{'Anteil':>9}{'µs/Seite':>11}{'MB/s':>9}")
+    for anzahl in args.products:
+        seite = katalogseite(anzahl)
+        render = messen(katalogseite, anzahl)
+        print(f"{anzahl:>9}{'roh':>12}{len(seite):>11,}{'100%':>9}{render * 1e6:>11,.0f}  (Rendern)")
+
+        # 🗜️ gzip je Level (wie CompressionMiddleware, einteiliger Body)
+        for level in args.levels:
+            dauer = messen(gzip.compress, seite, level)
+            groesse = len(gzip.compress(seite, level))
+            print(f"{'':>9}{f'gzip {level}':>12}{groesse:>11,}{groesse / len(seite):>9.1%}"
+                  f"{dauer * 1e6:>11,.0f}{len(seite) / dauer / 1e6:>9,.0f}")
+
+        # 🗜️ brotli je Qualität (nur wenn das optionale Paket installiert ist)
+        if brotli is None:
+            print(f"{'':>9}{'br':>12}  (Paket `brotli` nicht installiert)")
+            continue
+        for quality in args.br_levels:
+            dauer = messen(lambda: brotli.compress(seite, quality=quality))
+            groesse = len(brotli.compress(seite, quality=quality))
+            print(f"{'':>9}{f'br {quality}':>12}{groesse:>11,}{groesse / len(seite):>9.1%}"
+                  f"{dauer * 1e6:>11,.0f}{len(seite) / dauer / 1e6:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
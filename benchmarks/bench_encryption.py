@@ -0,0 +1,46 @@
+# bench_encryption.py: Durchsatz von Einzel- vs. Massen-Verschlüsselung
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    python benchmarks/bench_encryption.py --count 50000 --workers 1 2 4 8
+'''
+
+import argparse
+import time
+from encryption import Encryption
+
+
+def messen(func, *args):
+    """Führt `func` einmal aus und liefert die Laufzeit in Sekunden."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für Encryption.encrypt_many/decrypt_many")
+    parser.add_argument("--count", type=int, default=50_000, help="Anzahl Werte")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Thread-Anzahlen")
+    args = parser.parse_args()
+
+    enc = Encryption()
+    werte = [f"Produkt {i} x 2, CRM-System x 1, Cloud Storage x 3" for i in range(args.count)]
+    tokens = enc.encrypt_many(werte)
+
+    # 🐢 Referenz: Schleife über einzelne Aufrufe (bisheriges Verhalten)
+    einzel_enc = messen(lambda: [enc.encrypt(w) for w in werte])
+    einzel_dec = messen(lambda: [enc.decrypt(t) for t in tokens])
+    print(f"{'Variante':<22}{'encrypt/s':>14}{'decrypt/s':>14}")
+    print(f"{'Einzelaufrufe':<22}{args.count / einzel_enc:>14,.0f}{args.count / einzel_dec:>14,.0f}")
+
+    # 🚀 Massen-API mit unterschiedlicher Thread-Anzahl
+    for workers in args.workers:
+        enc.workers = workers
+        enc._executor = None
+        dauer_enc = messen(enc.encrypt_many, werte)
+        dauer_dec = messen(enc.decrypt_many, tokens)
+        print(f"{f'*_many ({workers} Threads)':<22}{args.count / dauer_enc:>14,.0f}{args.count / dauer_dec:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-sicherer LRU-Cache mit optionaler Ablaufzeit pro Eintrag.
+
+    - `maxsize`: maximale Anzahl Einträge; bei Überschreitung fällt der am
+      längsten nicht genutzte Eintrag heraus.
+    - `ttl`: Standard-Lebensdauer in Sekunden (None = unbegrenzt).
+      `set(..., expires_at=...)` kann sie pro Eintrag weiter verkürzen.
+    """
+
+    def __init__(self, maxsize, ttl=None, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Liefert den Wert zu `key` oder `default`, wenn er fehlt oder abgelaufen ist."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, expires_at=None):
+        """Speichert `value`; läuft spätestens nach `ttl` bzw. zu `expires_at` ab."""
+        if self.ttl is not None:
+            default_expiry = self._clock() + self.ttl
+            expires_at = default_expiry if expires_at is None else min(expires_at, default_expiry)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Entfernt `key` und liefert den gespeicherten Wert (auch wenn abgelaufen)."""
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def discard_where(self, predicate):
+        """Entfernt alle Einträge, deren Wert `predicate` erfüllt, und liefert deren Anzahl."""
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        """Leert den Cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Größe sowie Treffer/Fehlzugriffe seit dem Start."""
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,246 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+from metrics import cart_size_items
+
+# Lade Umgebungsvariablen (CART_STORE, CART_STORE_PATH, WEB_CONCURRENCY)
+load_dotenv()
+
+# ----------------------------------------
+# Serverseitiger Warenkorb
+# ----------------------------------------
+# Im Session-Cookie steht nur noch eine zufällige Warenkorb-ID; die Positionen
+# (Produkt-ID → Menge) liegen im Store. Das Cookie bleibt dadurch konstant klein.
+
+class CartStore(ABC):
+    """
+    Schnittstelle für Warenkorb-Speicher. Alle Operationen sind O(1) pro Position.
+    Ein Warenkorb ist ein Dict {product_id: quantity} in Einfügereihenfolge.
+
+    Async-Routen nutzen die `*_async`-Varianten: Standardmäßig laufen die
+    (blockierenden) Operationen im Threadpool, damit der Event-Loop frei bleibt.
+    """
+
+    @abstractmethod
+    def get(self, cart_id):
+        """Liefert die Positionen des Warenkorbs (leeres Dict, wenn unbekannt)."""
+
+    @abstractmethod
+    def add(self, cart_id, product_id, quantity=1):
+        """Erhöht die Menge eines Produkts um `quantity`."""
+
+    @abstractmethod
+    def remove(self, cart_id, product_id):
+        """Entfernt ein Produkt vollständig aus dem Warenkorb."""
+
+    @abstractmethod
+    def clear(self, cart_id):
+        """Leert den Warenkorb und erfasst seine Größe in `shop_cart_size_items`."""
+
+    async def get_async(self, cart_id):
+        """Asynchrones Gegenstück zu `get`."""
+        return await run_in_threadpool(self.get, cart_id)
+
+    async def add_async(self, cart_id, product_id, quantity=1):
+        """Asynchrones Gegenstück zu `add`."""
+        await run_in_threadpool(self.add, cart_id, product_id, quantity)
+
+    async def remove_async(self, cart_id, product_id):
+        """Asynchrones Gegenstück zu `remove`."""
+        await run_in_threadpool(self.remove, cart_id, product_id)
+
+    async def clear_async(self, cart_id):
+        """Asynchrones Gegenstück zu `clear`."""
+        await run_in_threadpool(self.clear, cart_id)
+
+
+def _record_cart_size(quantities):
+    # Größe beim Leeren (Bestellung bzw. Logout) – leere/unbekannte Körbe zählen nicht
+    size = sum(quantities)
+    if size:
+        cart_size_items.observe(size)
+
+
+class InMemoryCartStore(CartStore):
+    """
+    Warenkorb-Speicher im Prozess. Schnell, aber nur für einen einzelnen
+    Worker-Prozess geeignet; bei mehr als `max_carts` Körben fällt der am
+    längsten unbenutzte heraus.
+    """
+
+    def __init__(self, max_carts=100_000):
+        self.max_carts = max_carts
+        self._lock = threading.Lock()
+        self._carts = OrderedDict()
+
+    def get(self, cart_id):
+        with self._lock:
+            items = self._carts.get(cart_id)
+            if items is None:
+                return {}
+            self._carts.move_to_end(cart_id)
+            return dict(items)
+
+    def add(self, cart_id, product_id, quantity=1):
+        with self._lock:
+            items = self._carts.setdefault(cart_id, {})
+            items[product_id] = items.get(product_id, 0) + quantity
+            self._carts.move_to_end(cart_id)
+            while len(self._carts) > self.max_carts:
+                self._carts.popitem(last=False)
+
+    def remove(self, cart_id, product_id):
+        with self._lock:
+            items = self._carts.get(cart_id)
+            if items is not None:
+                items.pop(product_id, None)
+                if not items:
+                    del self._carts[cart_id]
+
+    def clear(self, cart_id):
+        with self._lock:
+            items = self._carts.pop(cart_id, None)
+        _record_cart_size(items.values() if items else ())
+
+    # Reine Dict-Zugriffe unter einer kurzen Sperre – direkt im Event-Loop, ohne Thread-Wechsel
+    async def get_async(self, cart_id):
+        return self.get(cart_id)
+
+    async def add_async(self, cart_id, product_id, quantity=1):
+        self.add(cart_id, product_id, quantity)
+
+    async def remove_async(self, cart_id, product_id):
+        self.remove(cart_id, product_id)
+
+    async def clear_async(self, cart_id):
+        self.clear(cart_id)
+
+
+class SQLiteCartStore(CartStore):
+    """
+    Warenkorb-Speicher in einer eigenen SQLite-Datei (WAL-Modus).
+    Wird von allen Worker-Prozessen geteilt; jede Operation ist ein
+    Primärschlüssel-Zugriff. Eine Verbindung pro Thread; die `*_async`-Varianten
+    laufen im Threadpool (sqlite3 blockiert, z. B. beim Warten auf die Schreibsperre).
+    """
+
+    def __init__(self, path="carts.db"):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cart_items (
+                    cart_id TEXT NOT NULL,
+                    product_id INTEGER NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    added_at REAL NOT NULL,
+                    PRIMARY KEY (cart_id, product_id)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, cart_id):
+        rows = self._connect().execute(
+            "SELECT product_id, quantity FROM cart_items WHERE cart_id = ? ORDER BY added_at",
+            (cart_id,),
+        ).fetchall()
+        return {product_id: quantity for product_id, quantity in rows}
+
+    def add(self, cart_id, product_id, quantity=1):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO cart_items (cart_id, product_id, quantity, added_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = quantity + excluded.quantity
+                """,
+                (cart_id, product_id, quantity, time.time()),
+            )
+
+    def remove(self, cart_id, product_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cart_items WHERE cart_id = ? AND product_id = ?", (cart_id, product_id))
+
+    def clear(self, cart_id):
+        with self._connect() as conn:
+            rows = conn.execute("DELETE FROM cart_items WHERE cart_id = ? RETURNING quantity", (cart_id,)).fetchall()
+        _record_cart_size(quantity for quantity, in rows)
+
+
+def cart_items(store, cart_id, catalog):
+    """
+    Löst die Positionen eines Warenkorbs über den Katalog-Snapshot auf.
+    Produkte, die nicht mehr im Katalog sind, werden übersprungen.
+
+    :return: Liste von Dicts mit id, name, price und quantity
+    """
+    if not cart_id:
+        return []
+    return _resolve_items(store.get(cart_id), catalog)
+
+
+async def cart_items_async(store, cart_id, catalog):
+    """Asynchrones Gegenstück zu `cart_items` (Store-Zugriff blockiert den Event-Loop nicht)."""
+    if not cart_id:
+        return []
+    return _resolve_items(await store.get_async(cart_id), catalog)
+
+
+def _resolve_items(positions, catalog):
+    items = []
+    for product_id, quantity in positions.items():
+        product = catalog.get(product_id)
+        if product is not None:
+            items.append({"id": product.id, "name": product.name, "price": product.price, "quantity": quantity})
+    return items
+
+
+def cart_store_backend(workers=None):
+    """
+    Wählt das Backend passend zur Anzahl Worker-Prozesse (Standard: WEB_CONCURRENCY).
+
+    Ohne CART_STORE: ein Worker → memory, mehrere → sqlite (von allen geteilt).
+    Ein ausdrückliches CART_STORE=memory bei mehreren Workern ist ein Fehler,
+    weil jeder Prozess sein eigenes Dict hätte und Warenkörbe verloren gingen.
+    """
+    if workers is None:
+        workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+    configured = (os.getenv("CART_STORE") or "").strip().lower()
+    if not configured:
+        return "sqlite" if workers > 1 else "memory"
+    if configured not in ("memory", "sqlite"):
+        raise ValueError(f"Unbekannter CART_STORE: {configured}")
+    if configured == "memory" and workers > 1:
+        raise ValueError(
+            f"CART_STORE=memory ist nur mit einem Worker möglich ({workers} konfiguriert) – "
+            "CART_STORE=sqlite setzen oder CART_STORE weglassen."
+        )
+    return configured
+
+
+def create_cart_store(workers=None):
+    """
+    Erzeugt den Warenkorb-Speicher: CART_STORE=memory oder CART_STORE=sqlite mit
+    CART_STORE_PATH; ohne Angabe abhängig von der Worker-Anzahl (siehe `cart_store_backend`).
+    """
+    if cart_store_backend(workers) == "sqlite":
+        return SQLiteCartStore(os.getenv("CART_STORE_PATH") or "carts.db")
+    return InMemoryCartStore()
+
+
+# Instanz für globale Nutzung im Projekt
+cart_store = create_cart_store()
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import Product, CatalogState
+from pagination import SORT_KEYS, paginate_sorted
+
+# ----------------------------------------
+# Entschlüsselter Produktkatalog (In-Process-Cache)
+# ----------------------------------------
+
+@dataclass(frozen=True)
+class CatalogProduct:
+    """
+    Unveränderliche, bereits entschlüsselte Sicht auf ein Produkt.
+    Hat dieselben Attribute wie `Product`, damit Templates beide darstellen können.
+    """
+    id: int
+    name: str
+    description: str
+    price: float
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Versionierter, unveränderlicher Stand des gesamten Katalogs.
+    Wird zwischen Requests geteilt und nie verändert – nur ersetzt.
+    """
+    version: int
+    products: tuple
+    by_id: MappingProxyType
+    orderings: MappingProxyType  # Sortierung → (Produkte, Sortierschlüssel)
+    fingerprint: str  # SHA-256 über den Inhalt (für ETags)
+
+    def get(self, product_id):
+        """Liefert das Produkt zur ID oder None."""
+        return self.by_id.get(product_id)
+
+    def select(self, product_ids):
+        """Liefert die Produkte zu den IDs in Katalogreihenfolge (unbekannte IDs entfallen)."""
+        wanted = set(product_ids)
+        return [p for p in self.products if p.id in wanted]
+
+    def page(self, sort="id", cursor=None, limit=None):
+        """
+        Liefert eine Seite des Katalogs (Keyset-Paginierung per Binärsuche).
+
+        :raises ValueError: bei ungültigem Cursor
+        """
+        items, keys = self.orderings[sort]
+        return paginate_sorted(items, keys, sort, cursor, limit)
+
+
+def load_snapshot(db, version):
+    """
+    Lädt alle Produkte aus der Datenbank und entschlüsselt sie einmalig (gebündelt).
+    """
+    rows = db.query(Product).order_by(Product.id).all()
+    products = tuple(
+        CatalogProduct(id=p.id, name=name, description=description, price=p.price)
+        for p, (name, description) in zip(rows, Product.decrypt_many(rows))
+    )
+    orderings = {}
+    for sort, key in SORT_KEYS.items():
+        ordered = tuple(sorted(products, key=key))
+        orderings[sort] = (ordered, [key(p) for p in ordered])
+    digest = hashlib.sha256()
+    for p in products:
+        digest.update(f"{p.id}\x1f{p.name}\x1f{p.description}\x1f{p.price!r}\x1e".encode())
+    return CatalogSnapshot(
+        version=version,
+        products=products,
+        by_id=MappingProxyType({p.id: p for p in products}),
+        orderings=MappingProxyType(orderings),
+        fingerprint=digest.hexdigest(),
+    )
+
+
+# Wie oft (Sekunden) ein Worker den gemeinsamen Versionszähler in der Datenbank prüft
+CATALOG_VERSION_CHECK_SECONDS = float(os.getenv("CATALOG_VERSION_CHECK_SECONDS", 1.0))
+
+
+def read_shared_version(db):
+    """Gemeinsame Katalogversion aus `catalog_state` (None, solange nie geändert)."""
+    return db.execute(select(CatalogState.version).where(CatalogState.id == 1)).scalar()
+
+
+def bump_shared_version(connection):
+    """Erhöht die gemeinsame Katalogversion in der laufenden Transaktion."""
+    table = CatalogState.__table__
+    result = connection.execute(
+        table.update().where(table.c.id == 1).values(version=table.c.version + 1, updated_at=datetime.now())
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(id=1, version=1, updated_at=datetime.now()))
+
+
+class CatalogCache:
+    """
+    Hält den entschlüsselten Katalog im Speicher.
+    Schreibzugriffe auf `Product` erhöhen die Version und verwerfen den Snapshot;
+    der nächste Lesezugriff lädt ihn neu.
+
+    Bei mehreren Worker-Prozessen sieht jeder nur seine eigenen Commits direkt.
+    Änderungen anderer Prozesse erkennt der Cache am gemeinsamen Zähler in
+    `catalog_state`, den er höchstens alle `check_interval` Sekunden liest.
+    """
+
+    def __init__(self, check_interval=CATALOG_VERSION_CHECK_SECONDS, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+        self.check_interval = check_interval
+        self._clock = clock
+        self._shared_version = None  # Stand von `catalog_state` beim Laden des Snapshots
+        self._checked_at = 0.0
+
+    @property
+    def version(self):
+        """Aktuelle Katalogversion (steigt bei jeder Änderung)."""
+        return self._version
+
+    @property
+    def snapshot(self):
+        """Geladener Snapshot ohne Datenbankzugriff (None, wenn keiner geladen ist)."""
+        return self._snapshot
+
+    def invalidate(self):
+        """Verwirft den aktuellen Snapshot und erhöht die Version."""
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def get(self, db):
+        """
+        Liefert den aktuellen Snapshot; lädt ihn bei Bedarf über die Session `db`.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if self._is_fresh():
+                return snapshot
+            shared = read_shared_version(db)
+            with self._lock:
+                self._checked_at = self._clock()
+                if self._snapshot is snapshot:
+                    if shared == self._shared_version:
+                        return snapshot
+                    # Ein anderer Prozess hat den Katalog geändert
+                    self._version += 1
+                    self._snapshot = None
+
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            version = self._version
+
+        # Laden außerhalb des Locks, damit parallele Leser nicht blockieren
+        shared = read_shared_version(db)
+        snapshot = load_snapshot(db, version)
+
+        with self._lock:
+            # Nur übernehmen, wenn während des Ladens keine Änderung committet wurde
+            if self._version == version:
+                self._snapshot = snapshot
+                self._shared_version = shared
+                self._checked_at = self._clock()
+        return snapshot
+
+    def _is_fresh(self):
+        return self._clock() - self._checked_at < self.check_interval
+
+    async def get_async(self, db):
+        """
+        Wie `get()`, aber für eine AsyncSession. Solange der Snapshot gültig und
+        der Versionszähler frisch geprüft ist, findet kein Datenbankzugriff statt.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self._is_fresh():
+            return snapshot
+        return await db.run_sync(self.get)
+
+
+# Instanz für globale Nutzung im Projekt
+catalog_cache = CatalogCache()
+
+# ----------------------------------------
+# Invalidierung über SQLAlchemy-Events
+# ----------------------------------------
+# Die Mapper-Events markieren nur die Session; verworfen wird erst nach dem
+# Commit, damit kein Leser zwischen Flush und Commit einen alten Stand cacht.
+# Der gemeinsame Zähler für andere Prozesse steigt einmal pro Transaktion –
+# in derselben Transaktion wie die Produktänderung.
+
+def _mark_catalog_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None and not session.info.get("catalog_changed"):
+        session.info["catalog_changed"] = True
+        bump_shared_version(connection)
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Product, _event_name, _mark_catalog_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("catalog_changed", False):
+        catalog_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,175 @@
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from assets import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # optional – ohne Paket wird nur gzip angeboten
+    brotli = None
+
+# ----------------------------------------
+# Komprimierung dynamischer Antworten (HTML, JSON, CSV, …)
+# ----------------------------------------
+# Reine ASGI-Middleware: Sie komprimiert Block für Block, während die Antwort
+# gesendet wird. Streaming-Antworten (z. B. der Bestellexport) werden dabei nie
+# komplett gepuffert; nach jedem Block wird der Kompressor geleert, damit der
+# Client die Daten sofort bekommt.
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    return tuple(v.strip() for v in value.split(",") if v.strip()) if value else default
+
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", 6))
+COMPRESSION_TYPES = _env_list("COMPRESSION_TYPES", (
+    "text/html", "text/plain", "text/css", "text/csv",
+    "application/json", "application/x-ndjson", "application/javascript",
+))
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip-Container
+
+    def compress(self, data, flush):
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self, data=b""):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self, level):
+        # Brotli-Qualität 0..11; der gzip-Level 1..9 wird grob darauf abgebildet
+        self._compressor = brotli.Compressor(quality=min(11, max(0, level - 1)))
+
+    def compress(self, data, flush):
+        out = self._compressor.process(data)
+        return out + self._compressor.flush() if flush else out
+
+    def finish(self, data=b""):
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Komprimiert Antworten mit gzip (bzw. brotli, falls installiert und vom Client bevorzugt).
+
+    Nicht komprimiert werden:
+    - Antworten unter `minimum_size` Bytes (bei bekannter Länge bzw. einteiligem Body)
+    - Inhaltstypen außerhalb von `content_types`
+    - bereits kodierte Antworten (z. B. vorkomprimierte statische Dateien)
+    - 204/304, HEAD-Requests und `Cache-Control: no-transform`
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE, level=COMPRESSION_LEVEL,
+                 content_types=COMPRESSION_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.content_types = tuple(content_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding"))
+        if brotli is not None and "br" in accepted:
+            encoder_class = _BrotliEncoder
+        elif "gzip" in accepted:
+            encoder_class = _GzipEncoder
+        else:
+            encoder_class = None  # nichts komprimieren, aber `Vary` trotzdem setzen
+
+        responder = _CompressingResponder(send, encoder_class, self)
+        await self.app(scope, receive, responder)
+
+    def compressible_type(self, headers):
+        """True, wenn der Inhaltstyp auf der Allowlist steht und noch nicht kodiert ist."""
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.content_types and "content-encoding" not in headers
+
+    def should_compress(self, status, headers):
+        """Entscheidet anhand von Status und Antwort-Headern (ohne den Body)."""
+        if status < 200 or status in (204, 304) or not self.compressible_type(headers):
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        length = headers.get("content-length")
+        return length is None or int(length) >= self.minimum_size
+
+
+class _CompressingResponder:
+    """Send-Wrapper für genau eine Antwort."""
+
+    def __init__(self, send, encoder_class, middleware):
+        self.send = send
+        self.encoder_class = encoder_class
+        self.middleware = middleware
+        self.start_message = None
+        self.encoder = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", []))
+            headers = MutableHeaders(raw=message["headers"])
+            if self.middleware.compressible_type(headers):
+                # Auch unkomprimierte Antworten variieren mit Accept-Encoding (geteilte Caches/CDN)
+                headers.add_vary_header("Accept-Encoding")
+            self.passthrough = (
+                self.encoder_class is None or not self.middleware.should_compress(message["status"], headers)
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start_message = message  # erst mit dem ersten Body-Block senden
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            start, self.start_message = self.start_message, None
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Kleiner, einteiliger Body: unverändert senden
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.encoder = self.encoder_class(self.middleware.level)
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoder.name
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"  # komprimierte Bytes ≠ Original → schwacher ETag
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.encoder.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start)
+
+        if more_body:
+            chunk = self.encoder.compress(body, flush=True)
+            if chunk:
+                await self.send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.encoder.finish(body)})
@@ -1,16 +1,439 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import Depends
+from sqlalchemy import create_engine, exc, event, Insert, Update, Delete
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.util import await_only
 from models import Base, User, Product, BenutzerBestellung, GastBestellung, BestellungBase
+from metrics import instrument_engine, orders_total
 
-# 🔌 SQLite-Datenbank-Engine initialisieren
-# Hinweis: "check_same_thread=False" erlaubt Nutzung in mehreren Threads (z. B. mit FastAPI)
-engine = create_engine("sqlite:///saas_shop.db", connect_args={"check_same_thread": False})
+# 🔐 .env-Variablen laden (DATABASE_URL, Pool-Einstellungen)
+load_dotenv()
+
+# ----------------------------------------
+# ⚙️ Datenbank-Konfiguration
+# ----------------------------------------
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """
+    Verbindungs- und Pool-Einstellungen der Datenbank.
+
+    Umgebungsvariablen (alle optional):
+        DATABASE_URL             z. B. sqlite:///saas_shop.db oder postgresql://user:pw@host/db
+        ASYNC_DATABASE_URL       Überschreibt die automatisch abgeleitete async-URL
+        DB_POOL_SIZE             Dauerhaft offene Verbindungen pro Prozess
+        DB_MAX_OVERFLOW          Zusätzliche Verbindungen bei Lastspitzen
+        DB_POOL_TIMEOUT          Max. Wartezeit (s) auf eine freie Verbindung
+        DB_POOL_RECYCLE          Verbindungen nach n Sekunden erneuern
+        DB_POOL_PRE_PING         Verbindung vor Nutzung prüfen (true/false)
+        DB_STATEMENT_TIMEOUT_MS  Serverseitiges Statement-Timeout (PostgreSQL)
+        SQLITE_PROFILE           "production" aktiviert WAL, Pragmas und einen seriellen Writer
+                                 (einer pro Prozess – mehrere Worker-Prozesse schreiben weiterhin
+                                 parallel und warten per busy_timeout auf die SQLite-Dateisperre)
+        SQLITE_BUSY_TIMEOUT_MS   Wartezeit bei gesperrter Datenbank
+        SQLITE_MMAP_SIZE         Bytes, die per mmap gelesen werden
+        SQLITE_CACHE_SIZE_KIB    Page-Cache pro Verbindung in KiB
+    """
+    url: str = "sqlite:///saas_shop.db"
+    async_url: Optional[str] = None
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_timeout_ms: int = 0
+    sqlite_profile: str = "default"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+
+    @classmethod
+    def from_env(cls):
+        """Liest die Einstellungen aus den Umgebungsvariablen."""
+        defaults = cls()
+        return cls(
+            url=os.getenv("DATABASE_URL") or defaults.url,
+            async_url=os.getenv("ASYNC_DATABASE_URL") or None,
+            pool_size=int(os.getenv("DB_POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", defaults.pool_timeout)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", defaults.pool_recycle)),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", defaults.pool_pre_ping),
+            statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", defaults.statement_timeout_ms)),
+            sqlite_profile=os.getenv("SQLITE_PROFILE") or defaults.sqlite_profile,
+            sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", defaults.sqlite_busy_timeout_ms)),
+            sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", defaults.sqlite_mmap_size)),
+            sqlite_cache_size_kib=int(os.getenv("SQLITE_CACHE_SIZE_KIB", defaults.sqlite_cache_size_kib)),
+        )
+
+    @property
+    def sqlite_production(self):
+        """True, wenn das SQLite-Produktionsprofil (WAL + serieller Writer) aktiv ist."""
+        return (
+            self.sqlite_profile.strip().lower() == "production"
+            and self.sync_url.get_backend_name() == "sqlite"
+            and self.sync_url.database not in (None, "", ":memory:")
+        )
+
+    @property
+    def sync_url(self):
+        """Normalisierte URL für die synchrone Engine (postgres:// → postgresql://)."""
+        url = make_url(self.url.replace("postgres://", "postgresql://", 1))
+        return url.set(drivername="postgresql") if url.drivername == "postgresql+asyncpg" else url
+
+    @property
+    def resolved_async_url(self):
+        """URL für die async-Engine: aiosqlite für SQLite, asyncpg für PostgreSQL."""
+        if self.async_url:
+            return make_url(self.async_url)
+        url = self.sync_url
+        if url.get_backend_name() == "sqlite":
+            return url.set(drivername="sqlite+aiosqlite")
+        if url.get_backend_name() == "postgresql":
+            return url.set(drivername="postgresql+asyncpg")
+        return url
+
+# ----------------------------------------
+# 📊 Pool-Metriken (Wartezeit & Auslastung)
+# ----------------------------------------
+
+class PoolMetrics:
+    """
+    Sammelt Wartezeiten beim Auschecken von Verbindungen aus dem Pool.
+    Grundlage, um Pool-Größe und Worker-Anzahl aufeinander abzustimmen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+
+class _TimedPoolMixin:
+    """Misst, wie lange das Holen einer Verbindung aus dem Pool dauert."""
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=timed_out)
+
+
+class WriterGate:
+    """
+    Prozessweite Sperre für Schreibverbindungen. Die synchrone und die
+    asynchrone Writer-Engine teilen sie: pro Prozess ist immer höchstens eine
+    Writer-Verbindung ausgecheckt, egal über welche Engine geschrieben wird.
+
+    Synchrone Aufrufer (Threads) warten blockierend; asynchrone warten im
+    Event-Loop per kurzem `asyncio.sleep`, ohne ihn zu blockieren.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        if not self._lock.acquire(timeout=timeout if timeout and timeout > 0 else -1):
+            raise exc.TimeoutError(f"Writer-Verbindung nach {timeout:.2f}s nicht frei", code="3o7r")
+
+    async def acquire_async(self, timeout):
+        deadline = time.monotonic() + timeout if timeout and timeout > 0 else None
+        delay = 0.0005
+        while not self._lock.acquire(blocking=False):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise exc.TimeoutError(f"Writer-Verbindung nach {timeout:.2f}s nicht frei", code="3o7r")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.005)
+
+    def release(self):
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+
+class _GatedPoolMixin:
+    """Hält die `WriterGate` vom Auschecken bis zur Rückgabe der Verbindung."""
+    gate = None
+
+    def _do_get(self):
+        if self._is_asyncio:
+            await_only(self.gate.acquire_async(self._timeout))  # läuft im Greenlet der AsyncSession
+        else:
+            self.gate.acquire(self._timeout)
+        try:
+            return super()._do_get()
+        except BaseException:
+            self.gate.release()
+            raise
+
+    def _do_return_conn(self, record):
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self.gate.release()
+
+
+def _timed_pool_class(base, gate=None):
+    # Eigene Klasse je Engine: die Metriken überleben so auch `pool.recreate()`
+    if gate is None:
+        return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"metrics": PoolMetrics()})
+    # Wartezeit auf die Sperre zählt mit zur Checkout-Wartezeit
+    return type(f"TimedGated{base.__name__}", (_TimedPoolMixin, _GatedPoolMixin, base),
+                {"metrics": PoolMetrics(), "gate": gate})
+
+
+# Instanz für globale Nutzung im Projekt (ein Writer je Prozess)
+writer_gate = WriterGate()
+
+
+def _engine_kwargs(url, settings, pool_base, writer=False, gate=None):
+    """
+    Gemeinsame Engine-Parameter für die synchrone und die asynchrone Engine.
+    `writer=True` erzeugt einen Pool mit genau einer Verbindung (serieller Writer),
+    der zusätzlich `gate` (Standard: `writer_gate`) hält.
+    """
+    kwargs = {"connect_args": {}}
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        # "check_same_thread=False" erlaubt Nutzung in mehreren Threads (z. B. mit FastAPI)
+        kwargs["connect_args"]["check_same_thread"] = False
+        if url.database in (None, "", ":memory:"):
+            return kwargs  # In-Memory-DB: SQLAlchemy-Standardpool (eine Verbindung pro Thread)
+
+    kwargs.update(
+        poolclass=_timed_pool_class(pool_base, (gate or writer_gate) if writer else None),
+        pool_size=1 if writer else settings.pool_size,
+        max_overflow=0 if writer else settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+    )
+
+    if backend == "postgresql" and settings.statement_timeout_ms:
+        if url.get_driver_name() == "asyncpg":
+            kwargs["connect_args"]["server_settings"] = {"statement_timeout": str(settings.statement_timeout_ms)}
+        else:
+            kwargs["connect_args"]["options"] = f"-c statement_timeout={settings.statement_timeout_ms}"
+    return kwargs
+
+
+def create_configured_engine(settings, writer=False, gate=None):
+    """Erzeugt die synchrone Engine aus den Einstellungen."""
+    url = settings.sync_url
+    new_engine = create_engine(url, **_engine_kwargs(url, settings, QueuePool, writer, gate))
+    if settings.sqlite_production:
+        apply_sqlite_pragmas(new_engine, settings)
+    return new_engine
+
+
+def create_configured_async_engine(settings, writer=False, gate=None):
+    """Erzeugt die asynchrone Engine aus den Einstellungen."""
+    url = settings.resolved_async_url
+    new_engine = create_async_engine(url, **_engine_kwargs(url, settings, AsyncAdaptedQueuePool, writer, gate))
+    if settings.sqlite_production:
+        apply_sqlite_pragmas(new_engine.sync_engine, settings)
+    return new_engine
+
+# ----------------------------------------
+# 🪶 SQLite-Produktionsprofil (WAL, Pragmas, serieller Writer)
+# ----------------------------------------
+
+def apply_sqlite_pragmas(sync_engine, settings):
+    """
+    Setzt bei jeder neuen SQLite-Verbindung die Pragmas des Produktionsprofils:
+    WAL-Journal (Leser blockieren Schreiber nicht), synchronous=NORMAL,
+    busy_timeout, mmap- und Cache-Größe.
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+        finally:
+            cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Session, die Schreibzugriffe über eine eigene Writer-Engine (eine Verbindung)
+    ausführt und Lesezugriffe über den Reader-Pool.
+
+    Die Writer-Engine steht in `session.info["writer_bind"]`. Nach dem ersten
+    Schreibzugriff laufen bis zum Ende der Transaktion auch Lesezugriffe über den
+    Writer, damit eigene, noch nicht committete Änderungen sichtbar sind.
+    Transaktionen, die erst lesen und dann abhängig davon schreiben, rufen vorab
+    `use_writer(session)` auf und laufen dann vollständig über den Writer.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        writer = self.info.get("writer_bind")
+        if writer is not None and (
+            self._flushing
+            or isinstance(clause, (Insert, Update, Delete))
+            or getattr(clause, "_for_update_arg", None) is not None  # SELECT … FOR UPDATE
+            or self.info.get("writer_in_use")
+        ):
+            self.info["writer_in_use"] = True
+            return writer
+        self.info["reader_in_use"] = True
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writer_in_use", None)
+        session.info.pop("reader_in_use", None)
+
+
+def use_writer(session):
+    """
+    Leitet die gesamte laufende bzw. nächste Transaktion über den Writer – auch
+    die Lesezugriffe vor dem ersten Schreiben (Read-then-Write, z. B. Checkout,
+    Registrierung). Ohne getrennten Writer ohne Wirkung.
+
+    :param session: Session oder AsyncSession
+    :raises RuntimeError: wenn die Transaktion bereits über den Reader gelesen hat
+    """
+    sync_session = getattr(session, "sync_session", session)
+    if sync_session.info.get("writer_bind") is None:
+        return session
+    if sync_session.info.get("reader_in_use") and not sync_session.info.get("writer_in_use"):
+        raise RuntimeError("use_writer() muss vor der ersten Abfrage der Transaktion aufgerufen werden.")
+    sync_session.info["writer_in_use"] = True
+    return session
+
+
+def make_sessionmaker(reader, writer=None):
+    """
+    Session-Fabrik für synchrone Sessions; mit `writer` als RoutingSession.
+    """
+    if writer is None or writer is reader:
+        return sessionmaker(bind=reader, autocommit=False, autoflush=False)
+    return sessionmaker(
+        bind=reader, class_=RoutingSession, autocommit=False, autoflush=False,
+        info={"writer_bind": writer},
+    )
+
+
+def make_async_sessionmaker(reader, writer=None):
+    """
+    Session-Fabrik für AsyncSessions; mit `writer` als RoutingSession.
+    """
+    if writer is None or writer is reader:
+        return async_sessionmaker(bind=reader, autoflush=False, expire_on_commit=False)
+    return async_sessionmaker(
+        bind=reader, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False,
+        info={"writer_bind": writer.sync_engine},
+    )
+
+
+def pool_stats(engine):
+    """
+    Momentaufnahme des Verbindungspools einer (synchronen) Engine.
+    Für eine AsyncEngine `async_engine.sync_engine` übergeben.
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            utilisation=round(pool.checkedout() / capacity, 4) if capacity > 0 else None,
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            wait_count=metrics.wait_count,
+            wait_seconds_total=round(metrics.wait_seconds_total, 6),
+            wait_seconds_max=round(metrics.wait_seconds_max, 6),
+            wait_seconds_avg=round(metrics.wait_seconds_total / metrics.wait_count, 6) if metrics.wait_count else 0.0,
+            timeouts=metrics.timeouts,
+        )
+    return stats
+
+# ----------------------------------------
+# 🔌 Engines & Session-Fabriken
+# ----------------------------------------
+
+settings = DatabaseSettings.from_env()
+
+# Synchrone Engine (Skripte, Seed, Bibliotheksfunktionen)
+engine = create_configured_engine(settings)
+
+# ⚡ Asynchrone Engine (aiosqlite bzw. asyncpg) für async-Routen
+# Requests warten auf die Datenbank im Event-Loop statt einen Threadpool-Slot zu belegen.
+async_engine = create_configured_async_engine(settings)
+
+# ✍️ Writer-Engines: im SQLite-Produktionsprofil eine einzige, serialisierte
+# Schreibverbindung je Prozess – sync- und async-Writer teilen sich `writer_gate`,
+# es schreibt also immer nur eine der beiden. Sonst identisch mit den normalen Engines.
+if settings.sqlite_production:
+    writer_engine = create_configured_engine(settings, writer=True)
+    async_writer_engine = create_configured_async_engine(settings, writer=True)
+else:
+    writer_engine = engine
+    async_writer_engine = async_engine
+
+# 📊 Anzahl und Dauer aller SQL-Abfragen je Engine (unter /metrics)
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+if writer_engine is not engine:
+    instrument_engine(writer_engine, "sync_writer")
+    instrument_engine(async_writer_engine.sync_engine, "async_writer")
 
 # 🔄 SessionLocal: Instanz zur Erzeugung von DB-Sessions
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+SessionLocal = make_sessionmaker(engine, writer_engine)
+
+# 🔄 AsyncSessionLocal: Instanz zur Erzeugung von AsyncSessions
+# expire_on_commit=False, damit Objekte nach dem Commit ohne weiteres (implizites) I/O lesbar bleiben
+AsyncSessionLocal = make_async_sessionmaker(async_engine, async_writer_engine)
 
-# 🏗️ Alle Tabellen aus den Modellen erstellen (falls noch nicht vorhanden)
-Base.metadata.create_all(engine)
+# 🏗️ Tabellen werden nicht mehr beim Import angelegt, sondern beim Start
+# (Lifespan in main.py bzw. `python manage.py init-db`, siehe startup.py)
 
 # 📦 Dependency-Funktion zur Übergabe einer DB-Session
 def get_db():
@@ -27,6 +450,25 @@ def get_db():
     finally:
         db.close()
 
+# 📦 Dependency-Funktion zur Übergabe einer asynchronen DB-Session
+async def get_async_db():
+    """
+    Erzeugt und liefert eine neue AsyncSession für async-Routen.
+
+    Gegenstück zu `get_db()` für `async def`-Endpunkte, z. B. `Depends(get_async_db)`.
+    Die Session wird nach Benutzung automatisch geschlossen.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# 📦 Dependency für Endpunkte, die lesen und abhängig davon schreiben (z. B. Checkout)
+async def get_async_write_db(db=Depends(get_async_db, use_cache=False)):
+    """
+    Eigene AsyncSession (nicht die des Requests, auf der z. B. `get_current_user`
+    schon gelesen hat), deren Transaktion vollständig über den Writer läuft.
+    """
+    yield use_writer(db)
+
 # 📥 Bestellung speichern (für eingeloggte Benutzer oder Gäste)
 def create_bestellung(benutzer_id=None, produkte=None, gast_id=None):
     """
@@ -54,9 +496,19 @@ def create_bestellung(benutzer_id=None, produkte=None, gast_id=None):
         
         db.add(bestellung)
         db.commit()
-        print("✅ Bestellung erfolgreich gespeichert.")
-    except Exception as e:
+        orders_total.inc("committed", "user" if benutzer_id else "guest")
+    except Exception:
         db.rollback()
-        print("❌ Fehler beim Speichern der Bestellung:", e)
+        orders_total.inc("failed", "user" if benutzer_id else "guest")
     finally:
         db.close()
+
+# 📦 Dependency für Endpunkte, die ihre Session selbst verwalten (z. B. Streaming-Exporte)
+def get_session_factory():
+    """
+    Liefert die Session-Fabrik statt einer fertigen Session.
+
+    Für Streaming-Antworten, die erst nach dem Ende des Endpunkts gelesen werden:
+    der Generator öffnet und schließt seine Session selbst.
+    """
+    return SessionLocal
@@ -1,34 +1,145 @@
 import os
+import hmac
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from metrics import encryption_seconds, encryption_values
 
 # Lade Umgebungsvariablen aus .env
 load_dotenv()
 
+def _keys_from_env():
+    # ENCRYPTION_KEYS (Rotation, neuester zuerst) hat Vorrang vor ENCRYPTION_KEY
+    keys = [k.strip() for k in (os.getenv("ENCRYPTION_KEYS") or "").split(",") if k.strip()]
+    if not keys and os.getenv("ENCRYPTION_KEY"):
+        keys = [os.getenv("ENCRYPTION_KEY")]
+    return keys
+
+
+# Ab dieser Anzahl Werte verteilen encrypt_many/decrypt_many die Arbeit auf Threads
+PARALLEL_THRESHOLD = 256
+
 class Encryption:
     """
     Diese Klasse kapselt die Verschlüsselungs- und Entschlüsselungslogik
     basierend auf einem geheimen Schlüssel aus der .env-Datei.
+
+    Für die Schlüsselrotation kann `ENCRYPTION_KEYS` mehrere Schlüssel enthalten
+    (kommagetrennt, neuester zuerst): verschlüsselt wird immer mit dem ersten,
+    entschlüsselt mit jedem der Liste (MultiFernet). Dann muss auch
+    `BLIND_INDEX_KEY` gesetzt sein (siehe unten).
     """
 
-    def __init__(self):
+    def __init__(self, keys=None, blind_index_key=None):
         # Verschlüsselungsschlüssel aus der Umgebungsvariable lesen
-        key = os.getenv("ENCRYPTION_KEY")
-        if not key:
+        if keys is None:
+            keys = _keys_from_env()
+        if not keys:
             raise ValueError("ENCRYPTION_KEY not set in .env file.")
-        self.cipher_suite = Fernet(key.encode())
+        self.keys = list(keys)
+        self.cipher_suite = MultiFernet([Fernet(k.encode()) for k in self.keys])
+        # Kurzer, nicht geheimer Fingerabdruck des aktuellen Schlüssels (für Rotations-Checkpoints)
+        self.key_id = hashlib.sha256(self.keys[0].encode()).hexdigest()[:16]
+
+        # Eigener Schlüssel für den Blind Index (Suche über verschlüsselte Felder).
+        # Ohne BLIND_INDEX_KEY wird er aus dem (einzigen) Fernet-Schlüssel abgeleitet.
+        # Bei mehreren Schlüsseln ist das nicht erlaubt: sobald der alte Schlüssel
+        # entfernt wird, änderte sich sonst unbemerkt jeder Such-Token.
+        blind_key = blind_index_key or os.getenv("BLIND_INDEX_KEY")
+        if blind_key:
+            self.blind_index_key = blind_key.encode()
+        elif len(self.keys) > 1:
+            raise ValueError(
+                "BLIND_INDEX_KEY must be set when ENCRYPTION_KEYS contains more than one key "
+                "(run `manage.py rotate-keys` afterwards to rebuild the search tokens)."
+            )
+        else:
+            self.blind_index_key = hmac.new(self.keys[0].encode(), b"saas-shop/blind-index", hashlib.sha256).digest()
+        # Fingerabdruck des Blind-Index-Schlüssels (erkennt, wann Such-Tokens neu zu bauen sind)
+        self.blind_index_key_id = hashlib.sha256(self.blind_index_key).hexdigest()[:16]
+
+        # Threads für Massenoperationen (AES/HMAC in OpenSSL geben den GIL frei)
+        self.workers = max(1, int(os.getenv("ENCRYPTION_WORKERS", min(4, os.cpu_count() or 1))))
+        self._executor = None
+        self._executor_lock = threading.Lock()
 
     def encrypt(self, data):
         """
         Verschlüsselt einen String.
         """
-        return self.cipher_suite.encrypt(data.encode())
+        with encryption_seconds.time("encrypt"):
+            token = self.cipher_suite.encrypt(data.encode())
+        encryption_values.inc("encrypt")
+        return token
 
     def decrypt(self, data):
         """
         Entschlüsselt verschlüsselte Daten zurück in einen lesbaren String.
         """
-        return self.cipher_suite.decrypt(data).decode()
+        with encryption_seconds.time("decrypt"):
+            value = self.cipher_suite.decrypt(data).decode()
+        encryption_values.inc("decrypt")
+        return value
+
+    def encrypt_many(self, values):
+        """
+        Verschlüsselt viele Strings auf einmal; Ergebnis in Eingabereihenfolge.
+        Große Mengen werden blockweise auf einen Threadpool verteilt.
+        """
+        encrypt = self.cipher_suite.encrypt
+        return self._map("encrypt_many", lambda chunk: [encrypt(value.encode()) for value in chunk], values)
+
+    def decrypt_many(self, values):
+        """
+        Entschlüsselt viele Werte auf einmal; Ergebnis in Eingabereihenfolge.
+        Große Mengen werden blockweise auf einen Threadpool verteilt.
+        """
+        decrypt = self.cipher_suite.decrypt
+        return self._map("decrypt_many", lambda chunk: [decrypt(value).decode() for value in chunk], values)
+
+    def rotate_many(self, values):
+        """
+        Verschlüsselt vorhandene Tokens mit dem aktuellen (ersten) Schlüssel neu.
+        Der Klartext verlässt dabei nicht den Aufruf; Reihenfolge bleibt erhalten.
+        """
+        rotate = self.cipher_suite.rotate
+        return self._map("rotate_many", lambda chunk: [rotate(value) for value in chunk], values)
+
+    def _map(self, operation, func, values):
+        # Kleine Mengen seriell – der Thread-Overhead lohnt sich erst ab PARALLEL_THRESHOLD
+        values = list(values)
+        started = time.perf_counter()
+        if self.workers == 1 or len(values) < PARALLEL_THRESHOLD:
+            results = func(values)
+        else:
+            chunk_size = -(-len(values) // (self.workers * 4))
+            chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+            results = []
+            for chunk_result in self._get_executor().map(func, chunks):
+                results.extend(chunk_result)
+        # Eine Messung je Aufruf (nicht je Wert), dazu die Anzahl verarbeiteter Werte
+        encryption_seconds.observe(time.perf_counter() - started, operation)
+        encryption_values.inc(operation, amount=len(values))
+        return results
+
+    def _get_executor(self):
+        # Erst bei Bedarf starten – nach einem Fork also im Worker-Prozess
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="encryption")
+        return self._executor
+
+    def blind_index(self, value):
+        """
+        Erzeugt einen deterministischen HMAC-Token (Blind Index) für einen String.
+        Gleiche Eingaben ergeben gleiche Tokens, der Klartext lässt sich daraus
+        ohne Schlüssel nicht zurückgewinnen.
+        """
+        return hmac.new(self.blind_index_key, value.encode(), hashlib.sha256).hexdigest()[:32]
 
 # Instanz für globale Nutzung im Projekt
 encryption = Encryption()
@@ -0,0 +1,60 @@
+import os
+import threading
+from cache import LRUCache
+
+# ----------------------------------------
+# Cache für gerenderte HTML-Fragmente
+# ----------------------------------------
+# Teile einer Seite, die nur vom Katalog und wenigen Parametern abhängen
+# (z. B. die Produktliste), werden einmal gerendert und als fertiges Markup
+# wiederverwendet. Personalisierte Teile (Warenkorb, Name, Meldungen) rendert
+# das umgebende Template pro Request.
+
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", 512))
+
+
+class FragmentCache:
+    """
+    LRU-Cache für Fragmente eines Katalogstands.
+
+    Der Schlüssel enthält immer die Katalogversion; sobald ein neuerer Snapshot
+    auftaucht, wird der Cache geleert, statt alte Einträge erst über die
+    LRU-Grenze verdrängen zu lassen.
+    """
+
+    def __init__(self, maxsize=FRAGMENT_CACHE_SIZE):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._version = None
+
+    def _current(self, catalog):
+        # Neuere Version → leeren; ein älterer Snapshot (Request läuft noch) wird nicht gecacht
+        if self._version is None or catalog.version > self._version:
+            with self._lock:
+                if self._version is None or catalog.version > self._version:
+                    self._cache.clear()
+                    self._version = catalog.version
+        return catalog.version == self._version
+
+    def get(self, catalog, *key):
+        """Liefert das Fragment zu Katalogstand und Schlüssel oder None."""
+        if not self._current(catalog):
+            return None
+        return self._cache.get((catalog.version, *key))
+
+    def set(self, catalog, *key, fragment):
+        """Speichert ein gerendertes Fragment für diesen Katalogstand."""
+        if self._current(catalog):
+            self._cache.set((catalog.version, *key), fragment)
+
+    def clear(self):
+        """Leert den Cache."""
+        self._cache.clear()
+
+    def stats(self):
+        """Größe sowie Treffer/Fehlzugriffe (wie `LRUCache.stats`)."""
+        return self._cache.stats()
+
+
+# Instanz für globale Nutzung im Projekt
+product_list_cache = FragmentCache()
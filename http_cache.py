@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+# ----------------------------------------
+# HTTP-Caching für Katalogantworten (ETag / bedingte GETs)
+# ----------------------------------------
+# Der ETag leitet sich aus dem Inhalt des Katalogs und den Abfrageparametern ab.
+# Solange sich der Katalog nicht ändert, antwortet der Server auf
+# `If-None-Match` mit 304 – ohne die Seite neu zu berechnen oder zu serialisieren.
+
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "60"))
+CATALOG_STALE_WHILE_REVALIDATE = int(os.getenv("CATALOG_STALE_WHILE_REVALIDATE", "300"))
+
+# Öffentlich cachebar (CDN, mobile Clients): Katalog ist für alle gleich
+PUBLIC_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}, stale-while-revalidate={CATALOG_STALE_WHILE_REVALIDATE}"
+# Nur im Browser, immer revalidieren (HTML-Seite anonymer Besucher)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+# Personalisierte Seiten (Warenkorb, Login, Meldungen)
+NO_STORE = "no-store, no-cache, must-revalidate, max-age=0"
+
+
+def catalog_etag(catalog, *parts):
+    """
+    Schwacher ETag aus Katalogstand und Abfrageparametern.
+
+    Bewusst nur der Inhalts-Fingerabdruck, nicht der Versionszähler: dieser
+    zählt pro Prozess ab 0, sodass Worker (und Neustarts) für denselben Katalog
+    sonst verschiedene ETags ausliefern und keine 304 mehr zustande kämen.
+
+    :param catalog: Katalog-Snapshot
+    :param parts: Alles, was die Antwort sonst noch bestimmt (Suche, Sortierung, …)
+    """
+    digest = hashlib.sha256("\x1f".join(map(str, parts)).encode()).hexdigest()[:12]
+    return f'W/"{catalog.fingerprint[:16]}-{digest}"'
+
+
+def etag_matches(request, etag):
+    """
+    Prüft `If-None-Match` (Liste, `*`, schwacher Vergleich nach RFC 9110).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
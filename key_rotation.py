@@ -0,0 +1,193 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import select, update, bindparam, and_
+from encryption import encryption as default_encryption
+from models import Product, BestellungBase, KeyRotationCheckpoint
+
+# ----------------------------------------
+# 🔑 Online-Schlüsselrotation
+# ----------------------------------------
+# Ablauf: neuen Schlüssel vorn in ENCRYPTION_KEYS eintragen (alter bleibt dahinter),
+# BLIND_INDEX_KEY fest setzen, App neu starten, Rotation laufen lassen, danach den
+# alten Schlüssel entfernen. Die Rotation baut dabei auch den Blind Index der
+# Produkte (`name_index`, Such-Tokens) mit dem aktuellen BLIND_INDEX_KEY neu.
+
+# Tabellen mit verschlüsselten Spalten: Name → (Modell, Spalten)
+ROTATION_TARGETS = {
+    "products": (Product, ("name", "description")),
+    "bestellungen": (BestellungBase, ("produkte",)),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class KeyRotationJob:
+    """
+    Verschlüsselt alle verschlüsselten Spalten mit dem aktuellen Schlüssel neu.
+
+    - arbeitet tabellenweise in Keyset-Blöcken (`id > last_id ORDER BY id LIMIT n`),
+      eine kurze Transaktion pro Block
+    - speichert den Fortschritt in `key_rotation_checkpoints` und setzt nach einem
+      Abbruch dort fort
+    - begrenzt den Durchsatz auf `rows_per_second` (None = unbegrenzt)
+    - überschreibt nur Werte, die sich seit dem Lesen nicht geändert haben
+    - baut bei `products` die Such-Tokens mit dem aktuellen Blind-Index-Schlüssel neu;
+      der Checkpoint gilt für Fernet- *und* Blind-Index-Schlüssel
+
+    :param session_factory: Callable, das eine synchrone Session liefert
+    """
+
+    def __init__(self, session_factory, tables=None, batch_size=DEFAULT_BATCH_SIZE,
+                 rows_per_second=None, encryption=None, clock=time.monotonic):
+        self.session_factory = session_factory
+        self.tables = list(tables or ROTATION_TARGETS)
+        unbekannt = set(self.tables) - set(ROTATION_TARGETS)
+        if unbekannt:
+            raise ValueError(f"Unbekannte Tabellen für die Rotation: {', '.join(sorted(unbekannt))}")
+        self.batch_size = max(1, batch_size)
+        self.rows_per_second = rows_per_second
+        self.encryption = encryption or default_encryption
+        # Zielstand: Fernet-Schlüssel + Blind-Index-Schlüssel (ändert sich einer, läuft die Rotation neu)
+        self.target_id = hashlib.sha256(
+            f"{self.encryption.key_id}:{self.encryption.blind_index_key_id}".encode()
+        ).hexdigest()[:16]
+        self._clock = clock
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- Steuerung ----------
+
+    def run(self):
+        """
+        Rotiert alle konfigurierten Tabellen (blockierend).
+
+        :return: True, wenn alle Tabellen fertig sind; False nach `stop()`
+        """
+        for table_name in self.tables:
+            if not self.rotate_table(table_name):
+                return False
+        return True
+
+    def start(self):
+        """Startet die Rotation in einem Hintergrund-Thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="key-rotation", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=None):
+        """Hält die Rotation nach dem laufenden Block an (Fortschritt bleibt gespeichert)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        """Fortschritt je Tabelle für den aktuellen Schlüssel."""
+        with self.session_factory() as db:
+            checkpoints = {c.table_name: c for c in db.query(KeyRotationCheckpoint).all()}
+        status = {}
+        for table_name in self.tables:
+            c = checkpoints.get(table_name)
+            aktuell = c is not None and c.key_id == self.target_id
+            status[table_name] = {
+                "rows_done": c.rows_done if aktuell else 0,
+                "last_id": c.last_id if aktuell else 0,
+                "finished": bool(aktuell and c.finished_at),
+            }
+        return {"key_id": self.encryption.key_id, "running": bool(self._thread and self._thread.is_alive()),
+                "tables": status}
+
+    # ---------- Rotation einer Tabelle ----------
+
+    def rotate_table(self, table_name):
+        """
+        Rotiert eine Tabelle ab dem gespeicherten Checkpoint.
+
+        :return: True, wenn die Tabelle vollständig rotiert ist
+        """
+        model, columns = ROTATION_TARGETS[table_name]
+        table = model.__table__
+        id_column = table.c.id
+
+        # UPDATE nur, wenn der Wert noch dem gelesenen entspricht (parallele Änderungen gewinnen)
+        update_stmt = (
+            update(table)
+            .where(and_(id_column == bindparam("b_id"),
+                        *[table.c[col].is_not_distinct_from(bindparam(f"b_old_{col}")) for col in columns]))
+            .values({col: bindparam(f"b_new_{col}") for col in columns})
+        )
+
+        with self.session_factory() as db:
+            checkpoint = self._load_checkpoint(db, table_name)
+            if checkpoint.finished_at is not None:
+                return True
+
+            started = self._clock()
+            rows_this_run = 0
+            while not self._stop.is_set():
+                rows = db.execute(
+                    select(id_column, *[table.c[col] for col in columns])
+                    .where(id_column > checkpoint.last_id)
+                    .order_by(id_column)
+                    .limit(self.batch_size)
+                ).all()
+                if not rows:
+                    checkpoint.finished_at = datetime.now()
+                    db.commit()
+                    return True
+
+                if model is Product:
+                    # Name entschlüsseln (alter oder neuer Schlüssel) und Blind Index neu schreiben
+                    Product.rebuild_search_index(db, rows, self.encryption)
+                params = self._rotate_rows(rows, columns)
+                if params:
+                    db.execute(update_stmt, params)
+                checkpoint.last_id = rows[-1].id
+                checkpoint.rows_done += len(rows)
+                db.commit()
+
+                rows_this_run += len(rows)
+                self._throttle(started, rows_this_run)
+        return False
+
+    def _load_checkpoint(self, db, table_name):
+        # Neuer Zielschlüssel → Rotation der Tabelle beginnt von vorn
+        checkpoint = db.get(KeyRotationCheckpoint, table_name)
+        if checkpoint is None:
+            checkpoint = KeyRotationCheckpoint(table_name=table_name, key_id=self.target_id)
+            db.add(checkpoint)
+        elif checkpoint.key_id == self.target_id:
+            return checkpoint
+        checkpoint.key_id = self.target_id
+        checkpoint.last_id = 0
+        checkpoint.rows_done = 0
+        checkpoint.started_at = datetime.now()
+        checkpoint.finished_at = None
+        db.commit()
+        return checkpoint
+
+    def _rotate_rows(self, rows, columns):
+        # Pro Spalte gebündelt rotieren; NULL-Werte bleiben unverändert
+        params = [{"b_id": row.id} for row in rows]
+        for col in columns:
+            werte = [getattr(row, col) for row in rows]
+            vorhanden = [i for i, wert in enumerate(werte) if wert is not None]
+            rotiert = self.encryption.rotate_many(werte[i] for i in vorhanden)
+            for i in range(len(rows)):
+                params[i][f"b_old_{col}"] = werte[i]
+                params[i][f"b_new_{col}"] = werte[i]
+            for i, neu in zip(vorhanden, rotiert):
+                params[i][f"b_new_{col}"] = neu
+        # Zeilen mit ausschließlich NULL-Werten brauchen kein UPDATE
+        return [p for p in params if any(p[f"b_old_{col}"] is not None for col in columns)]
+
+    def _throttle(self, started, rows_done):
+        # Wartet, bis die Soll-Zeit für `rows_done` Zeilen erreicht ist
+        if not self.rows_per_second:
+            return
+        verzug = rows_done / self.rows_per_second - (self._clock() - started)
+        if verzug > 0:
+            self._stop.wait(verzug)
@@ -1,3 +1,6 @@
+import time
+_import_started = time.perf_counter()  # ⏱️ Startzeit für die Import-Phase
+
 import os
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
@@ -7,14 +10,31 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
-from db import SessionLocal  # nutzen wir aus db.py
-from models import Product  # Modell wird nun nur noch importiert
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+from db import engine, SessionLocal, get_db  # nutzen wir aus db.py (get_db für Dependency-Overrides)
+from startup import run_startup, startup_timings
+from assets import AssetStaticFiles, asset_manifest, asset_url
+from compression import CompressionMiddleware
+from metrics import MetricsMiddleware
 
 # 🔐 .env-Variablen laden (z. B. secret_key für Sessions)
 load_dotenv()
 
+# 🏁 Start & Shutdown: Schema/Seed (unter Sperre) und Aufwärmen – nicht beim Import
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Initialisiert die Datenbank (abschaltbar mit SKIP_DB_INIT=1, wenn
+    `python manage.py init-db` vorab läuft) und wärmt den Katalog auf.
+    Die Dauer jeder Phase steht unter `/health/startup`.
+    """
+    init_db = os.getenv("SKIP_DB_INIT", "").strip().lower() not in ("1", "true", "yes", "on")
+    await run_in_threadpool(run_startup, engine, SessionLocal, init_db)
+    yield
+
 # 🚀 FastAPI-Anwendung initialisieren
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # 🧠 SessionMiddleware aktivieren (für Warenkorb & Login-Zustand)
 app.add_middleware(
@@ -22,70 +42,25 @@ app.add_middleware(
     secret_key=os.getenv("secret_key")  # aus .env geladen
 )
 
-# 📁 Statische Dateien (CSS, JS etc.) einbinden
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# 🗜️ HTML/JSON-Antworten komprimieren (ab COMPRESSION_MIN_SIZE Bytes, auch Streaming)
+app.add_middleware(CompressionMiddleware)
+
+# 📊 Latenz und laufende Requests je Route (äußerste Middleware, misst alles darunter mit)
+app.add_middleware(MetricsMiddleware)
+
+# 📁 Statische Dateien (CSS, JS etc.) einbinden – gehashte Adressen ein Jahr cachebar, vorkomprimiert
+app.mount("/static", AssetStaticFiles(directory="static", manifest=asset_manifest), name="static")
 
 # 🧩 Jinja2-Template-Verzeichnis definieren (HTML-Render)
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # 🛣️ API-Routen importieren und registrieren
 from auth import router as auth_router
-from routes import router
+from routes import router, api_router
 app.include_router(auth_router)
 app.include_router(router)
+app.include_router(api_router)
 
-def seed_data_once():
-    """
-    Füllt die Datenbank einmalig mit Beispiel-Produkten.
-    Wird nur beim ersten Start ausgeführt, wenn noch keine Produkte existieren.
-    """
-    db = SessionLocal()
-    try:
-        if db.query(Product).count() == 0:
-            demo = [
-                Product(name="CRM-System", description="Kundenverwaltung für Unternehmen", price=49.99),
-                Product(name="Cloud Storage", description="Sichere Cloud-Speicherung", price=19.99),
-                Product(name="Projektmanagement-Tool", description="Planung und Aufgabenverwaltung", price=29.99),
-                Product(name="Marketing Automation", description="Automatisierte Marketingprozesse", price=59.99),
-                Product(name="Helpdesk-Software", description="Support-Ticket-System", price=39.99),
-                Product(name="E-Mail Hosting", description="Professionelle E-Mail-Adressen", price=9.99),
-                Product(name="Analytics Dashboard", description="Echtzeit-Berichte und Analysen", price=24.99),
-                Product(name="Team Collaboration", description="Kommunikationstools für Teams", price=14.99),
-                Product(name="Website-Baukasten", description="Einfache Website-Erstellung", price=29.99),
-                Product(name="SEO-Optimierung", description="Suchmaschinen-Optimierung", price=49.99),
-                Product(name="Social Media Management", description="Soziale Medien-Verwaltung", price=39.99),
-                Product(name="Content Management System", description="Inhaltsverwaltungssystem", price=59.99),
-                Product(name="E-Commerce-Plattform", description="Online-Shop-System", price=99.99),
-                Product(name="Buchhaltungs-Software", description="Finanzverwaltung und Buchhaltung", price=69.99),
-                Product(name="Personalverwaltung", description="Mitarbeiterverwaltung und -planung", price=49.99),
-                Product(name="Reisekostenabrechnung", description="Automatisierte Reisekostenabrechnung", price=29.99),
-                Product(name="Zeiterfassung", description="Arbeitszeiterfassung und -verwaltung", price=19.99),
-                Product(name="Dokumentenmanagement", description="Dokumentenverwaltung und -speicherung", price=39.99),
-                Product(name="Datensicherung", description="Automatisierte Datensicherung", price=29.99),
-                Product(name="Netzwerk-Sicherheit", description="Netzwerk-Sicherheitslösungen", price=59.99),
-                Product(name="Firewall-Management", description="Firewall-Verwaltung und -sicherheit", price=49.99),
-                Product(name="Antivirus-Software", description="Viren- und Malware-Schutz", price=19.99),
-                Product(name="Backup-Software", description="Daten-Backup und -wiederherstellung", price=29.99),
-                Product(name="IT-Service-Management", description="IT-Service- und -support", price=69.99),
-                Product(name="Kundenbeziehungsmanagement", description="Kundenbeziehungs- und -verwaltung", price=49.99),
-                Product(name="Vertriebsmanagement", description="Vertriebs- und -planung", price=59.99),
-                Product(name="Marketing-Software", description="Marketing-Automatisierung und -analyse", price=99.99)
-            ]
-            db.add_all(demo)
-            db.commit()
-    finally:
-        db.close()
-
-# 🧪 Seed-Funktion beim Start ausführen (nur einmal)
-seed_data_once()
-
-def get_db():
-    """
-    Datenbank-Session für Dependency Injection bereitstellen.
-    Wird von FastAPI bei Endpunkten verwendet.
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# ⏱️ Import der App (inkl. Routen, Templates, Regel-Engine) als eigene Startphase
+startup_timings.record("import", time.perf_counter() - _import_started)
@@ -0,0 +1,178 @@
+# manage.py: Verwaltungsbefehle für Betrieb und Wartung
+'''
+Ausführung:
+    python manage.py init-db
+    python manage.py serve --workers 4 --host 0.0.0.0
+    python manage.py export-orders --format jsonl --since 2025-01-01 > bestellungen.jsonl
+    python manage.py rotate-keys --rows-per-second 2000
+    python manage.py train-cobuy --top-k 20
+'''
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# ----------------------------------------
+# 📤 Bestellungen exportieren
+# ----------------------------------------
+def cmd_export_orders(args):
+    """
+    Schreibt Bestellungen als CSV/JSONL nach stdout oder in eine Datei.
+    """
+    from db import SessionLocal
+    from orders import export_orders
+
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for teil in export_orders(SessionLocal, args.format, args.since, args.until, args.typ, args.batch_size):
+            output.write(teil)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+# ----------------------------------------
+# 🔑 Schlüsselrotation
+# ----------------------------------------
+def cmd_rotate_keys(args):
+    """
+    Verschlüsselt alle Daten mit dem ersten Schlüssel aus ENCRYPTION_KEYS neu.
+    Kann jederzeit abgebrochen (Strg+C) und erneut gestartet werden.
+    """
+    from db import SessionLocal
+    from key_rotation import KeyRotationJob
+
+    job = KeyRotationJob(SessionLocal, tables=args.tables, batch_size=args.batch_size,
+                         rows_per_second=args.rows_per_second)
+    if args.status:
+        print(job.status())
+        return
+    try:
+        job.run()
+    except KeyboardInterrupt:
+        print("⏸️ Rotation unterbrochen – Fortschritt ist gespeichert.")
+    print(job.status())
+
+
+# ----------------------------------------
+# 🛍️ "Wird oft zusammen gekauft" trainieren
+# ----------------------------------------
+def cmd_train_cobuy(args):
+    """
+    Trainiert das Kookkurrenz-Modell aus `order_items` und schreibt es nach --output.
+    Laufende App-Prozesse übernehmen es automatisch (Manifest-Prüfung).
+    """
+    from db import SessionLocal
+    from recommendation.cobuy import train_cobuy
+
+    with SessionLocal() as db:
+        manifest = train_cobuy(db, args.output, top_k=args.top_k, min_count=args.min_count)
+    print(f"✅ Modell {manifest['version']}: {manifest['products']} Produkte aus {manifest['orders']} Bestellungen")
+
+
+# ----------------------------------------
+# 🏗️ Datenbank initialisieren (Schema + Demo-Katalog)
+# ----------------------------------------
+def cmd_init_db(args):
+    """
+    Legt fehlende Tabellen an und seedet den Demo-Katalog (unter der Startsperre).
+    Danach können die Worker mit SKIP_DB_INIT=1 starten.
+    """
+    from db import engine, SessionLocal
+    from startup import init_database, StartupTimings
+
+    timings = StartupTimings()
+    created = init_database(engine, SessionLocal, timings)
+    phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.phases.items())
+    print(f"✅ Datenbank bereit ({created} Demo-Produkte angelegt; {phases})")
+
+
+# ----------------------------------------
+# 🚀 App mit mehreren Worker-Prozessen starten
+# ----------------------------------------
+def cmd_serve(args):
+    """
+    Initialisiert die Datenbank einmal im Master-Prozess und startet dann
+    `--workers` Uvicorn-Worker. Die Worker überspringen die Initialisierung
+    (SKIP_DB_INIT=1) und wärmen nur ihre eigenen Caches auf.
+
+    Bei mehreren Workern wird ohne CART_STORE der geteilte SQLite-Warenkorb
+    gewählt; ein ausdrückliches CART_STORE=memory bricht den Start ab.
+    """
+    from cart_store import cart_store_backend
+
+    try:
+        backend = cart_store_backend(args.workers)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    # Wird an die Worker-Prozesse vererbt (uvicorn startet sie per spawn)
+    os.environ["CART_STORE"] = backend
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    import uvicorn
+    from db import engine, SessionLocal
+    from startup import init_database, StartupTimings
+
+    if not args.skip_init:
+        timings = StartupTimings()
+        created = init_database(engine, SessionLocal, timings)
+        print(f"✅ Datenbank bereit ({created} Demo-Produkte angelegt) – starte {args.workers} Worker")
+    os.environ["SKIP_DB_INIT"] = "1"  # wird an die Worker-Prozesse vererbt
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+def _default_workers():
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+def build_parser():
+    """
+    Baut den Argument-Parser mit allen Unterbefehlen.
+    """
+    parser = argparse.ArgumentParser(prog="manage.py", description="Verwaltungsbefehle für den SaaS-Shop")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init_db = commands.add_parser("init-db", help="Tabellen anlegen und Demo-Katalog seeden")
+    init_db.set_defaults(func=cmd_init_db)
+
+    serve = commands.add_parser("serve", help="App mit mehreren Worker-Prozessen starten")
+    serve.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    serve.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    serve.add_argument("--workers", type=int, default=_default_workers(),
+                       help="Anzahl Worker-Prozesse (Standard: WEB_CONCURRENCY bzw. CPU-Kerne)")
+    serve.add_argument("--skip-init", action="store_true", help="Datenbank-Initialisierung überspringen")
+    serve.set_defaults(func=cmd_serve)
+
+    export = commands.add_parser("export-orders", help="Bestellungen als CSV oder JSONL exportieren")
+    export.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    export.add_argument("--since", type=datetime.fromisoformat, help="ab Zeitpunkt (ISO-8601, inklusive)")
+    export.add_argument("--until", type=datetime.fromisoformat, help="bis Zeitpunkt (ISO-8601, exklusive)")
+    export.add_argument("--typ", choices=["benutzer", "gast"], help="nur Benutzer- oder Gastbestellungen")
+    export.add_argument("--batch-size", type=int, default=1000, help="Zeilen pro Datenbank-Batch")
+    export.add_argument("--output", "-o", help="Zieldatei (Standard: stdout)")
+    export.set_defaults(func=cmd_export_orders)
+
+    rotate = commands.add_parser("rotate-keys", help="Daten mit dem aktuellen Schlüssel neu verschlüsseln")
+    rotate.add_argument("--tables", nargs="+", choices=["products", "bestellungen"], help="nur diese Tabellen")
+    rotate.add_argument("--batch-size", type=int, default=500, help="Zeilen pro Transaktion")
+    rotate.add_argument("--rows-per-second", type=float, help="Durchsatzgrenze (Standard: unbegrenzt)")
+    rotate.add_argument("--status", action="store_true", help="nur den Fortschritt anzeigen")
+    rotate.set_defaults(func=cmd_rotate_keys)
+
+    cobuy = commands.add_parser("train-cobuy", help="Kookkurrenz-Modell aus der Bestellhistorie trainieren")
+    cobuy.add_argument("--output", default=os.getenv("COBUY_MODEL_DIR") or "cobuy_model", help="Modellverzeichnis")
+    cobuy.add_argument("--top-k", type=int, default=20, help="gespeicherte Nachbarn je Produkt")
+    cobuy.add_argument("--min-count", type=int, default=1, help="Mindestanzahl gemeinsamer Bestellungen")
+    cobuy.set_defaults(func=cmd_train_cobuy)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
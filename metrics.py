@@ -0,0 +1,336 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event
+from starlette.routing import Match
+
+# ----------------------------------------
+# Kennzahlen im Prometheus-Textformat (`/metrics`)
+# ----------------------------------------
+# Alle Werte gelten pro Worker-Prozess (Prometheus summiert über die Instanzen).
+# Das Erfassen ist sperrarm: jeder Thread schreibt in seine eigene Ablage
+# ("Shard"); nur beim ersten Zugriff eines Threads und beim Abruf von
+# `/metrics` wird kurz gesperrt bzw. werden die Ablagen zusammengezählt.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CRYPTO_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001, 0.01, 0.1, 1.0)
+BCRYPT_BUCKETS = (0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0)
+CART_SIZE_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 50)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    """Gemeinsame Basis: Name, Hilfetext, Labels und die Thread-Ablagen."""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} erwartet die Labels {self.labelnames}, erhalten: {labels}")
+        return tuple(str(label) for label in labels)
+
+    def _merged_shards(self):
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]  # dict.copy() ist unter dem GIL atomar
+
+    def samples(self):
+        """Liefert (Suffix, Label-Werte, zusätzliche Labels, Wert) je Zeile."""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monoton steigender Zähler, z. B. Anzahl Bestellungen."""
+    type = "counter"
+
+    def inc(self, *labels, amount=1.0):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def value(self, *labels):
+        key = self._key(labels)
+        return sum(shard.get(key, 0.0) for shard in self._merged_shards())
+
+    def samples(self):
+        totals = {}
+        for shard in self._merged_shards():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        if not totals and not self.labelnames:
+            totals[()] = 0.0
+        return [("", key, (), value) for key, value in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """
+    Wert, der steigen und fallen kann (z. B. laufende Requests).
+    Mit `set_function` wird der Wert erst beim Abruf berechnet.
+    """
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def dec(self, *labels, amount=1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, function):
+        """`function()` liefert ein Dict {Label-Tupel: Wert} (ohne Labels: {(): Wert})."""
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            return super().samples()
+        values = self._function()
+        return [("", self._key(key), (), value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Verteilung von Messwerten in festen Klassen (kumulativ ausgegeben)."""
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0]  # Zähler je Klasse (+Inf), Summe
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def time(self, *labels):
+        """Kontextmanager, der die Dauer des Blocks in Sekunden erfasst."""
+        return _Timer(self, labels)
+
+    def count(self, *labels):
+        key = self._key(labels)
+        return sum(sum(shard[key][0]) for shard in self._merged_shards() if key in shard)
+
+    def samples(self):
+        totals = {}
+        for shard in self._merged_shards():
+            for key, (counts, total) in shard.items():
+                merged = totals.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        if not totals and not self.labelnames:
+            totals[()] = [[0] * (len(self.buckets) + 1), 0.0]
+
+        lines = []
+        for key, (counts, total) in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(("_bucket", key, (("le", _format_value(bound)),), cumulative))
+            lines.append(("_sum", key, (), total))
+            lines.append(("_count", key, (), cumulative))
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class MetricsRegistry:
+    """Sammlung aller Kennzahlen eines Prozesses; `render()` erzeugt den Text für `/metrics`."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Kennzahl {metric.name} ist bereits registriert")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Instanz für globale Nutzung im Projekt
+registry = MetricsRegistry()
+
+# 🌐 HTTP
+http_request_seconds = registry.histogram(
+    "shop_http_request_duration_seconds", "Dauer der HTTP-Requests je Route.", ("method", "route", "status"))
+http_requests_in_flight = registry.gauge(
+    "shop_http_requests_in_flight", "Gerade laufende HTTP-Requests je Route.", ("method", "route"))
+
+# 🗄️ Datenbank
+db_query_seconds = registry.histogram(
+    "shop_db_query_duration_seconds", "Dauer der SQL-Abfragen je Engine und Art.", ("engine", "statement"),
+    buckets=DB_BUCKETS)
+db_query_errors = registry.counter(
+    "shop_db_query_errors_total", "Fehlgeschlagene SQL-Abfragen je Engine.", ("engine",))
+
+# 🔐 Verschlüsselung (Fernet) und Passwort-Hashing (bcrypt)
+encryption_seconds = registry.histogram(
+    "shop_encryption_duration_seconds", "Dauer der Fernet-Aufrufe je Operation.", ("operation",),
+    buckets=CRYPTO_BUCKETS)
+encryption_values = registry.counter(
+    "shop_encryption_values_total", "Verarbeitete Werte je Fernet-Operation.", ("operation",))
+password_hash_seconds = registry.histogram(
+    "shop_password_hash_duration_seconds", "Rechenzeit von bcrypt je Operation.", ("operation",),
+    buckets=BCRYPT_BUCKETS)
+password_hash_queue_seconds = registry.histogram(
+    "shop_password_hash_queue_seconds", "Wartezeit auf den bcrypt-Pool je Operation.", ("operation",),
+    buckets=BCRYPT_BUCKETS)
+password_hash_pool = registry.gauge(
+    "shop_password_hash_pool", "Kennzahlen des bcrypt-Pools (PasswordHasher.stats).", ("stat",))
+
+# 🛒 Warenkorb & Bestellungen
+cart_size_items = registry.histogram(
+    "shop_cart_size_items", "Artikel (Summe der Mengen) je Warenkorb beim Leeren.", buckets=CART_SIZE_BUCKETS)
+orders_total = registry.counter(
+    "shop_orders_total", "Bestellungen nach Ergebnis und Kundenart.", ("result", "customer"))
+
+# ----------------------------------------
+# 🗄️ SQLAlchemy-Events: Anzahl und Dauer der Abfragen
+# ----------------------------------------
+
+def _statement_kind(statement):
+    kind = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return kind if kind in ("select", "insert", "update", "delete", "with", "pragma") else "other"
+
+
+def instrument_engine(sync_engine, name):
+    """
+    Erfasst jede SQL-Abfrage einer (synchronen) Engine in `shop_db_query_duration_seconds`.
+    Für eine AsyncEngine `async_engine.sync_engine` übergeben.
+    """
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            db_query_seconds.observe(time.perf_counter() - started, name, _statement_kind(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        db_query_errors.inc(name)
+
+# ----------------------------------------
+# 🌐 ASGI-Middleware: Latenz und laufende Requests je Route
+# ----------------------------------------
+
+def route_template(scope):
+    """
+    Pfadvorlage der passenden Route (z. B. "/api/products" oder "/static"),
+    damit Pfadparameter und unbekannte Adressen die Label-Anzahl nicht aufblähen.
+    """
+    partial = None
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Misst Dauer (bis zum letzten Body-Block) und Anzahl laufender Requests je Route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, route = scope["method"], route_template(scope)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method, route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_seconds.observe(time.perf_counter() - started, method, route, status)
+            http_requests_in_flight.dec(method, route)
@@ -1,13 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.ext.declarative import declared_attr
 from encryption import encryption
 from datetime import datetime
-from sqlalchemy import func
-from passlib.context import CryptContext
-
-# Passwort-Hashing-Kontext mit bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy import func, select, distinct, delete, insert, update, bindparam
+import search_index
+from password_hashing import pwd_context, hash_password, verify_password
 
 # Basisklasse für alle SQLAlchemy-Modelle
 Base = declarative_base()
@@ -16,19 +14,50 @@ class Product(Base):
     """
     Datenbankmodell für ein Produkt.
     Der Produktname und die Beschreibung werden verschlüsselt gespeichert.
+    Für die Suche werden zusätzlich HMAC-Tokens (Blind Index) abgelegt.
     """
     __tablename__ = "products"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True)
+    name_index = Column(String(32), index=True)  # Blind Index des normalisierten Namens
     description = Column(String)
     price = Column(Float)
 
+    search_tokens = relationship("ProductSearchToken", cascade="all, delete-orphan")
+
     def __init__(self, name, description, price):
         # Verschlüsselte Speicherung von Name und Beschreibung
-        self.name = encryption.encrypt(name)
+        self.set_name(name)
         self.description = encryption.encrypt(description)
         self.price = price
 
+    def set_name(self, name):
+        """
+        Setzt den (verschlüsselten) Produktnamen und erneuert die Such-Tokens.
+        """
+        self.name = encryption.encrypt(name)
+        self.name_index = search_index.name_index(name)
+        self.search_tokens = [
+            ProductSearchToken(token=token) for token in sorted(search_index.name_tokens(name))
+        ]
+
+    @classmethod
+    def matches_search(cls, search):
+        """
+        SQL-Filter für die Produktsuche über den Blind Index.
+        Ein Produkt passt, wenn jedes Wort des Suchbegriffs ein Wortanfang im Namen ist.
+        """
+        tokens = search_index.query_tokens(search)
+        if not tokens:
+            return cls.id.in_([])
+        matching_ids = (
+            select(ProductSearchToken.product_id)
+            .where(ProductSearchToken.token.in_(tokens))
+            .group_by(ProductSearchToken.product_id)
+            .having(func.count(distinct(ProductSearchToken.token)) == len(tokens))
+        )
+        return cls.id.in_(matching_ids)
+
     def decrypt_name(self):
         """Entschlüsselt den Produktnamen"""
         return encryption.decrypt(self.name)
@@ -37,6 +66,65 @@ class Product(Base):
         """Entschlüsselt die Produktbeschreibung"""
         return encryption.decrypt(self.description)
 
+    @staticmethod
+    def decrypt_many(products):
+        """
+        Entschlüsselt Name und Beschreibung vieler Produkte in einem Durchgang.
+
+        :return: Liste von (name, description) in Eingabereihenfolge
+        """
+        products = list(products)
+        klartext = encryption.decrypt_many(
+            [p.name for p in products] + [p.description for p in products]
+        )
+        return list(zip(klartext[:len(products)], klartext[len(products):]))
+
+    @staticmethod
+    def rebuild_search_index(db, rows, cipher=None):
+        """
+        Schreibt `name_index` und Such-Tokens gespeicherter Produkte neu – gebündelt
+        per Core-Statements, ohne ORM-Objekte (Migration, Schlüsselrotation).
+
+        :param rows: Zeilen mit `id` und verschlüsseltem `name`
+        :param cipher: Abweichende `Encryption`-Instanz (Standard: globale Instanz)
+        :return: Anzahl neu indizierter Produkte
+        """
+        cipher = cipher or encryption
+        rows = [row for row in rows if row.name is not None]
+        if not rows:
+            return 0
+        names = cipher.decrypt_many(row.name for row in rows)
+        ids = [row.id for row in rows]
+        tokens = ProductSearchToken.__table__
+        db.execute(delete(tokens).where(tokens.c.product_id.in_(ids)))
+        token_rows = [
+            {"product_id": product_id, "token": token}
+            for product_id, name in zip(ids, names)
+            for token in sorted(search_index.name_tokens(name, cipher))
+        ]
+        if token_rows:
+            db.execute(insert(tokens), token_rows)
+        products = Product.__table__
+        db.execute(
+            update(products).where(products.c.id == bindparam("b_id")).values(name_index=bindparam("b_index")),
+            [{"b_id": product_id, "b_index": search_index.name_index(name, cipher)}
+             for product_id, name in zip(ids, names)],
+        )
+        return len(rows)
+
+class ProductSearchToken(Base):
+    """
+    Such-Token (HMAC eines Namenspräfixes) eines Produkts.
+    Der Index auf `token` macht die Suche zu einem Index-Lookup statt eines Full Scans.
+    """
+    __tablename__ = "product_search_tokens"
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    token = Column(String(32), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_product_search_tokens_token", "token", "product_id"),
+    )
+
 class User(Base):
     """
     Datenbankmodell für registrierte Benutzer.
@@ -51,14 +139,15 @@ class User(Base):
         self.username = username
         # Passwort-Hashing mit bcrypt + Salt
         self.password = (
-            password if already_hashed else pwd_context.hash(password)
+            password if already_hashed else hash_password(password)
         )
 
     def verify_password(self, plain_password):
         """
         Verifiziert ein Klartextpasswort gegen den gespeicherten Hash.
+        Blockiert den Thread – in async-Routen `verify_password_async` verwenden.
         """
-        return pwd_context.verify(plain_password, self.password)
+        return verify_password(plain_password, self.password)
 
 # ▶ Polymorphe Basisklasse für Bestellungen
 class BestellungBase(Base):
@@ -72,6 +161,9 @@ class BestellungBase(Base):
     timestamp = Column(DateTime, default=datetime.now)
     produkte = Column(String)  # Verschlüsselte Produktübersicht
 
+    # Normalisierte Positionen (für Auswertungen ohne Entschlüsselung)
+    items = relationship("OrderItem", back_populates="bestellung", cascade="all, delete-orphan")
+
     __mapper_args__ = {
         "polymorphic_identity": "base",
         "polymorphic_on": typ
@@ -95,6 +187,19 @@ class BestellungBase(Base):
         """
         return encryption.decrypt(self.produkte)
 
+    @staticmethod
+    def decrypt_produkte_many(bestellungen):
+        """
+        Entschlüsselt die Produktübersichten vieler Bestellungen in einem Durchgang.
+        """
+        return encryption.decrypt_many(b.produkte for b in bestellungen)
+
+    def add_item(self, product_id, quantity, unit_price):
+        """
+        Hängt eine Bestellposition an; sie wird in derselben Transaktion gespeichert.
+        """
+        self.items.append(OrderItem(product_id=product_id, quantity=quantity, unit_price=unit_price))
+
 # ▶ Subtyp für eingeloggte Benutzer
 class BenutzerBestellung(BestellungBase):
     """
@@ -131,3 +236,53 @@ class GastBestellung(BestellungBase):
     def __init__(self, gast_id, produkte):
         super().__init__(produkte=produkte)
         self.gast_id = gast_id
+
+# ▶ Einzelne Bestellposition
+class OrderItem(Base):
+    """
+    Normalisierte Position einer Bestellung: Produkt, Menge und Stückpreis zum Kaufzeitpunkt.
+    Ergänzt die verschlüsselte Produktübersicht, damit Verkaufszahlen per SQL
+    aggregiert werden können, ohne Bestellungen zu entschlüsseln.
+    """
+    __tablename__ = "order_items"
+    id = Column(Integer, primary_key=True)
+    bestellung_id = Column(Integer, ForeignKey("bestellungen.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    unit_price = Column(Float, nullable=False)  # Tatsächlich berechneter Preis (inkl. Rabatt)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+
+    bestellung = relationship("BestellungBase", back_populates="items")
+
+    __table_args__ = (
+        Index("ix_order_items_product_created", "product_id", "created_at"),
+        Index("ix_order_items_created", "created_at"),
+    )
+
+# ▶ Fortschritt der Schlüsselrotation
+class KeyRotationCheckpoint(Base):
+    """
+    Merkt sich pro Tabelle, bis zu welcher ID bereits mit dem aktuellen Schlüssel
+    neu verschlüsselt wurde. `key_id` ist der Fingerabdruck des Zielschlüssels –
+    ändert er sich, beginnt die Rotation für diese Tabelle von vorn.
+    """
+    __tablename__ = "key_rotation_checkpoints"
+    table_name = Column(String(64), primary_key=True)
+    key_id = Column(String(16), nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class CatalogState(Base):
+    """
+    Prozessübergreifender Versionszähler des Produktkatalogs (genau eine Zeile, id = 1).
+    Jede Produktänderung erhöht ihn in derselben Transaktion; andere Worker-Prozesse
+    erkennen daran, dass ihr Katalog-Snapshot veraltet ist.
+    """
+    __tablename__ = "catalog_state"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,324 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from itertools import islice
+from typing import Optional
+from sqlalchemy import insert, select, func
+from encryption import encryption
+from models import BestellungBase, BenutzerBestellung, GastBestellung, OrderItem
+
+# ----------------------------------------
+# 📦 Massenimport von Bestellungen
+# ----------------------------------------
+
+# Anzahl Bestellungen pro Transaktion
+DEFAULT_CHUNK_SIZE = 500
+
+
+@dataclass
+class OrderResult:
+    """
+    Ergebnis für eine einzelne Bestellung eines Massenimports.
+    `index` ist die Position in der Eingabe (0-basiert).
+    """
+    index: int
+    status: str  # "created" oder "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+    def to_dict(self):
+        return {key: value for key, value in asdict(self).items() if value is not None}
+
+
+def validate_order(order):
+    """
+    Prüft eine Bestellung aus dem Import und liefert die normalisierten Felder.
+
+    Erwartet ein Dict mit `produkte` (Text) und genau einem von `benutzer_id` (int)
+    oder `gast_id` (str); optional `timestamp` (ISO-8601) und `items`
+    (Liste von {product_id, quantity, unit_price}).
+
+    :return: (typ, felder, items) mit typ "benutzer" oder "gast"
+    :raises ValueError: bei ungültigen Angaben
+    """
+    if not isinstance(order, dict):
+        raise ValueError("Bestellung muss ein Objekt sein.")
+
+    produkte = order.get("produkte")
+    if not isinstance(produkte, str) or not produkte.strip():
+        raise ValueError("`produkte` fehlt oder ist leer.")
+
+    benutzer_id = order.get("benutzer_id")
+    gast_id = order.get("gast_id")
+    if (benutzer_id is None) == (gast_id is None):
+        raise ValueError("Genau eines von `benutzer_id` oder `gast_id` muss angegeben sein.")
+
+    felder = {"produkte": produkte}
+    if order.get("timestamp") is not None:
+        try:
+            felder["timestamp"] = datetime.fromisoformat(str(order["timestamp"]))
+        except ValueError:
+            raise ValueError("`timestamp` ist kein ISO-8601-Zeitpunkt.")
+
+    items = [validate_item(item) for item in order.get("items") or []]
+
+    if benutzer_id is not None:
+        if isinstance(benutzer_id, bool) or not isinstance(benutzer_id, int):
+            raise ValueError("`benutzer_id` muss eine Ganzzahl sein.")
+        felder["benutzer_id"] = benutzer_id
+        return "benutzer", felder, items
+
+    felder["gast_id"] = str(gast_id)
+    return "gast", felder, items
+
+
+def validate_item(item):
+    """
+    Prüft eine Bestellposition aus dem Import.
+
+    :return: Dict mit product_id, quantity und unit_price
+    :raises ValueError: bei ungültigen Angaben
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Position muss ein Objekt sein.")
+    product_id, quantity, unit_price = item.get("product_id"), item.get("quantity", 1), item.get("unit_price")
+    if isinstance(product_id, bool) or not isinstance(product_id, int):
+        raise ValueError("`items.product_id` muss eine Ganzzahl sein.")
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+        raise ValueError("`items.quantity` muss eine positive Ganzzahl sein.")
+    if isinstance(unit_price, bool) or not isinstance(unit_price, (int, float)) or unit_price < 0:
+        raise ValueError("`items.unit_price` muss eine nicht-negative Zahl sein.")
+    return {"product_id": product_id, "quantity": quantity, "unit_price": float(unit_price)}
+
+
+def _insert_rows(db, model, rows):
+    """
+    Fügt Zeilen per executemany ein (Basistabelle + Subtyp-Tabelle) und liefert
+    die neuen IDs in Eingabereihenfolge.
+    """
+    if not rows:
+        return []
+    result = db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+def insert_order_chunk(db, orders, offset=0):
+    """
+    Validiert, verschlüsselt und speichert eine Gruppe von Bestellungen in einer
+    einzigen Transaktion. Ungültige Einträge werden übersprungen und gemeldet;
+    schlägt die Transaktion fehl, gelten alle gültigen Einträge der Gruppe als fehlerhaft.
+
+    :param db: Synchrone Session
+    :param orders: Liste von Bestellungs-Dicts
+    :param offset: Position des ersten Eintrags in der Gesamteingabe
+    :return: Liste von OrderResult in Eingabereihenfolge
+    """
+    results = [None] * len(orders)
+    gruppen = {"benutzer": [], "gast": []}  # typ → [(position, felder)]
+    positionen = {}  # position → validierte Bestellpositionen
+
+    for position, order in enumerate(orders):
+        try:
+            typ, felder, items = validate_order(order)
+        except ValueError as e:
+            results[position] = OrderResult(index=offset + position, status="error", error=str(e))
+            continue
+        gruppen[typ].append((position, felder))
+        positionen[position] = items
+
+    # Verschlüsselung gesammelt vor dem Schreiben, damit die Transaktion kurz bleibt
+    alle_felder = [felder for eintraege in gruppen.values() for _, felder in eintraege]
+    for felder, produkte in zip(alle_felder, encryption.encrypt_many(f["produkte"] for f in alle_felder)):
+        felder["produkte"] = produkte
+
+    try:
+        item_rows = []
+        for typ, model in (("benutzer", BenutzerBestellung), ("gast", GastBestellung)):
+            eintraege = gruppen[typ]
+            ids = _insert_rows(db, model, [felder for _, felder in eintraege])
+            for (position, felder), new_id in zip(eintraege, ids):
+                results[position] = OrderResult(index=offset + position, status="created", id=new_id)
+                created_at = felder.get("timestamp") or datetime.now()
+                item_rows.extend(
+                    {**item, "bestellung_id": new_id, "created_at": created_at} for item in positionen[position]
+                )
+        if item_rows:
+            db.execute(insert(OrderItem), item_rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for eintraege in gruppen.values():
+            for position, _ in eintraege:
+                results[position] = OrderResult(
+                    index=offset + position, status="error", error=f"Transaktion fehlgeschlagen: {e}"
+                )
+    return results
+
+
+def bulk_create_bestellungen(db, orders, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Importiert einen (beliebig langen) Strom von Bestellungen in Blöcken.
+
+    Jeder Block wird in einer eigenen Transaktion per executemany geschrieben;
+    die Eingabe wird dabei nur blockweise im Speicher gehalten.
+
+    :param db: Synchrone Session
+    :param orders: Iterable von Bestellungs-Dicts (siehe `validate_order`)
+    :param chunk_size: Bestellungen pro Transaktion
+    :return: Generator von OrderResult, ein Ergebnis pro Eingabe-Eintrag
+    """
+    iterator = iter(orders)
+    offset = 0
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield from insert_order_chunk(db, chunk, offset=offset)
+        offset += len(chunk)
+
+
+# ----------------------------------------
+# 📊 Verkaufsauswertung über die Bestellpositionen
+# ----------------------------------------
+
+def sales_by_product(db, since=None, until=None):
+    """
+    Aggregiert verkaufte Mengen und Umsatz je Produkt per SQL – ohne eine
+    einzige Bestellung zu entschlüsseln. Nutzt den Index (product_id, created_at).
+
+    :param db: Synchrone Session
+    :param since: Nur Positionen ab diesem Zeitpunkt (inklusive)
+    :param until: Nur Positionen vor diesem Zeitpunkt (exklusive)
+    :return: Liste von Dicts (product_id, quantity, revenue, orders), absteigend nach Menge
+    """
+    quantity = func.sum(OrderItem.quantity).label("quantity")
+    stmt = (
+        select(
+            OrderItem.product_id,
+            quantity,
+            func.sum(OrderItem.quantity * OrderItem.unit_price).label("revenue"),
+            func.count(func.distinct(OrderItem.bestellung_id)).label("orders"),
+        )
+        .group_by(OrderItem.product_id)
+        .order_by(quantity.desc(), OrderItem.product_id)
+    )
+    if since is not None:
+        stmt = stmt.where(OrderItem.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(OrderItem.created_at < until)
+    return [
+        {"product_id": row.product_id, "quantity": row.quantity, "revenue": round(row.revenue, 2), "orders": row.orders}
+        for row in db.execute(stmt)
+    ]
+
+
+# ----------------------------------------
+# 📤 Streaming-Export von Bestellungen
+# ----------------------------------------
+
+# Zeilen pro Datenbank-Batch (und pro Entschlüsselungs-Block)
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ("id", "typ", "timestamp", "benutzer_id", "gast_id", "produkte")
+EXPORT_FORMATS = ("csv", "jsonl")
+
+
+def iter_export_batches(db, since=None, until=None, typ=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Liest Bestellungen in festen Blöcken (`yield_per`, unter PostgreSQL als
+    serverseitiger Cursor) und entschlüsselt jeweils nur einen Block.
+    Der Speicherbedarf hängt damit von `batch_size` ab, nicht von der Tabellengröße.
+
+    :param db: Synchrone Session
+    :param since: Nur Bestellungen ab diesem Zeitpunkt (inklusive)
+    :param until: Nur Bestellungen vor diesem Zeitpunkt (exklusive)
+    :param typ: "benutzer", "gast" oder None für beide
+    :return: Generator von Listen mit Export-Dicts (siehe EXPORT_FIELDS)
+    """
+    benutzer = BenutzerBestellung.__table__
+    gast = GastBestellung.__table__
+    stmt = (
+        select(
+            BestellungBase.id,
+            BestellungBase.typ,
+            BestellungBase.timestamp,
+            benutzer.c.benutzer_id,
+            gast.c.gast_id,
+            BestellungBase.produkte,
+        )
+        .select_from(BestellungBase.__table__)
+        .outerjoin(benutzer, benutzer.c.id == BestellungBase.id)
+        .outerjoin(gast, gast.c.id == BestellungBase.id)
+        .order_by(BestellungBase.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if since is not None:
+        stmt = stmt.where(BestellungBase.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(BestellungBase.timestamp < until)
+    if typ is not None:
+        stmt = stmt.where(BestellungBase.typ == typ)
+
+    result = db.execute(stmt)
+    try:
+        for rows in result.partitions():
+            # NULL-Werte (Spalte ist nullable) bleiben None, wie bei der Schlüsselrotation
+            vorhanden = [i for i, row in enumerate(rows) if row.produkte is not None]
+            produkte = [None] * len(rows)
+            for i, klartext in zip(vorhanden, encryption.decrypt_many(rows[i].produkte for i in vorhanden)):
+                produkte[i] = klartext
+            yield [
+                {
+                    "id": row.id,
+                    "typ": row.typ,
+                    "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+                    "benutzer_id": row.benutzer_id,
+                    "gast_id": row.gast_id,
+                    "produkte": klartext,
+                }
+                for row, klartext in zip(rows, produkte)
+            ]
+    finally:
+        result.close()
+
+
+def format_csv(batches):
+    """
+    Wandelt Export-Blöcke in CSV-Text um (Kopfzeile + ein Textstück pro Block).
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def format_jsonl(batches):
+    """
+    Wandelt Export-Blöcke in JSON Lines um (ein Textstück pro Block).
+    """
+    for batch in batches:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+
+
+def export_orders(session_factory, fmt="csv", since=None, until=None, typ=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Streamt alle passenden Bestellungen als CSV oder JSONL.
+
+    Die Session wird im Generator selbst geöffnet und geschlossen, damit der
+    Export auch nach dem Ende eines Endpunkts (StreamingResponse) weiterlaufen kann.
+
+    :param session_factory: Callable, das eine synchrone Session liefert (z. B. SessionLocal)
+    :param fmt: "csv" oder "jsonl"
+    :return: Generator von Textstücken
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unbekanntes Exportformat: {fmt}")
+    formatter = format_csv if fmt == "csv" else format_jsonl
+    with session_factory() as db:
+        yield from formatter(iter_export_batches(db, since, until, typ, batch_size))
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select, tuple_
+from models import Product
+
+# ----------------------------------------
+# Keyset-Paginierung für Produktlisten
+# ----------------------------------------
+# Eine Seite wird über den Sortierschlüssel des letzten (bzw. ersten) Eintrags
+# adressiert, nie über einen Offset. Die Kosten einer Seite hängen damit nur
+# von der Seitengröße ab, nicht von der Position im Katalog.
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Sortierung → Schlüssel eines Produkts (ID am Ende macht den Schlüssel eindeutig)
+SORT_KEYS = {
+    "id": lambda p: (p.id,),
+    "price": lambda p: (p.price, p.id),
+}
+SORT_COLUMNS = {
+    "id": (Product.id,),
+    "price": (Product.price, Product.id),
+}
+
+
+@dataclass(frozen=True)
+class Page:
+    """Eine Seite der Produktliste mit Cursorn für Vor- und Zurückblättern."""
+    items: list
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def clamp_page_size(limit):
+    """Begrenzt die Seitengröße auf 1..MAX_PAGE_SIZE."""
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def encode_cursor(sort, key, direction):
+    """
+    Kodiert Sortierung, Schlüssel und Richtung ("next"/"prev") als undurchsichtigen String.
+    """
+    raw = json.dumps({"s": sort, "k": list(key), "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """
+    Dekodiert einen Cursor.
+
+    :return: (key, direction)
+    :raises ValueError: bei ungültigem Cursor oder abweichender Sortierung
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        key, direction = tuple(data["k"]), data["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Ungültiger Cursor.")
+    if data.get("s") != sort or direction not in ("next", "prev") or len(key) != len(SORT_COLUMNS[sort]):
+        raise ValueError("Cursor passt nicht zur Sortierung.")
+    return key, direction
+
+
+def _page(items, sort, has_before, has_after):
+    key = SORT_KEYS[sort]
+    return Page(
+        items=items,
+        next_cursor=encode_cursor(sort, key(items[-1]), "next") if items and has_after else None,
+        prev_cursor=encode_cursor(sort, key(items[0]), "prev") if items and has_before else None,
+    )
+
+
+def paginate_sorted(items, keys, sort, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Paginiert eine bereits sortierte, unveränderliche Liste (Katalog-Snapshot)
+    per Binärsuche auf den Schlüsseln: O(log n + limit) pro Seite.
+
+    :param items: Nach `sort` sortierte Produkte
+    :param keys: Die zugehörigen Sortierschlüssel (gleiche Reihenfolge)
+    """
+    limit = clamp_page_size(limit)
+    if cursor:
+        key, direction = decode_cursor(cursor, sort)
+        if direction == "next":
+            start = bisect_right(keys, key)
+            end = min(start + limit, len(items))
+        else:
+            end = bisect_left(keys, key)
+            start = max(0, end - limit)
+    else:
+        start, end = 0, min(limit, len(items))
+    return _page(list(items[start:end]), sort, start > 0, end < len(items))
+
+
+async def paginate_query(db, stmt, sort, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Keyset-Paginierung in SQL für gefilterte Listen (z. B. Suche).
+    `stmt` muss Produkt-IDs selektieren; es wird limit + 1 Zeilen weit gelesen.
+
+    :param db: AsyncSession
+    :return: Page mit Produkt-IDs als `items` und den Sortierschlüsseln je ID
+    """
+    limit = clamp_page_size(limit)
+    columns = SORT_COLUMNS[sort]
+    stmt = stmt.add_columns(*columns[:-1]) if len(columns) > 1 else stmt
+    direction = "next"
+    if cursor:
+        key, direction = decode_cursor(cursor, sort)
+        bound = tuple_(*columns)
+        stmt = stmt.where(bound > tuple_(*key) if direction == "next" else bound < tuple_(*key))
+    order = columns if direction == "next" else tuple(c.desc() for c in columns)
+    rows = (await db.execute(stmt.order_by(*order).limit(limit + 1))).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse()
+    has_before, has_after = (bool(cursor), more) if direction == "next" else (more, True)
+
+    # Schlüssel aus der Zeile: (ID,) bzw. (Preis, ID)
+    keys = [tuple(row[1:]) + (row[0],) for row in rows]
+    return Page(
+        items=[row[0] for row in rows],
+        next_cursor=encode_cursor(sort, keys[-1], "next") if rows and has_after else None,
+        prev_cursor=encode_cursor(sort, keys[0], "prev") if rows and has_before else None,
+    )
+
+
+def search_ids_query(search):
+    """Basis-Abfrage für die paginierte Suche: IDs aller passenden Produkte."""
+    return select(Product.id).where(Product.matches_search(search))
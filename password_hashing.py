@@ -0,0 +1,171 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+from metrics import password_hash_seconds, password_hash_queue_seconds, password_hash_pool
+
+# Lade Umgebungsvariablen (PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_CONCURRENCY)
+load_dotenv()
+
+# Passwort-Kontext für sichere Hashing-Methoden (bcrypt)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password):
+    """
+    Hasht ein Klartextpasswort mit bcrypt (inkl. Salt). Blockiert den aufrufenden Thread.
+    """
+    return pwd_context.hash(password)
+
+
+def verify_password(password, hashed):
+    """
+    Verifiziert ein Klartextpasswort gegen einen bcrypt-Hash. Blockiert den aufrufenden Thread.
+    """
+    return pwd_context.verify(password, hashed)
+
+
+def _timed_call(func, *args):
+    # Läuft im Worker-Prozess: Start-/Endzeit (Wall-Clock) für die Queue-Metriken mitliefern
+    started = time.time()
+    result = func(*args)
+    return result, started, time.time()
+
+
+class HashingMetrics:
+    """
+    Kennzahlen des Hashing-Pools: Anzahl, Warte- (Queue) und Rechenzeiten.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {"hash": 0, "verify": 0}
+        self.in_flight = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, kind, queue_seconds, run_seconds):
+        with self._lock:
+            self.in_flight -= 1
+            self.calls[kind] += 1
+            self.queue_seconds_total += queue_seconds
+            self.queue_seconds_max = max(self.queue_seconds_max, queue_seconds)
+            self.run_seconds_total += run_seconds
+        password_hash_queue_seconds.observe(queue_seconds, kind)
+        password_hash_seconds.observe(run_seconds, kind)
+
+    def snapshot(self):
+        with self._lock:
+            total = sum(self.calls.values())
+            return {
+                "hash_calls": self.calls["hash"],
+                "verify_calls": self.calls["verify"],
+                "in_flight": self.in_flight,
+                "queue_seconds_total": round(self.queue_seconds_total, 6),
+                "queue_seconds_max": round(self.queue_seconds_max, 6),
+                "queue_seconds_avg": round(self.queue_seconds_total / total, 6) if total else 0.0,
+                "run_seconds_avg": round(self.run_seconds_total / total, 6) if total else 0.0,
+            }
+
+
+class PasswordHasher:
+    """
+    Führt bcrypt-Hashing und -Verifikation in einem begrenzten Prozesspool aus.
+
+    - `workers`: Anzahl Prozesse (0 = Threadpool des Event-Loops, z. B. für Tests)
+    - `max_concurrency`: Obergrenze gleichzeitig angenommener Aufträge pro Event-Loop;
+      weitere Aufrufe warten, statt Pool und Speicher zu fluten.
+
+    Der Pool wird erst beim ersten Aufruf gestartet – nach einem Fork also im Worker.
+    """
+
+    def __init__(self, workers, max_concurrency):
+        self.workers = max(0, workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self.metrics = HashingMetrics()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_executor(self):
+        if self.workers == 0:
+            return None
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _get_semaphore(self):
+        # Ein Semaphor je Event-Loop (asyncio-Primitive sind an ihren Loop gebunden)
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run(self, kind, func, *args):
+        requested = time.time()
+        self.metrics.started()
+        queue_seconds = run_seconds = 0.0
+        try:
+            async with self._get_semaphore():
+                loop = asyncio.get_running_loop()
+                result, started, finished = await loop.run_in_executor(
+                    self._get_executor(), _timed_call, func, *args
+                )
+            queue_seconds = max(0.0, started - requested)
+            run_seconds = max(0.0, finished - started)
+            return result
+        finally:
+            self.metrics.finished(kind, queue_seconds, run_seconds)
+
+    async def hash(self, password):
+        """Asynchrones Gegenstück zu `hash_password`."""
+        return await self._run("hash", hash_password, password)
+
+    async def verify(self, password, hashed):
+        """Asynchrones Gegenstück zu `verify_password`."""
+        return await self._run("verify", verify_password, password, hashed)
+
+    def stats(self):
+        """Konfiguration und Kennzahlen des Pools."""
+        return {"workers": self.workers, "max_concurrency": self.max_concurrency, **self.metrics.snapshot()}
+
+    def shutdown(self):
+        """Beendet den Prozesspool (z. B. beim Herunterfahren der App)."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_default_workers = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Instanz für globale Nutzung im Projekt
+password_hasher = PasswordHasher(
+    workers=_default_workers,
+    max_concurrency=int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", max(1, _default_workers) * 2)),
+)
+
+# 📊 Vorhandene Pool-Kennzahlen (Auslastung, Queue-Zeiten) unter /metrics veröffentlichen
+password_hash_pool.set_function(lambda: {(stat,): value for stat, value in password_hasher.stats().items()})
+
+
+async def hash_password_async(password):
+    """Hasht ein Passwort im Prozesspool, ohne den Event-Loop zu blockieren."""
+    return await password_hasher.hash(password)
+
+
+async def verify_password_async(password, hashed):
+    """Verifiziert ein Passwort im Prozesspool, ohne den Event-Loop zu blockieren."""
+    return await password_hasher.verify(password, hashed)
@@ -0,0 +1,103 @@
+# batch.py
+import numpy as np
+from recommendation.rules_engine import decision_table
+
+# ----------------------------------------
+# Vektorisierte Empfehlungen für viele Antworten
+# ----------------------------------------
+# Merkmalsmatrix (Antworten × Regeln) mal Regel-Produkt-Matrix (Regeln × Produkte)
+# ergibt, welche Produkte je Antwort empfohlen werden. Die Produktspalten sind
+# alphabetisch sortiert, die Top-k sind daher die ersten k Treffer je Zeile –
+# genau wie `sorted(...)[:k]` in der skalaren Engine.
+
+
+class BatchRecommender:
+    """
+    Wertet die Regeln einer `DecisionTable` für viele Antwort-Dicts auf einmal aus.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        rules = table.rules
+        self.products = sorted(
+            {p for _, _, products in rules["departments"] for p in products}
+            | {p for _, _, products in rules["flags"] for p in products}
+            | set(rules["fallback"])
+        )
+        column = {name: i for i, name in enumerate(self.products)}
+
+        # Regel-Produkt-Matrix: zuerst die Abteilungsregeln, dann die Merkmale
+        rule_products = [products for _, _, products in rules["departments"]]
+        rule_products += [products for _, _, products in rules["flags"]]
+        self.rule_matrix = np.zeros((len(rule_products), len(self.products)), dtype=np.int8)
+        for row, products in enumerate(rule_products):
+            self.rule_matrix[row, [column[p] for p in products]] = 1
+
+        self.fallback = np.zeros(len(self.products), dtype=bool)
+        self.fallback[[column[p] for p in rules["fallback"]]] = True
+        self.flags = [(field, value) for field, value, _ in rules["flags"]]
+        self.department_count = len(rules["departments"])
+
+    def features(self, answers_list):
+        """
+        Baut die Merkmalsmatrix (n × Regeln): One-Hot-Abteilung plus Ja/Nein-Bits.
+        """
+        n = len(answers_list)
+        features = np.zeros((n, self.department_count + len(self.flags)), dtype=np.int8)
+        if n == 0:
+            return features
+
+        # Jeden verschiedenen Rohwert nur einmal normalisieren und einordnen
+        departments = [a.get("department", "") for a in answers_list]
+        lookup = {d: self.table.category_index(d.lower()) for d in set(departments)}
+        categories = np.fromiter(map(lookup.__getitem__, departments), dtype=np.intp, count=n)
+        rows = np.flatnonzero(categories)
+        features[rows, categories[rows] - 1] = 1
+
+        for bit, (field, value) in enumerate(self.flags):
+            column = [a.get(field, "") for a in answers_list]
+            lookup = {v: v.lower() == value for v in set(column)}
+            features[:, self.department_count + bit] = np.fromiter(map(lookup.__getitem__, column), dtype=bool, count=n)
+        return features
+
+    def recommend(self, answers_list, top_k=None):
+        """
+        Liefert für jede Antwort die Top-k Produktnamen (alphabetisch).
+
+        Zeilen mit identischen Merkmalen (höchstens Kategorien × 2^Merkmale) werden
+        nur einmal durch die Matrixmultiplikation und Sortierung geschickt.
+
+        :param answers_list: Liste von Antwort-Dicts (wie bei `recommend_products`)
+        :param top_k: Anzahl Empfehlungen pro Antwort (Standard: wie die skalare Engine)
+        :return: Liste von Listen, eine pro Antwort
+        """
+        top_k = self.table.rules["max_results"] if top_k is None else top_k
+        if not answers_list or top_k <= 0:
+            return [[] for _ in answers_list]
+
+        features = self.features(answers_list)
+        codes = features.astype(np.int64) @ (1 << np.arange(features.shape[1], dtype=np.int64))
+        _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+
+        selected = (features[first] @ self.rule_matrix) > 0
+        empty = ~selected.any(axis=1)
+        selected[empty] = self.fallback
+
+        # Stabile Sortierung: Treffer zuerst, innerhalb davon alphabetisch
+        k = min(top_k, len(self.products))
+        order = np.argsort(~selected, axis=1, kind="stable")[:, :k]
+        counts = np.minimum(selected.sum(axis=1), k)
+        products = self.products
+        results = [tuple(products[i] for i in row[:count]) for row, count in zip(order.tolist(), counts.tolist())]
+        return [list(results[i]) for i in inverse.tolist()]
+
+
+# Instanz für globale Nutzung im Projekt
+batch_recommender = BatchRecommender(decision_table)
+
+
+def recommend_products_batch(answers_list, top_k=None):
+    """
+    Vektorisierte Variante von `recommend_products` für viele Antwort-Dicts.
+    """
+    return batch_recommender.recommend(answers_list, top_k)
@@ -0,0 +1,261 @@
+# cobuy.py
+import json
+import os
+import time
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+
+# ----------------------------------------
+# "Wird oft zusammen gekauft" – Item-zu-Item-Ähnlichkeit aus der Bestellhistorie
+# ----------------------------------------
+# Offline: Bestellpositionen streamen → dünn besetzte Bestellung×Produkt-Matrix X →
+# Kookkurrenz C = XᵀX → Kosinus-Ähnlichkeit → Top-k Nachbarn je Produkt als .npy.
+# Online: Die .npy-Dateien werden per Memory-Map geladen (kein Kopieren, von allen
+# Worker-Prozessen geteilt); eine Abfrage ist eine Binärsuche plus Zeilenzugriff.
+
+DEFAULT_MODEL_DIR = "cobuy_model"
+DEFAULT_TOP_K = 20
+MANIFEST = "manifest.json"
+
+
+def iter_order_pairs(db, batch_size=10_000):
+    """
+    Streamt (bestellung_id, product_id)-Paare aus `order_items` in Blöcken als NumPy-Arrays.
+    """
+    from models import OrderItem
+
+    result = db.execute(
+        select(OrderItem.bestellung_id, OrderItem.product_id).execution_options(yield_per=batch_size)
+    )
+    try:
+        for rows in result.partitions():
+            pairs = np.array(rows, dtype=np.int64).reshape(-1, 2)
+            yield pairs[:, 0], pairs[:, 1]
+    finally:
+        result.close()
+
+
+def build_similarity(order_ids, product_ids, top_k=DEFAULT_TOP_K, min_count=1):
+    """
+    Berechnet die Top-k ähnlichsten Produkte je Produkt (Kosinus über gemeinsame Bestellungen).
+
+    :param order_ids: Array der Bestellungs-IDs (je Position)
+    :param product_ids: Array der Produkt-IDs (je Position)
+    :param min_count: Mindestanzahl gemeinsamer Bestellungen für ein Paar
+    :return: (items, neighbors, scores) – sortierte Produkt-IDs, Nachbar-IDs (−1 = leer), Scores
+    """
+    orders, order_index = np.unique(order_ids, return_inverse=True)
+    items, item_index = np.unique(product_ids, return_inverse=True)
+    neighbors = np.full((len(items), top_k), -1, dtype=np.int64)
+    scores = np.zeros((len(items), top_k), dtype=np.float32)
+    if len(items) == 0:
+        return items, neighbors, scores
+
+    # Binäre Bestellung×Produkt-Matrix (mehrfache Positionen zählen einmal)
+    x = sparse.csr_matrix(
+        (np.ones(len(order_index), dtype=np.float32), (order_index, item_index)),
+        shape=(len(orders), len(items)),
+    )
+    x.data[:] = 1.0
+    cooc = (x.T @ x).tocsr()
+    counts = cooc.diagonal()
+    cooc.setdiag(0)
+    cooc.data[cooc.data < min_count] = 0
+    cooc.eliminate_zeros()
+
+    # Kosinus-Normierung: C_ij / sqrt(n_i * n_j)
+    norm = 1.0 / np.sqrt(np.maximum(counts, 1.0))
+    similarity = sparse.diags(norm) @ cooc @ sparse.diags(norm)
+    similarity = similarity.tocsr()
+
+    for row in range(len(items)):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        if start == end:
+            continue
+        cols = similarity.indices[start:end]
+        vals = similarity.data[start:end]
+        # Absteigend nach Score, bei Gleichstand nach Produkt-ID
+        order = np.lexsort((items[cols], -vals))[:top_k]
+        neighbors[row, :len(order)] = items[cols[order]]
+        scores[row, :len(order)] = vals[order]
+    return items, neighbors, scores
+
+
+def train_cobuy(db, output_dir=DEFAULT_MODEL_DIR, top_k=DEFAULT_TOP_K, min_count=1):
+    """
+    Offline-Training: liest alle Bestellpositionen und schreibt ein neues Modell.
+
+    Die Dateien tragen eine Versionsnummer; erst zum Schluss wird `manifest.json`
+    atomar ersetzt. Laufende Prozesse lesen so nie einen halb geschriebenen Stand.
+
+    :return: Manifest des neuen Modells (Dict)
+    """
+    order_chunks, product_chunks = [], []
+    for order_ids, product_ids in iter_order_pairs(db):
+        order_chunks.append(order_ids)
+        product_chunks.append(product_ids)
+    order_ids = np.concatenate(order_chunks) if order_chunks else np.empty(0, dtype=np.int64)
+    product_ids = np.concatenate(product_chunks) if product_chunks else np.empty(0, dtype=np.int64)
+
+    items, neighbors, scores = build_similarity(order_ids, product_ids, top_k, min_count)
+
+    os.makedirs(output_dir, exist_ok=True)
+    version = time.strftime("%Y%m%d%H%M%S") + f"-{os.getpid()}"
+    manifest = {
+        "version": version,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "orders": int(len(np.unique(order_ids))),
+        "products": int(len(items)),
+        "top_k": top_k,
+        "files": {},
+    }
+    for name, array in (("items", items), ("neighbors", neighbors), ("scores", scores)):
+        filename = f"{name}-{version}.npy"
+        np.save(os.path.join(output_dir, filename), array)
+        manifest["files"][name] = filename
+
+    tmp_path = os.path.join(output_dir, MANIFEST + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST))
+
+    # Alte Versionen entfernen (bereits gemappte Dateien bleiben für laufende Prozesse lesbar)
+    current = set(manifest["files"].values())
+    for filename in os.listdir(output_dir):
+        if filename.endswith(".npy") and filename not in current:
+            os.remove(os.path.join(output_dir, filename))
+    return manifest
+
+
+class CobuyModel:
+    """
+    Memory-gemapptes Ähnlichkeitsmodell für Top-k-Abfragen.
+    """
+
+    def __init__(self, items, neighbors, scores, manifest=None):
+        self.items = items
+        self.neighbors = neighbors
+        self.scores = scores
+        self.manifest = manifest or {}
+
+    @classmethod
+    def load(cls, model_dir=DEFAULT_MODEL_DIR):
+        """
+        Lädt ein trainiertes Modell ohne Kopie (mmap_mode="r").
+
+        :return: CobuyModel oder None, wenn noch keins trainiert wurde
+        """
+        try:
+            with open(os.path.join(model_dir, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        arrays = {
+            name: np.load(os.path.join(model_dir, filename), mmap_mode="r")
+            for name, filename in manifest["files"].items()
+        }
+        return cls(arrays["items"], arrays["neighbors"], arrays["scores"], manifest)
+
+    def _row(self, product_id):
+        pos = int(np.searchsorted(self.items, product_id))
+        if pos < len(self.items) and self.items[pos] == product_id:
+            return pos
+        return None
+
+    def related(self, product_id, k=5):
+        """
+        Top-k Produkte, die mit `product_id` zusammen gekauft wurden.
+
+        :return: Liste von (product_id, score), absteigend
+        """
+        row = self._row(product_id)
+        if row is None:
+            return []
+        result = []
+        for neighbor, score in zip(self.neighbors[row].tolist(), self.scores[row].tolist()):
+            if neighbor < 0 or len(result) >= k:
+                break
+            result.append((neighbor, score))
+        return result
+
+    def for_cart(self, product_ids, k=5):
+        """
+        Top-k Ergänzungen für einen Warenkorb: Scores der Nachbarn aller
+        Warenkorbprodukte werden addiert, Produkte im Warenkorb ausgeschlossen.
+        """
+        in_cart = set(product_ids)
+        totals = {}
+        for product_id in in_cart:
+            for neighbor, score in self.related(product_id, k=self.neighbors.shape[1]):
+                if neighbor not in in_cart:
+                    totals[neighbor] = totals.get(neighbor, 0.0) + score
+        return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+class CobuyModelHolder:
+    """
+    Hält das aktuelle Modell eines Verzeichnisses und lädt es neu, sobald ein
+    neues Training das Manifest ersetzt hat (Prüfung höchstens alle `check_interval` Sekunden).
+    """
+
+    def __init__(self, model_dir, check_interval=30.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._model = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def get(self):
+        """Aktuelles Modell oder None (Kaltstart)."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval or self._checked_at == 0.0:
+            self._checked_at = now
+            try:
+                mtime = os.stat(os.path.join(self.model_dir, MANIFEST)).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._mtime:
+                self._model = CobuyModel.load(self.model_dir) if mtime is not None else None
+                self._mtime = mtime
+        return self._model
+
+
+# Instanz für globale Nutzung im Projekt
+cobuy_model = CobuyModelHolder(os.getenv("COBUY_MODEL_DIR") or DEFAULT_MODEL_DIR)
+
+
+def related_products(catalog, product_ids, k=5, answers=None, model=None):
+    """
+    Empfehlungen für ein Produkt bzw. einen Warenkorb als Katalogprodukte.
+
+    Zuerst aus dem Kookkurrenz-Modell; fehlt es (Kaltstart) oder liefert es zu
+    wenig, wird mit der Regel-Engine (Quiz-Antworten bzw. Standardempfehlungen) aufgefüllt.
+
+    :param catalog: Katalog-Snapshot
+    :param product_ids: Produkt-IDs (eine bei der Produktansicht, mehrere beim Warenkorb)
+    :return: Liste von CatalogProduct (höchstens k)
+    """
+    from recommendation.rules_engine import recommend_products
+    from recommendation.product_index import product_index_for
+
+    model = cobuy_model.get() if model is None else model
+    exclude = set(product_ids)
+    result = []
+
+    if model is not None:
+        for product_id, _ in model.for_cart(product_ids, k=k + len(exclude)):
+            product = catalog.get(product_id)
+            if product is not None and product.id not in exclude:
+                result.append(product)
+                exclude.add(product.id)
+            if len(result) >= k:
+                return result
+
+    for item in product_index_for(catalog).resolve(recommend_products(answers or {})):
+        if item.product is not None and item.product.id not in exclude:
+            result.append(item.product)
+            exclude.add(item.product.id)
+            if len(result) >= k:
+                break
+    return result
@@ -0,0 +1,146 @@
+# decision_table.py
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+# ----------------------------------------
+# Vorberechnete Entscheidungstabelle für die Regel-Engine
+# ----------------------------------------
+# Der Antwortraum ist klein: eine Abteilungskategorie (inkl. "keine") und
+# sechs Ja/Nein-Merkmale (Bitmaske 0..63). Für jede Kombination wird das
+# Ergebnis einmalig berechnet; eine Empfehlung ist danach ein Tabellenzugriff.
+
+FORMAT_VERSION = 1
+
+
+def rules_fingerprint(rules):
+    """
+    Stabiler Fingerabdruck der Regeldaten (SHA-256 über kanonisches JSON).
+    Ändert sich eine Regel, passt ein gespeichertes Artefakt nicht mehr.
+    """
+    canonical = json.dumps(rules, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{FORMAT_VERSION}:{canonical}".encode()).hexdigest()
+
+
+def evaluate_rules(rules, category, mask):
+    """
+    Wertet die Regeldaten für eine Abteilungskategorie und Merkmals-Bitmaske aus
+    (Referenzsemantik, nur beim Kompilieren benutzt).
+
+    :return: Tupel mit bis zu `max_results` Produktnamen, alphabetisch sortiert
+    """
+    recommended = set()
+    for name, _, products in rules["departments"]:
+        if name == category:
+            recommended.update(products)
+    for bit, (_, _, products) in enumerate(rules["flags"]):
+        if mask & (1 << bit):
+            recommended.update(products)
+    if not recommended:
+        recommended.update(rules["fallback"])
+    return tuple(sorted(recommended)[:rules["max_results"]])
+
+
+class DecisionTable:
+    """
+    Kompilierte Regel-Engine: Tabelle [Kategorie][Bitmaske] → Empfehlungen.
+
+    - `categories`: Abteilungskategorien in Prüfreihenfolge; Index 0 = keine Kategorie
+    - `table`: Liste von Zeilen (eine pro Kategorie) mit je 2^len(flags) Tupeln
+    """
+
+    def __init__(self, rules, categories, table, fingerprint):
+        self.rules = rules
+        self.categories = categories
+        self.table = table
+        self.fingerprint = fingerprint
+        # (Antwortfeld, erwarteter Wert) je Bit
+        self._flags = tuple((field, value) for field, value, _ in rules["flags"])
+        # Abteilung → Kategorie-Index; Freitext, daher begrenzt gecacht
+        self.category_index = lru_cache(maxsize=1024)(self._category_index)
+
+    @classmethod
+    def compile(cls, rules):
+        """
+        Berechnet die komplette Tabelle aus den Regeldaten.
+        """
+        categories = (None,) + tuple(name for name, _, _ in rules["departments"])
+        size = 1 << len(rules["flags"])
+        table = [
+            [evaluate_rules(rules, category, mask) for mask in range(size)]
+            for category in categories
+        ]
+        return cls(rules, categories, table, rules_fingerprint(rules))
+
+    def _category_index(self, department):
+        # Erste Kategorie, deren Stichwort als Teilstring vorkommt (wie die if/elif-Kette)
+        for index, (_, keywords, _) in enumerate(self.rules["departments"], start=1):
+            if any(keyword in department for keyword in keywords):
+                return index
+        return 0
+
+    def mask(self, answers):
+        """Bitmaske der Ja/Nein-Merkmale einer Antwort."""
+        mask = 0
+        for bit, (field, value) in enumerate(self._flags):
+            if answers.get(field, "").lower() == value:
+                mask |= 1 << bit
+        return mask
+
+    def lookup(self, answers):
+        """
+        Liefert die Empfehlungen für ein Antwort-Dict (O(1) Tabellenzugriff).
+        """
+        category = self.category_index(answers.get("department", "").lower())
+        return self.table[category][self.mask(answers)]
+
+    # ---------- Serialisierung ----------
+
+    def to_json(self):
+        """Serialisiert Regeln und Tabelle als JSON-Text."""
+        return json.dumps({
+            "format": FORMAT_VERSION,
+            "fingerprint": self.fingerprint,
+            "rules": self.rules,
+            "table": self.table,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        """
+        Lädt eine serialisierte Tabelle.
+
+        :raises ValueError: bei fremdem Format oder verfälschtem Inhalt
+        """
+        data = json.loads(text)
+        if data.get("format") != FORMAT_VERSION or rules_fingerprint(data["rules"]) != data["fingerprint"]:
+            raise ValueError("Entscheidungstabelle passt nicht zu Format oder Regeln.")
+        rules = data["rules"]
+        categories = (None,) + tuple(name for name, _, _ in rules["departments"])
+        table = [[tuple(entry) for entry in row] for row in data["table"]]
+        return cls(rules, categories, table, data["fingerprint"])
+
+
+def load_or_compile(rules, path=None):
+    """
+    Lädt die kompilierte Tabelle aus `path`, sofern sie zu den Regeln passt;
+    sonst wird neu kompiliert und (falls `path` gesetzt) gespeichert.
+    """
+    fingerprint = rules_fingerprint(rules)
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                table = DecisionTable.from_json(f.read())
+            if table.fingerprint == fingerprint:
+                return table
+        except (OSError, ValueError, KeyError):
+            pass  # Beschädigt oder veraltet → neu kompilieren
+
+    table = DecisionTable.compile(rules)
+    if path:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(table.to_json())
+        os.replace(tmp_path, path)
+    return table
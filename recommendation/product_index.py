@@ -0,0 +1,108 @@
+# product_index.py
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional
+from search_index import normalize
+from recommendation.rules_engine import RULES
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------
+# Empfohlene Namen → Katalogprodukte
+# ----------------------------------------
+
+# Empfehlungsnamen, die im Katalog unter anderem Namen geführt werden
+ALIASES = {
+    "Projektmanagement": "Projektmanagement-Tool",
+    "Cloud-Speicher": "Cloud Storage",
+    "DMS (Dokumentenmanagementsystem)": "Dokumentenmanagement",
+    "Helpdesk-System": "Helpdesk-Software",
+    "Finanzbuchhaltung": "Buchhaltungs-Software",
+}
+
+
+def recommendable_names(rules=RULES):
+    """Alle Produktnamen, die die Regel-Engine empfehlen kann (sortiert)."""
+    names = set(rules["fallback"])
+    for _, _, products in rules["departments"]:
+        names.update(products)
+    for _, _, products in rules["flags"]:
+        names.update(products)
+    return sorted(names)
+
+
+@dataclass(frozen=True)
+class Recommendation:
+    """Empfohlener Name plus (falls vorhanden) das passende Katalogprodukt."""
+    name: str
+    product: Optional[object] = None
+
+
+class ProductNameIndex:
+    """
+    Normalisierter Name (inkl. Aliase) → Produkt eines Katalog-Snapshots.
+    Wird einmal pro Katalogversion gebaut; Auflösen kostet keine Datenbankabfrage.
+    """
+
+    def __init__(self, catalog, aliases=ALIASES):
+        by_name = {normalize(p.name): p for p in catalog.products}
+        for alias, target in aliases.items():
+            product = by_name.get(normalize(target))
+            if product is not None:
+                by_name.setdefault(normalize(alias), product)
+        self.by_name = MappingProxyType(by_name)
+
+    def get(self, name):
+        """Liefert das Produkt zum (empfohlenen) Namen oder None."""
+        return self.by_name.get(normalize(name))
+
+    def resolve(self, names):
+        """
+        Löst empfohlene Namen auf. Zeigen mehrere Namen auf dasselbe Produkt,
+        bleibt nur der erste Eintrag erhalten.
+        """
+        seen = set()
+        result = []
+        for name in names:
+            product = self.get(name)
+            if product is not None:
+                if product.id in seen:
+                    continue
+                seen.add(product.id)
+            result.append(Recommendation(name=name, product=product))
+        return result
+
+    def unknown(self, names):
+        """Namen ohne passendes Katalogprodukt."""
+        return [name for name in names if self.get(name) is None]
+
+
+# Zuletzt gebauter Index; das Tupel wird atomar ersetzt
+_current = (None, None)  # (Snapshot, Index)
+
+
+def product_index_for(catalog):
+    """
+    Liefert den Namensindex zum Katalog-Snapshot. Jede Katalogänderung erzeugt
+    einen neuen Snapshot – dann wird der Index einmalig neu gebaut.
+    """
+    global _current
+    snapshot, index = _current
+    if snapshot is catalog:
+        return index
+    index = ProductNameIndex(catalog)
+    _current = (catalog, index)
+    return index
+
+
+def report_unknown_recommendations(catalog):
+    """
+    Meldet empfehlbare Namen, die im Katalog fehlen (z. B. beim Start), als Warnung im Log.
+
+    :return: Liste der unbekannten Namen
+    """
+    unknown = product_index_for(catalog).unknown(recommendable_names())
+    if unknown:
+        logger.warning("%d Empfehlungen ohne Katalogprodukt: %s", len(unknown), ", ".join(unknown))
+    return unknown
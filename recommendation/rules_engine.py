@@ -1,15 +1,50 @@
 # rules_engine.py
+import os
+from recommendation.decision_table import load_or_compile
+
+# ----------------------------------------
+# Regeln als Daten
+# ----------------------------------------
+RULES = {
+    # 📌 1. Abteilungsbasierte Empfehlungen: (Kategorie, Stichwörter, Produkte).
+    # Die erste Kategorie, deren Stichwort in der Abteilung vorkommt, gewinnt.
+    "departments": [
+        ["hr", ["hr"], ["Personalverwaltung", "Lohnabrechnung", "Onboarding-Tool"]],
+        ["it", ["it"], ["Netzwerk-Sicherheit", "VPN-Lösung", "Zugriffsmanagement"]],
+        ["sales", ["sales"], ["CRM-System", "Marketing Automation", "Kundensupport-Plattform"]],
+        ["finance", ["finance"], ["Finanzbuchhaltung", "Spesenmanagement", "Reisekostenabrechnung"]],
+        ["project", ["project", "pm"], ["Projektmanagement", "Cloud-Speicher", "Aufgabenverwaltung"]],
+        ["admin", ["admin"], ["DMS (Dokumentenmanagementsystem)", "Inventarverwaltung", "Digitale Signatur"]],
+    ],
+    # 📌 2.–7. Merkmale: (Antwortfeld, Wert, Produkte) – je ein Bit der Bitmaske
+    "flags": [
+        ["remote_work", "yes", ["Mobiles Arbeiten", "Video-Konferenzsystem", "Team Collaboration"]],
+        ["needs_training", "yes", ["E-Learning-Plattform"]],
+        ["expense_handling", "yes", ["Reisekostenabrechnung", "Spesenmanagement"]],
+        ["document_handling", "yes", ["DMS (Dokumentenmanagementsystem)", "Digitale Signatur"]],
+        ["security_concern", "yes", ["Netzwerk-Sicherheit", "E-Mail-Archivierung", "Zugriffsmanagement"]],
+        ["team_size", "large", ["Zeiterfassung", "Helpdesk-System", "Enterprise Search"]],
+    ],
+    # 📌 Standard-Fallback, falls keine Regel greift
+    "fallback": ["Projektmanagement", "Team Collaboration", "CRM-System"],
+    "max_results": 3,
+}
+
+# Beim Import einmalig kompiliert (bzw. aus RULES_TABLE_PATH geladen)
+decision_table = load_or_compile(RULES, os.getenv("RULES_TABLE_PATH"))
+
 
 def recommend_products(answers: dict) -> list:
     """
-    Gibt Produktempfehlungen auf Basis einfacher if-else-Regeln zurück.
+    Gibt Produktempfehlungen auf Basis einfacher Regeln zurück.
 
     Die Empfehlungen basieren auf Antworten aus einem Fragebogen oder Formular,
     in dem Nutzer:innen verschiedene Anforderungen angeben. Es wird ein Set
-    von maximal 3 passenden Produkten zurückgegeben.
+    von maximal 3 passenden Produkten zurückgegeben. Die Regeln (`RULES`) sind
+    vorab in eine Entscheidungstabelle kompiliert; ein Aufruf ist ein Tabellenzugriff.
 
     Parameter:
-        answers (dict): Enthält Nutzerantworten, z. B.:
+        answers (dict): Enthält Nutzerantworten, z. B.:
             {
                 "department": "HR",
                 "remote_work": "yes",
@@ -23,63 +58,7 @@ def recommend_products(answers: dict) -> list:
     Rückgabe:
         Liste mit bis zu 3 empfohlenen Produktnamen (alphabetisch sortiert).
     """
-
-    department = answers.get("department", "").lower()
-    remote = answers.get("remote_work", "").lower()
-    needs_training = answers.get("needs_training", "").lower()
-    expense_handling = answers.get("expense_handling", "").lower()
-    document_handling = answers.get("document_handling", "").lower()
-    security_concern = answers.get("security_concern", "").lower()
-    team_size = answers.get("team_size", "").lower()
-
-    recommended = set()
-
-    # 📌 1. Abteilungsbasierte Empfehlungen
-    if "hr" in department:
-        recommended.update(["Personalverwaltung", "Lohnabrechnung", "Onboarding-Tool"])
-    elif "it" in department:
-        recommended.update(["Netzwerk-Sicherheit", "VPN-Lösung", "Zugriffsmanagement"])
-    elif "sales" in department:
-        recommended.update(["CRM-System", "Marketing Automation", "Kundensupport-Plattform"])
-    elif "finance" in department:
-        recommended.update(["Finanzbuchhaltung", "Spesenmanagement", "Reisekostenabrechnung"])
-    elif "project" in department or "pm" in department:
-        recommended.update(["Projektmanagement", "Cloud-Speicher", "Aufgabenverwaltung"])
-    elif "admin" in department:
-        recommended.update(["DMS (Dokumentenmanagementsystem)", "Inventarverwaltung", "Digitale Signatur"])
-
-    # 📌 2. Remote-Arbeit
-    if remote == "yes":
-        recommended.update(["Mobiles Arbeiten", "Video-Konferenzsystem", "Team Collaboration"])
-
-    # 📌 3. Schulungsbedarf
-    if needs_training == "yes":
-        recommended.add("E-Learning-Plattform")
-
-    # 📌 4. Reisekosten
-    if expense_handling == "yes":
-        recommended.update(["Reisekostenabrechnung", "Spesenmanagement"])
-
-    # 📌 5. Dokumentenverarbeitung
-    if document_handling == "yes":
-        recommended.update(["DMS (Dokumentenmanagementsystem)", "Digitale Signatur"])
-
-    # 📌 6. Sicherheitsbedenken
-    if security_concern == "yes":
-        recommended.update(["Netzwerk-Sicherheit", "E-Mail-Archivierung", "Zugriffsmanagement"])
-
-    # 📌 7. Teamgröße
-    if team_size == "large":
-        recommended.add("Zeiterfassung")
-        recommended.add("Helpdesk-System")
-        recommended.add("Enterprise Search")
-
-    # 📌 Standard-Fallback, falls keine Regel greift
-    if not recommended:
-        recommended.update(["Projektmanagement", "Team Collaboration", "CRM-System"])
-
-    # Gib maximal 3 Empfehlungen zurück, alphabetisch sortiert
-    return sorted(list(recommended))[:3]
+    return list(decision_table.lookup(answers))
 
 # Beispielhafte Nutzung der Engine
 answers = {
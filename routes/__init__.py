@@ -1 +1,2 @@
 from .routes import router
+from .api import router as api_router
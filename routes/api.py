@@ -0,0 +1,207 @@
+# api.py: JSON-Endpunkte für externe Clients und Partnerkanäle
+import json
+from datetime import datetime
+from typing import Optional, Literal
+from pagination import DEFAULT_PAGE_SIZE, clamp_page_size
+from fastapi import APIRouter, Request, Response, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from db import get_db, get_async_db, get_session_factory
+from auth import require_api_key
+from catalog import catalog_cache
+from http_cache import catalog_etag, etag_matches, PUBLIC_CACHE_CONTROL
+from recommendation.batch import recommend_products_batch
+from recommendation.cobuy import related_products
+from routes.routes import load_product_page
+from orders import insert_order_chunk, sales_by_product, export_orders, DEFAULT_CHUNK_SIZE
+
+router = APIRouter(prefix="/api")
+
+# ----------------------------------------
+# Massenimport von Bestellungen
+# ----------------------------------------
+async def _iter_orders(request: Request):
+    """
+    Liest Bestellungen aus dem Request-Body:
+    - `application/x-ndjson`: eine Bestellung pro Zeile, wird gestreamt gelesen
+    - sonst: JSON-Array von Bestellungen
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        rest = b""
+        async for teil in request.stream():
+            zeilen = (rest + teil).split(b"\n")
+            rest = zeilen.pop()
+            for zeile in zeilen:
+                if zeile.strip():
+                    yield _parse_json(zeile)
+        if rest.strip():
+            yield _parse_json(rest)
+        return
+
+    daten = _parse_json(await request.body())
+    if not isinstance(daten, list):
+        raise HTTPException(status_code=400, detail="Erwartet wird ein JSON-Array von Bestellungen.")
+    for order in daten:
+        yield order
+
+
+def _parse_json(raw):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ungültiges JSON im Request-Body.")
+
+
+@router.post("/orders/bulk", dependencies=[Depends(require_api_key)])
+async def bulk_orders(request: Request, chunk_size: int = DEFAULT_CHUNK_SIZE, db: Session = Depends(get_db)):
+    """
+    Importiert viele Bestellungen auf einmal (Partnerkanäle, Nachverarbeitung von Rückständen).
+
+    Die Bestellungen werden blockweise verschlüsselt und per executemany in je einer
+    Transaktion gespeichert. Antwort: Zusammenfassung plus Ergebnis pro Eintrag.
+    """
+    chunk_size = max(1, min(chunk_size, 5000))
+    results = []
+    chunk = []
+
+    async def flush():
+        # Datenbank- und Verschlüsselungsarbeit blockiert – daher im Threadpool
+        results.extend(await run_in_threadpool(insert_order_chunk, db, list(chunk), len(results)))
+        chunk.clear()
+
+    async for order in _iter_orders(request):
+        chunk.append(order)
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+
+    created = sum(1 for r in results if r.status == "created")
+    return JSONResponse({
+        "created": created,
+        "failed": len(results) - created,
+        "results": [r.to_dict() for r in results],
+    })
+
+
+# ----------------------------------------
+# Export von Bestellungen (Streaming)
+# ----------------------------------------
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+@router.get("/orders/export", dependencies=[Depends(require_api_key)])
+async def export_orders_endpoint(
+    format: Literal["csv", "jsonl"] = "csv",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    typ: Optional[Literal["benutzer", "gast"]] = None,
+    session_factory=Depends(get_session_factory),
+):
+    """
+    Streamt Bestellungen (entschlüsselt) als CSV oder JSONL, gefiltert nach
+    Zeitraum [since, until) und Typ. Der Speicherbedarf bleibt unabhängig von
+    der Anzahl der Bestellungen konstant.
+    """
+    # Synchroner Generator → Starlette liest ihn blockweise im Threadpool
+    return StreamingResponse(
+        export_orders(session_factory, format, since, until, typ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="bestellungen.{format}"'},
+    )
+
+
+# ----------------------------------------
+# Verkaufsauswertung je Produkt
+# ----------------------------------------
+@router.get("/sales", dependencies=[Depends(require_api_key)])
+async def sales(since: Optional[datetime] = None, until: Optional[datetime] = None, db: Session = Depends(get_db)):
+    """
+    Verkaufte Mengen und Umsatz je Produkt im Zeitraum [since, until) –
+    als SQL-Aggregat über `order_items`, ohne Entschlüsselung.
+    """
+    return {"products": await run_in_threadpool(sales_by_product, db, since, until)}
+
+
+# ----------------------------------------
+# Empfehlungen für viele Antworten (Batch)
+# ----------------------------------------
+MAX_RECOMMENDATION_BATCH = 100_000
+
+
+@router.post("/recommendations/batch", dependencies=[Depends(require_api_key)])
+async def recommendations_batch(request: Request):
+    """
+    Berechnet Empfehlungen für viele Antwort-Sets auf einmal (z. B. Lead-Listen).
+
+    Body: `{"answers": [{...}, ...], "top_k": 3}` – Antworten wie beim Quiz.
+    Antwort: `{"recommendations": [[...], ...]}` in Eingabereihenfolge.
+    """
+    daten = _parse_json(await request.body())
+    answers = daten.get("answers") if isinstance(daten, dict) else None
+    if not isinstance(answers, list) or not all(
+        isinstance(a, dict) and all(isinstance(v, str) for v in a.values()) for a in answers
+    ):
+        raise HTTPException(status_code=400, detail="`answers` muss eine Liste von Objekten mit Text-Werten sein.")
+    if len(answers) > MAX_RECOMMENDATION_BATCH:
+        raise HTTPException(status_code=413, detail=f"Höchstens {MAX_RECOMMENDATION_BATCH} Antworten pro Anfrage.")
+    top_k = daten.get("top_k")
+    if top_k is not None and (isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= 20):
+        raise HTTPException(status_code=400, detail="`top_k` muss zwischen 1 und 20 liegen.")
+
+    recommendations = await run_in_threadpool(recommend_products_batch, answers, top_k)
+    return {"recommendations": recommendations}
+
+
+# ----------------------------------------
+# Produktkatalog (JSON, seitenweise)
+# ----------------------------------------
+@router.get("/products")
+async def products(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    search: str = "",
+    sort: Literal["id", "price"] = "id",
+    cursor: str = "",
+    limit: int = DEFAULT_PAGE_SIZE,
+):
+    """
+    Produktliste als JSON mit Keyset-Cursorn (`next_cursor` / `prev_cursor`).
+    Sortierung nach ID oder Preis; `limit` höchstens 100.
+
+    Öffentlich cachebar: Der ETag folgt der Katalogversion, bei passendem
+    `If-None-Match` antwortet der Endpunkt mit 304 ohne Body.
+    """
+    catalog = await catalog_cache.get_async(db)
+    etag = catalog_etag(catalog, "api", search, sort, cursor, clamp_page_size(limit))
+    headers = {"ETag": etag, "Cache-Control": PUBLIC_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    page = await load_product_page(db, catalog, search, sort, cursor, limit)
+    return JSONResponse({
+        "items": [{"id": p.id, "name": p.name, "description": p.description, "price": p.price} for p in page.items],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }, headers=headers)
+
+
+# ----------------------------------------
+# "Wird oft zusammen gekauft" je Produkt
+# ----------------------------------------
+@router.get("/products/{product_id}/related")
+async def related(product_id: int, k: int = 5, db: AsyncSession = Depends(get_async_db)):
+    """
+    Produkte, die häufig zusammen mit `product_id` gekauft werden
+    (Fallback bei fehlender Historie: Standardempfehlungen der Regel-Engine).
+    """
+    catalog = await catalog_cache.get_async(db)
+    if catalog.get(product_id) is None:
+        raise HTTPException(status_code=404, detail="Produkt nicht gefunden.")
+    products = related_products(catalog, [product_id], k=max(1, min(k, 50)))
+    return {
+        "product_id": product_id,
+        "related": [{"id": p.id, "name": p.name, "price": p.price} for p in products],
+    }
@@ -1,142 +1,213 @@
 # routes.py:
+import os
 from fastapi import APIRouter, Request, Form, Depends, HTTPException, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from models import Product, User
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Product
 from models import BenutzerBestellung, GastBestellung
 from uuid import uuid4
 from recommendation.rules_engine import recommend_products
-from db import get_db
-import time
-from auth import templates, verify_token
-from auth import get_current_user_optional
-from urllib.parse import quote_plus
-from auth import get_current_user_optional
+from recommendation.product_index import product_index_for
+from recommendation.cobuy import related_products
+from startup import startup_timings, is_ready
+from db import get_async_db, get_async_write_db, engine, async_engine, writer_engine, async_writer_engine, pool_stats
+from catalog import catalog_cache
+from cart_store import cart_store, cart_items_async
+from auth import templates
+from auth import get_current_user, AuthenticatedUser
+from urllib.parse import quote_plus, urlencode
+from typing import Literal
+from pagination import Page, DEFAULT_PAGE_SIZE, clamp_page_size, paginate_query, search_ids_query
+from markupsafe import Markup
+from fragment_cache import product_list_cache
+from http_cache import catalog_etag, etag_matches, PRIVATE_CACHE_CONTROL, NO_STORE
+from metrics import registry, orders_total, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 router = APIRouter()
 
+def get_cart_id(request: Request, create: bool = False):
+    """
+    Liefert die Warenkorb-ID aus der Session (einziger Warenkorb-Wert im Cookie).
+    Mit `create=True` wird bei Bedarf eine neue, zufällige ID vergeben.
+    """
+    cart_id = request.session.get("cart_id")
+    if cart_id is None and create:
+        cart_id = request.session["cart_id"] = uuid4().hex
+    return cart_id
+
+async def load_product_page(db, catalog, search, sort, cursor, limit):
+    """
+    Lädt eine Seite der Produktliste: ohne Suche aus dem Katalog-Snapshot,
+    mit Suche per Keyset-Abfrage über den Blind Index.
+    """
+    try:
+        if not search:
+            return catalog.page(sort, cursor or None, limit)
+        id_page = await paginate_query(db, search_ids_query(search), sort, cursor or None, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    products = [catalog.get(product_id) for product_id in id_page.items]
+    return Page(
+        items=[p for p in products if p is not None],
+        next_cursor=id_page.next_cursor,
+        prev_cursor=id_page.prev_cursor,
+    )
+
+def page_url(search, sort, limit, cursor):
+    """Link auf eine Nachbarseite (None, wenn es keine gibt)."""
+    if not cursor:
+        return None
+    params = {"cursor": cursor}
+    if search:
+        params["search"] = search
+    if sort != "id":
+        params["sort"] = sort
+    if limit != DEFAULT_PAGE_SIZE:
+        params["limit"] = limit
+    return "/?" + urlencode(params)
+
+async def render_product_list(db, catalog, rabatt, search, sort, cursor, limit):
+    """
+    Liefert die gerenderte Produktliste (inkl. Blätter-Links) als Markup.
+    Bei einem Treffer im Fragment-Cache entfallen Seitenabfrage und Rendering.
+    """
+    key = (rabatt, search, sort, cursor, clamp_page_size(limit))
+    fragment = product_list_cache.get(catalog, *key)
+    if fragment is None:
+        page = await load_product_page(db, catalog, search, sort, cursor, limit)
+        fragment = Markup(templates.get_template("_product_list.html").render(
+            products=page.items,
+            rabatt=rabatt,
+            next_url=page_url(search, sort, limit, page.next_cursor),
+            prev_url=page_url(search, sort, limit, page.prev_cursor),
+        ))
+        product_list_cache.set(catalog, *key, fragment=fragment)
+    return fragment
+
 # ----------------------------------------
 # Produktübersicht (Startseite)
 # ----------------------------------------
 @router.get("/", response_class=HTMLResponse)
-def index(request: Request, db: Session = Depends(get_db), search: str = "", success: str = ""):
+async def index(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    search: str = "",
+    success: str = "",
+    sort: Literal["id", "price"] = "id",
+    cursor: str = "",
+    limit: int = DEFAULT_PAGE_SIZE
+):
     """
-    Zeigt alle Produkte an, optional mit Suchfilter. 
-    Berechnet Preise mit/ohne Rabatt und zeigt Erfolgsmeldung bei Bestellung.
+    Zeigt die Produkte seitenweise an (Keyset-Cursor), optional mit Suchfilter
+    und Sortierung nach Preis. Berechnet Preise mit/ohne Rabatt und zeigt
+    Erfolgsmeldung bei Bestellung.
     """
-    username = get_current_user_optional(request)
+    username = current_user.username if current_user else None
     rabatt = username is not None
 
     if request.session.get("order_completed"):
         request.session["order_completed"] = False
         return RedirectResponse(url="/?success=true", status_code=303)
 
-    cart = request.session.get("cart", [])
-    request.session["product_count"] = len(cart)
+    catalog = await catalog_cache.get_async(db)
+    cart = await cart_items_async(cart_store, get_cart_id(request), catalog)
+    product_count = sum(item["quantity"] for item in cart)
 
-    query = db.query(Product)
-    if search:
-        query = query.filter(Product.name.ilike(f"%{search}%"))
-    products = query.all()
+    success_message = "Bestellung wurde erfolgreich abgegeben!" if success == "true" else ""
+    error_message = (
+        "Bestellung konnte nicht gespeichert werden. Bitte versuchen Sie es erneut."
+        if request.session.pop("order_failed", False) else ""
+    )
+
+    # Anonym, leerer Warenkorb, keine Meldung → Seite hängt nur vom Katalog ab
+    if rabatt or cart or success_message or error_message:
+        headers = {"Cache-Control": NO_STORE, "Pragma": "no-cache"}
+    else:
+        etag = catalog_etag(catalog, "html", search, sort, cursor, clamp_page_size(limit))
+        headers = {"ETag": etag, "Cache-Control": PRIVATE_CACHE_CONTROL}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
 
-    rabattierte_preise = {p.id: round(p.price * 0.9, 2) for p in products} if rabatt else {}
-    gesamt = sum(p["price"] * 0.9 if rabatt else p["price"] for p in cart)
+    product_list = await render_product_list(db, catalog, rabatt, search, sort, cursor, limit)
 
-    success_message = "Bestellung wurde erfolgreich abgegeben!" if success == "true" else ""
+    # Ergänzungen zum Warenkorb (Kookkurrenz-Modell, sonst Regel-Engine mit Quiz-Antworten)
+    quiz_answers = {key: request.session[key] for key, _ in questions if key in request.session}
+    related = related_products(catalog, [item["id"] for item in cart], k=3, answers=quiz_answers) if cart else []
+
+    gesamt = sum((p["price"] * 0.9 if rabatt else p["price"]) * p["quantity"] for p in cart)
 
     return templates.TemplateResponse("index.html", {
         "request": request,
-        "products": products,
+        "product_list": product_list,
         "cart": cart,
+        "related": related,
         "username": username,
         "rabatt": rabatt,
-        "rabattierte_preise": rabattierte_preise,
         "search": search,
+        "sort": sort,
         "success": success_message,
+        "error": error_message,
         "gesamtpreis": round(gesamt, 2),
-        "product_count": len(cart)
+        "product_count": product_count
     },
-    headers={
-        "Cache-Control": "no-store, no-cache, must-revalidate, max-age=0",
-        "Pragma": "no-cache",
-    })
+    headers=headers)
 
 # ----------------------------------------
 # Zeigt Produktliste separat an
 # ----------------------------------------
 @router.get("/products")
-def get_products(db: Session = Depends(get_db)):
+async def get_products(request: Request):
     """
-    Zeigt alle Produkte als eigene Seite an.
+    Produktliste als JSON – kanonische Adresse ist `/api/products` (gleiche Parameter).
     """
-    products = db.query(Product).all()
-    return templates.TemplateResponse("products.html", {"products": products})
+    query = request.url.query
+    return RedirectResponse("/api/products" + (f"?{query}" if query else ""), status_code=307)
 
 # ----------------------------------------
 # Produkt zum Warenkorb hinzufügen
 # ----------------------------------------
 @router.post("/add_to_cart")
-def add_to_cart(request: Request, product_id: int = Form(...), db: Session = Depends(get_db)):
+async def add_to_cart(request: Request, product_id: int = Form(...), db: AsyncSession = Depends(get_async_db)):
     """
-    Fügt ein Produkt dem Warenkorb (Session) hinzu.
+    Fügt ein Produkt dem (serverseitigen) Warenkorb hinzu.
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = (await catalog_cache.get_async(db)).get(product_id)
     if product:
-        product_dict = {
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "price": product.price
-        }
-        cart = request.session.get("cart", [])
-        cart.append(product_dict)
-        request.session["cart"] = cart
-        request.session["modified"] = time.time()
+        await cart_store.add_async(get_cart_id(request, create=True), product.id)
     return RedirectResponse("/", status_code=303)
 
 # ----------------------------------------
 # Produkt aus dem Warenkorb entfernen
 # ----------------------------------------
 @router.post("/remove_from_cart")
-def remove_from_cart(request: Request, product_id: int = Form(...), db: Session = Depends(get_db)):
+async def remove_from_cart(request: Request, product_id: int = Form(...)):
     """
     Entfernt ein Produkt aus dem Warenkorb.
     """
-    cart = request.session.get("cart", [])
-    updated_cart = [p for p in cart if p["id"] != product_id]
-    request.session["cart"] = updated_cart
-    request.session["product_count"] = len(updated_cart)
-    request.session["modified"] = time.time()
-
-    if not updated_cart:
-        request.session.pop("cart", None)
+    cart_id = get_cart_id(request)
+    if cart_id:
+        await cart_store.remove_async(cart_id, product_id)
     return RedirectResponse("/", status_code=303)
 
 # ----------------------------------------
 # Vorbereitung zur Bestellung (nur wenn eingeloggt)
 # ----------------------------------------
 @router.post("/bestellen")
-def bestellen(request: Request, db: Session = Depends(get_db)):
+async def bestellen(request: Request, user: AuthenticatedUser = Depends(get_current_user)):
     """
     Leitet zur Bestellung weiter, nur wenn Benutzer eingeloggt ist.
     """
-    cart = request.session.get("cart", {})
-    
+    cart_id = get_cart_id(request)
+    cart = await cart_store.get_async(cart_id) if cart_id else {}
+
     if not cart:
         return templates.TemplateResponse("checkout.html", {
             "request": request,
             "error": "Ihr Warenkorb ist leer."
         })
 
-    token = request.cookies.get("access_token")
-    if not token:
-        return RedirectResponse("/login", status_code=303)
-    
-    username = verify_token(token)
-    if not username:
-        return RedirectResponse("/login", status_code=303)
-    
-    user = db.query(User).filter_by(username=username).first()
+    # Token und Benutzer wurden bereits (gecacht) über get_current_user aufgelöst
     if not user:
         return RedirectResponse("/login", status_code=303)
 
@@ -144,47 +215,52 @@ def bestellen(request: Request, db: Session = Depends(get_db)):
 # Bestellung final abschließen (Benutzer oder Gast)
 # ----------------------------------------
 @router.post("/checkout")
-def checkout(request: Request, db: Session = Depends(get_db), user = Depends(get_current_user_optional)):
+async def checkout(
+    request: Request,
+    db: AsyncSession = Depends(get_async_write_db),
+    user: AuthenticatedUser = Depends(get_current_user)
+):
     """
     Speichert eine Bestellung in der Datenbank – für Benutzer oder Gäste.
+    Lesen (Katalog) und Schreiben laufen in einer Transaktion über den Writer.
     """
-    cart = request.session.get("cart", [])
+    cart_id = get_cart_id(request)
+    cart = await cart_items_async(cart_store, cart_id, await catalog_cache.get_async(db))
 
     if not cart:
         return RedirectResponse("/", status_code=303)
 
-    if isinstance(user, str):
-        user = db.query(User).filter_by(username=user).first()
-
-    produkt_mengen = {}
-    for p in cart:
-        key = p["name"]
-        produkt_mengen[key] = produkt_mengen.get(key, 0) + 1
-
-    produkte_string = ", ".join([f"{name} x {anzahl}" for name, anzahl in produkt_mengen.items()])
+    produkte_string = ", ".join([f"{item['name']} x {item['quantity']}" for item in cart])
     benutzer_id = user.id if user else None
 
     session_id = request.session.get("gast_id")
     if not session_id:
         session_id = str(uuid4())
         request.session["gast_id"] = session_id
+    customer = "user" if benutzer_id else "guest"
 
     try:
         if benutzer_id:
             bestellung = BenutzerBestellung(benutzer_id=benutzer_id, produkte=produkte_string)
-            print(f"✅ Bestellung gespeichert für: {user.username}")
         else:
             bestellung = GastBestellung(gast_id=session_id, produkte=produkte_string)
-            print("✅ Bestellung gespeichert (Gast)")
+
+        # Positionen mit dem tatsächlich berechneten Stückpreis (Rabatt für Benutzer)
+        for item in cart:
+            unit_price = round(item["price"] * 0.9, 2) if benutzer_id else item["price"]
+            bestellung.add_item(item["id"], item["quantity"], unit_price)
 
         db.add(bestellung)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print("❌ Fehler beim Speichern:", e)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        orders_total.inc("failed", customer)
+        # Warenkorb bleibt erhalten, damit die Bestellung nicht verloren geht
+        request.session["order_failed"] = True
+        return RedirectResponse("/", status_code=303)
 
-    request.session.pop("cart", None)
-    request.session["product_count"] = 0
+    orders_total.inc("committed", customer)
+    await cart_store.clear_async(cart_id)
     request.session["order_completed"] = True
 
     return RedirectResponse("/bestellung_erfolgreich", status_code=303)
@@ -193,7 +269,7 @@ def checkout(request: Request, db: Session = Depends(get_db), user = Depends(get
 # Erfolgsseite nach Bestellung
 # ----------------------------------------
 @router.get("/bestellung_erfolgreich")
-def bestellung_erfolgreich(request: Request):
+async def bestellung_erfolgreich(request: Request):
     """
     Zeigt eine Seite nach erfolgreicher Bestellung an.
     """
@@ -216,7 +292,7 @@ questions = [
 # Einzelne Quizfrage anzeigen
 # ----------------------------------------
 @router.get("/quiz", response_class=HTMLResponse)
-def quiz_get(request: Request, q: int = 0):
+async def quiz_get(request: Request, q: int = 0):
     """
     Zeigt die aktuelle Quizfrage (basierend auf Index q).
     """
@@ -253,20 +329,27 @@ async def quiz_post(request: Request, question_key: str = Form(...), answer: str
 # Ergebnis und Empfehlungen nach dem Quiz anzeigen
 # ----------------------------------------
 @router.get("/quiz/result", response_class=HTMLResponse)
-def quiz_result(request: Request):
+async def quiz_result(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
     """
-    Liest alle Antworten aus der Session und zeigt Produktempfehlungen.
+    Liest alle Antworten aus der Session und zeigt Produktempfehlungen
+    mit Preis und Warenkorb-Button (sofern das Produkt im Katalog ist).
     """
     session = request.session if hasattr(request, "session") else {}
     answers = {
         q[0]: session.get(q[0], "")
         for q in questions
     }
-    recommendations = recommend_products(answers)
+    catalog = await catalog_cache.get_async(db)
+    recommendations = product_index_for(catalog).resolve(recommend_products(answers))
     return templates.TemplateResponse("quiz_result.html", {
         "request": request,
         "recommendations": recommendations,
         "answers": answers,
+        "rabatt": current_user is not None,
         "back_to_homepage": True
     })
 
@@ -274,7 +357,7 @@ def quiz_result(request: Request):
 # Produktempfehlungen direkt via POST senden
 # ----------------------------------------
 @router.post("/recommendations", response_class=HTMLResponse)
-def get_recommendations(
+async def get_recommendations(
     request: Request,
     department: str = Form(...),
     remote_work: str = Form(...),
@@ -282,7 +365,9 @@ def get_recommendations(
     expense_handling: str = Form(...),
     document_handling: str = Form(...),
     security_concern: str = Form(...),
-    team_size: str = Form(...)
+    team_size: str = Form(...),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     """
     Liefert Produktempfehlungen direkt aus Formularantworten (ohne Quizflow).
@@ -296,9 +381,69 @@ def get_recommendations(
         "security_concern": security_concern,
         "team_size": team_size
     }
-    recommendations = recommend_products(answers)
+    catalog = await catalog_cache.get_async(db)
+    recommendations = product_index_for(catalog).resolve(recommend_products(answers))
     return templates.TemplateResponse("quiz_result.html", {
         "request": request,
         "recommendations": recommendations,
-        "answers": answers
+        "answers": answers,
+        "rabatt": current_user is not None
     })
+
+# ----------------------------------------
+# Dauer der Startphasen dieses Worker-Prozesses
+# ----------------------------------------
+@router.get("/health/startup")
+async def health_startup():
+    """
+    Liefert die Dauer der Startphasen (Import, Sperre, Schema, Seed, Aufwärmen) in Sekunden.
+    """
+    return JSONResponse(startup_timings.as_dict())
+
+# ----------------------------------------
+# Bereitschaft dieses Worker-Prozesses (Readiness-Probe)
+# ----------------------------------------
+@router.get("/health/ready")
+async def health_ready():
+    """
+    200, wenn dieser Worker aufgewärmt ist, sonst 503. Die Antwort nennt die
+    Prozess-ID – bei mehreren Workern zeigt sie, welcher Prozess geantwortet hat.
+    """
+    snapshot = catalog_cache.snapshot
+    body = {
+        "ready": is_ready(),
+        "pid": os.getpid(),
+        "catalog_version": catalog_cache.version,
+        "products": len(snapshot.products) if snapshot is not None else None,
+        "ready_at": startup_timings.ready_at,
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+# ----------------------------------------
+# Zustand der Datenbank-Verbindungspools
+# ----------------------------------------
+@router.get("/health/db")
+async def health_db():
+    """
+    Liefert Auslastung und Wartezeiten der Verbindungspools (pro Worker-Prozess).
+    Dient zur Dimensionierung von DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    """
+    stats = {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine.sync_engine),
+    }
+    if writer_engine is not engine:
+        stats["sync_writer"] = pool_stats(writer_engine)
+        stats["async_writer"] = pool_stats(async_writer_engine.sync_engine)
+    return JSONResponse(stats)
+
+# ----------------------------------------
+# Kennzahlen im Prometheus-Textformat
+# ----------------------------------------
+@router.get("/metrics")
+async def metrics():
+    """
+    Latenzen je Route, SQL-Abfragen, Fernet/bcrypt, Warenkorbgrößen und
+    Bestellungen dieses Worker-Prozesses (Prometheus summiert über die Instanzen).
+    """
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
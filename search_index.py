@@ -0,0 +1,70 @@
+import re
+import unicodedata
+from encryption import encryption as default_encryption
+
+# Kürzeste bzw. längste Präfixlänge, für die Such-Tokens erzeugt werden.
+# Kürzere Präfixe würden zu viel über die Verteilung der Anfangsbuchstaben verraten,
+# längere Präfixe bringen bei Produktnamen keinen Mehrwert.
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 20
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text):
+    """
+    Normalisiert einen Text für den Blind Index:
+    Unicode-NFKC, Groß-/Kleinschreibung ignorieren, Leerraum zusammenfassen.
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join(text.split())
+
+
+def words(text):
+    """
+    Zerlegt einen Text in normalisierte Wörter (Bindestriche, Klammern etc. trennen).
+    """
+    return _WORD_PATTERN.findall(normalize(text))
+
+
+def name_index(name, encryption=None):
+    """
+    Blind Index des vollständigen, normalisierten Produktnamens (für exakte Treffer).
+
+    :param encryption: Abweichende `Encryption`-Instanz (z. B. bei der Schlüsselrotation)
+    """
+    return (encryption or default_encryption).blind_index("n:" + normalize(name))
+
+
+def name_tokens(name, encryption=None):
+    """
+    Erzeugt alle Such-Tokens für einen Produktnamen:
+    je Wort ein HMAC-Token pro Präfix (MIN_PREFIX_LENGTH bis MAX_PREFIX_LENGTH Zeichen).
+
+    Beispiel: "Netzwerk-Sicherheit" → Tokens für "ne", "net", …, "si", "sic", …
+    """
+    encryption = encryption or default_encryption
+    tokens = set()
+    for word in words(name):
+        for length in range(MIN_PREFIX_LENGTH, min(len(word), MAX_PREFIX_LENGTH) + 1):
+            tokens.add(encryption.blind_index("w:" + word[:length]))
+    return tokens
+
+
+def query_tokens(search, encryption=None):
+    """
+    Übersetzt einen Suchbegriff in die Tokens, die ein Produkt alle besitzen muss.
+    Jedes Wort des Suchbegriffs wird als Wortanfang gesucht; Wörter, die kürzer als
+    MIN_PREFIX_LENGTH sind, werden ignoriert.
+
+    :return: Liste eindeutiger Tokens (leer, wenn kein Wort verwertbar ist)
+    """
+    encryption = encryption or default_encryption
+    tokens = []
+    for word in words(search):
+        if len(word) < MIN_PREFIX_LENGTH:
+            continue
+        token = encryption.blind_index("w:" + word[:MAX_PREFIX_LENGTH])
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
@@ -0,0 +1,253 @@
+import os
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import ExitStack, contextmanager
+from sqlalchemy import text, inspect, select
+from models import Base, Product
+
+try:
+    import fcntl
+except ImportError:  # Windows: kein flock – Start ohne prozessübergreifende Sperre
+    fcntl = None
+
+# ----------------------------------------
+# Start der Anwendung: Schema, Seed, Aufwärmen
+# ----------------------------------------
+# Nichts davon passiert mehr beim Import. Die Schritte laufen einmal im
+# Lifespan der App (bzw. per `python manage.py init-db`) und sind über eine
+# prozessübergreifende Sperre geschützt, damit mehrere Worker nicht
+# gleichzeitig Tabellen anlegen oder doppelt seeden.
+
+# Schlüssel für pg_advisory_lock (stabil aus dem Namen abgeleitet)
+ADVISORY_LOCK_KEY = zlib.crc32(b"saas-shop:init-db")
+
+
+class StartupTimings:
+    """
+    Dauer der einzelnen Startphasen (Sekunden) für diesen Prozess.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}
+        self.started_at = None
+        self.ready_at = None
+
+    @contextmanager
+    def phase(self, name):
+        """Misst die Dauer des Blocks als Phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = round(time.perf_counter() - start, 6)
+
+    def record(self, name, seconds):
+        """Trägt eine anderswo gemessene Phase ein (z. B. den Import der App)."""
+        with self._lock:
+            self.phases[name] = round(seconds, 6)
+
+    def as_dict(self):
+        """Momentaufnahme für den Health-Endpunkt."""
+        with self._lock:
+            return {
+                "phases": dict(self.phases),
+                "total_seconds": round(sum(self.phases.values()), 6),
+                "started_at": self.started_at,
+                "ready_at": self.ready_at,
+            }
+
+
+# Instanz für globale Nutzung im Projekt
+startup_timings = StartupTimings()
+
+
+def _lock_path(engine):
+    """Sperrdatei neben der SQLite-Datei, sonst im temporären Verzeichnis."""
+    configured = os.getenv("STARTUP_LOCK_PATH")
+    if configured:
+        return configured
+    database = engine.url.database if engine.url.get_backend_name() == "sqlite" else None
+    if database and database != ":memory:":
+        return f"{os.path.abspath(database)}.init.lock"
+    return os.path.join(tempfile.gettempdir(), "saas_shop.init.lock")
+
+
+@contextmanager
+def startup_lock(engine):
+    """
+    Prozessübergreifende Sperre für die Initialisierung.
+
+    - PostgreSQL: `pg_advisory_lock` (gilt auch über Rechnergrenzen hinweg)
+    - sonst: `flock` auf einer Sperrdatei (mehrere Worker auf einem Rechner)
+    """
+    if engine.url.get_backend_name() == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        return
+
+    if fcntl is None:
+        yield
+        return
+    with open(_lock_path(engine), "a+") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def seed_data_once(session_factory):
+    """
+    Füllt die Datenbank einmalig mit Beispiel-Produkten.
+    Wird nur ausgeführt, wenn noch keine Produkte existieren.
+
+    :return: Anzahl neu angelegter Produkte
+    """
+    db = session_factory()
+    try:
+        if db.query(Product.id).first() is not None:
+            return 0
+        demo = [
+            Product(name="CRM-System", description="Kundenverwaltung für Unternehmen", price=49.99),
+            Product(name="Cloud Storage", description="Sichere Cloud-Speicherung", price=19.99),
+            Product(name="Projektmanagement-Tool", description="Planung und Aufgabenverwaltung", price=29.99),
+            Product(name="Marketing Automation", description="Automatisierte Marketingprozesse", price=59.99),
+            Product(name="Helpdesk-Software", description="Support-Ticket-System", price=39.99),
+            Product(name="E-Mail Hosting", description="Professionelle E-Mail-Adressen", price=9.99),
+            Product(name="Analytics Dashboard", description="Echtzeit-Berichte und Analysen", price=24.99),
+            Product(name="Team Collaboration", description="Kommunikationstools für Teams", price=14.99),
+            Product(name="Website-Baukasten", description="Einfache Website-Erstellung", price=29.99),
+            Product(name="SEO-Optimierung", description="Suchmaschinen-Optimierung", price=49.99),
+            Product(name="Social Media Management", description="Soziale Medien-Verwaltung", price=39.99),
+            Product(name="Content Management System", description="Inhaltsverwaltungssystem", price=59.99),
+            Product(name="E-Commerce-Plattform", description="Online-Shop-System", price=99.99),
+            Product(name="Buchhaltungs-Software", description="Finanzverwaltung und Buchhaltung", price=69.99),
+            Product(name="Personalverwaltung", description="Mitarbeiterverwaltung und -planung", price=49.99),
+            Product(name="Reisekostenabrechnung", description="Automatisierte Reisekostenabrechnung", price=29.99),
+            Product(name="Zeiterfassung", description="Arbeitszeiterfassung und -verwaltung", price=19.99),
+            Product(name="Dokumentenmanagement", description="Dokumentenverwaltung und -speicherung", price=39.99),
+            Product(name="Datensicherung", description="Automatisierte Datensicherung", price=29.99),
+            Product(name="Netzwerk-Sicherheit", description="Netzwerk-Sicherheitslösungen", price=59.99),
+            Product(name="Firewall-Management", description="Firewall-Verwaltung und -sicherheit", price=49.99),
+            Product(name="Antivirus-Software", description="Viren- und Malware-Schutz", price=19.99),
+            Product(name="Backup-Software", description="Daten-Backup und -wiederherstellung", price=29.99),
+            Product(name="IT-Service-Management", description="IT-Service- und -support", price=69.99),
+            Product(name="Kundenbeziehungsmanagement", description="Kundenbeziehungs- und -verwaltung", price=49.99),
+            Product(name="Vertriebsmanagement", description="Vertriebs- und -planung", price=59.99),
+            Product(name="Marketing-Software", description="Marketing-Automatisierung und -analyse", price=99.99)
+        ]
+        db.add_all(demo)
+        db.commit()
+        return len(demo)
+    finally:
+        db.close()
+
+
+# Produkte pro Transaktion beim Nachtragen des Blind Index
+BACKFILL_BATCH_SIZE = 500
+
+
+def migrate_search_index(engine, session_factory, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Bringt Datenbanken aus der Zeit vor dem Blind Index auf den aktuellen Stand:
+    legt die Spalte `products.name_index` samt Index an, falls sie fehlt
+    (`create_all` ergänzt keine Spalten), und schreibt für alle Produkte ohne
+    `name_index` den Blind Index und die Such-Tokens aus dem entschlüsselten Namen.
+    Idempotent; arbeitet in Keyset-Blöcken mit je einer Transaktion.
+
+    :return: Anzahl nachgetragener Produkte
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("products")}
+    if "name_index" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE products ADD COLUMN name_index VARCHAR(32)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_name_index ON products (name_index)"))
+
+    products = Product.__table__
+    backfilled = last_id = 0
+    with session_factory() as db:
+        while True:
+            rows = db.execute(
+                select(products.c.id, products.c.name)
+                .where(products.c.name_index.is_(None), products.c.name.is_not(None), products.c.id > last_id)
+                .order_by(products.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return backfilled
+            backfilled += Product.rebuild_search_index(db, rows)
+            db.commit()
+            last_id = rows[-1].id
+
+
+def init_database(engine, session_factory, timings=startup_timings):
+    """
+    Legt fehlende Tabellen an, trägt den Blind Index für Altbestände nach und
+    seedet den Demo-Katalog – unter der Startsperre.
+    Idempotent: weitere Aufrufe (andere Worker, erneuter Start) finden alles vor.
+
+    :return: Anzahl neu angelegter Produkte
+    """
+    with ExitStack() as stack:
+        with timings.phase("lock_wait"):
+            stack.enter_context(startup_lock(engine))
+        with timings.phase("schema"):
+            Base.metadata.create_all(engine)
+        with timings.phase("migrate"):
+            migrate_search_index(engine, session_factory)
+        with timings.phase("seed"):
+            return seed_data_once(session_factory)
+
+
+def warm_up(session_factory, timings=startup_timings):
+    """
+    Wärmt die Caches dieses Prozesses vor dem ersten Request: Katalog-Snapshot,
+    kompilierte Templates, Regel-Engine und Kookkurrenz-Modell. Meldet außerdem
+    empfehlbare Produkte, die im Katalog fehlen.
+
+    Läuft in jedem Worker (nach dem Fork bzw. Spawn) – der Master-Prozess hat nur Schema und Seed erledigt.
+    """
+    from auth import templates
+    from catalog import catalog_cache
+    from recommendation.batch import batch_recommender
+    from recommendation.cobuy import cobuy_model
+    from recommendation.product_index import report_unknown_recommendations
+
+    with timings.phase("catalog"):
+        with session_factory() as db:
+            catalog = catalog_cache.get(db)
+    with timings.phase("assets"):
+        from assets import asset_manifest
+        asset_manifest.build()
+    with timings.phase("templates"):
+        for name in templates.env.list_templates(extensions=["html"]):
+            templates.env.get_template(name)
+    with timings.phase("recommendations"):
+        batch_recommender.recommend([{}])
+        cobuy_model.get()
+        report_unknown_recommendations(catalog)
+
+
+def is_ready(timings=startup_timings):
+    """True, sobald dieser Prozess seinen Start abgeschlossen hat."""
+    return timings.ready_at is not None
+
+
+def run_startup(engine, session_factory, init_db=True, timings=startup_timings):
+    """
+    Kompletter Start eines Prozesses: optional Datenbank-Initialisierung, dann Aufwärmen.
+    """
+    timings.started_at = time.time()
+    if init_db:
+        init_database(engine, session_factory, timings)
+    warm_up(session_factory, timings)
+    timings.ready_at = time.time()
+    return timings.as_dict()
@@ -0,0 +1,68 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_assets.py
+'''
+
+import gzip
+from fastapi.testclient import TestClient
+from assets import AssetManifest, accepted_encodings
+from main import app
+
+client = TestClient(app)
+
+# ✅ Test: Gehashte Namen ändern sich nur mit dem Inhalt
+def test_manifest_hashes_and_compresses(tmp_path):
+    """
+    Prüft Fingerabdruck im Dateinamen, gzip-Variante für Text und keine für Binärdateien.
+    """
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "app.css").write_text("body { color: red; }\n" * 50)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(200))
+    (tmp_path / ".hidden").write_text("x")
+
+    manifest = AssetManifest(str(tmp_path))
+    css = manifest.assets["css/app.css"]
+    assert manifest.url("css/app.css") == f"/static/css/app.{css.digest}.css"
+    assert gzip.decompress(css.variants["gzip"]) == css.variants["identity"]
+    assert set(manifest.assets["logo.png"].variants) == {"identity"}
+    assert ".hidden" not in manifest.assets
+    assert manifest.url("fehlt.js") == "/static/fehlt.js"
+
+    (tmp_path / "css" / "app.css").write_text("body { color: blue; }\n")
+    assert AssetManifest(str(tmp_path)).url("css/app.css") != manifest.url("css/app.css")
+
+# ✅ Test: Accept-Encoding inkl. q-Werten
+def test_accepted_encodings():
+    """
+    Prüft, dass Kodierungen mit q=0 ausgeschlossen werden.
+    """
+    assert accepted_encodings("gzip, br;q=0.8, deflate;q=0") == {"gzip", "br"}
+    assert accepted_encodings(None) == set()
+
+# ✅ Test: Auslieferung über die App
+def test_hashed_asset_is_immutable_and_precompressed():
+    """
+    Templates verlinken die gehashte URL; diese ist ein Jahr cachebar, gzip-kodiert und revalidierbar.
+    """
+    from assets import asset_url
+
+    url = asset_url("style.css")
+    assert url != "/static/style.css"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert ".product-list" in response.text
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.headers["etag"] != response.headers["etag"]
+
+    again = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+    # Ungehashte Adresse funktioniert weiter, aber ohne Langzeit-Cache
+    legacy = client.get("/static/style.css")
+    assert legacy.status_code == 200 and "immutable" not in legacy.headers.get("cache-control", "")
@@ -9,14 +9,17 @@ from starlette.testclient import TestClient
 from main import app
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from models import Base
-from db import get_db
+from db import get_db, get_async_db
 import os
 
 # 🔧 Temporäre SQLite-Datenbank für Tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth_temp.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_auth_temp.db")
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # 🧪 Setup & Teardown: Test-Datenbank automatisch vor/nach den Tests einrichten
 @pytest.fixture(scope="module", autouse=True)
@@ -26,6 +29,8 @@ def setup_database():
     und entfernt diese nach Testabschluss wieder.
     """
     Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield
     Base.metadata.drop_all(bind=engine)
     if os.path.exists("test_auth_temp.db"):
@@ -42,8 +47,14 @@ def override_get_db():
     finally:
         db.close()
 
-# 🔁 Override aktivieren
-app.dependency_overrides[get_db] = override_get_db
+async def override_get_async_db():
+    """
+    Überschreibt die asynchrone Dependency `get_async_db()` mit einer Test-Session.
+    """
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+# 🔁 Overrides werden in `setup_database` aktiviert (pro Testmodul, da andere Module eigene Datenbanken nutzen)
 client = TestClient(app)
 
 
@@ -123,3 +134,66 @@ def test_logout():
     response = client.get("/logout")
     assert response.status_code in (200, 302)
     assert "<title>" in response.text.lower()
+
+
+# ⚡ Test: Verifizierte Tokens werden gecacht und respektieren `exp`
+def test_token_cache_respects_expiry():
+    """
+    Prüft, ob ein gültiges Token nach der ersten Prüfung aus dem Cache kommt,
+    der Eintrag spätestens mit `exp` abläuft und abgelaufene Tokens abgelehnt werden.
+    """
+    from auth import create_access_token, decode_token, verify_token, token_cache
+
+    token = create_access_token({"sub": "cacheuser"}, expires_delta=60)
+    erster = decode_token(token)
+    assert erster.username == "cacheuser"
+    assert decode_token(token) is erster
+    assert verify_token(token) == "cacheuser"
+    assert token_cache._data[token][1] <= erster.expires_at
+
+    abgelaufen = create_access_token({"sub": "cacheuser"}, expires_delta=-10)
+    assert verify_token(abgelaufen) is None
+    assert token_cache.get(abgelaufen) is None
+
+
+# ✅ Test: Logout und Löschen des Benutzers entfernen gecachte Tokens
+def test_token_cache_invalidated_on_logout_and_user_deletion():
+    """
+    Nach dem Logout ist das Token nicht mehr im Cache; nach `session.delete(user)`
+    liefert `get_current_user` für ein zuvor gecachtes Token keinen Benutzer mehr.
+    """
+    import asyncio
+    from starlette.requests import Request
+    from auth import create_access_token, decode_token, get_current_user, token_cache
+    from models import User
+
+    def aktueller_benutzer(token):
+        scope = {"type": "http", "headers": [(b"cookie", f"access_token={token}".encode())]}
+
+        async def aufloesen():
+            async with TestingAsyncSessionLocal() as db:
+                return await get_current_user(Request(scope), db)
+        return asyncio.run(aufloesen())
+
+    client.post("/register", data={"username": "cacheloeschen", "password": "testpass"})
+    client.post("/login", data={"username": "cacheloeschen", "password": "testpass"})
+    token = client.cookies.get("access_token")
+    assert aktueller_benutzer(token).username == "cacheloeschen"
+    assert token_cache.get(token).user_id is not None
+
+    client.get("/logout")
+    assert token_cache.get(token) is None
+
+    zweites = create_access_token({"sub": "cacheloeschen"})
+    assert aktueller_benutzer(zweites) is not None
+    anderes = create_access_token({"sub": "cacheuser"})
+    decode_token(anderes)
+
+    db = TestingSessionLocal()
+    db.delete(db.query(User).filter_by(username="cacheloeschen").one())
+    db.commit()
+    db.close()
+
+    assert token_cache.get(zweites) is None
+    assert token_cache.get(anderes) is not None
+    assert aktueller_benutzer(zweites) is None
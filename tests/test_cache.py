@@ -0,0 +1,38 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_cache.py
+'''
+
+from cache import LRUCache
+
+# ✅ Test: Verdrängung des am längsten nicht genutzten Eintrags
+def test_lru_eviction():
+    """
+    Prüft, ob bei voller Kapazität der am längsten nicht genutzte Eintrag entfällt.
+    """
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" ist jetzt zuletzt genutzt
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+
+# ✅ Test: Ablaufzeit (TTL und expires_at)
+def test_ttl_and_expires_at():
+    """
+    Prüft, ob Einträge nach der TTL bzw. zum früheren `expires_at` ablaufen.
+    """
+    jetzt = [1000.0]
+    cache = LRUCache(maxsize=10, ttl=60, clock=lambda: jetzt[0])
+    cache.set("ttl", "x")
+    cache.set("exp", "y", expires_at=1010.0)
+
+    jetzt[0] = 1020.0
+    assert cache.get("ttl") == "x"
+    assert cache.get("exp") is None
+
+    jetzt[0] = 1061.0
+    assert cache.get("ttl") is None
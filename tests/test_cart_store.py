@@ -0,0 +1,112 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_cart_store.py
+'''
+
+import pytest
+from cart_store import InMemoryCartStore, SQLiteCartStore, cart_items, cart_items_async, create_cart_store
+from catalog import CatalogProduct
+
+# 🔁 Fixture: beide Backends mit identischem Verhalten testen
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """
+    Liefert nacheinander den In-Memory- und den SQLite-Warenkorb-Speicher.
+    """
+    if request.param == "sqlite":
+        return SQLiteCartStore(str(tmp_path / "carts.db"))
+    return InMemoryCartStore()
+
+# ✅ Test: Hinzufügen, Mengen zählen, Entfernen, Leeren
+def test_cart_operations(store):
+    """
+    Prüft, ob Mengen pro Produkt summiert werden und Entfernen/Leeren wirken.
+    """
+    store.add("korb-1", 3)
+    store.add("korb-1", 1)
+    store.add("korb-1", 3)
+    store.add("korb-2", 7)
+
+    assert store.get("korb-1") == {3: 2, 1: 1}
+    assert list(store.get("korb-1")) == [3, 1]  # Einfügereihenfolge
+    store.remove("korb-1", 3)
+    assert store.get("korb-1") == {1: 1}
+    store.clear("korb-1")
+    assert store.get("korb-1") == {}
+    assert store.get("korb-2") == {7: 1}
+    assert store.get("unbekannt") == {}
+
+# ✅ Test: Auflösung der Positionen über den Katalog
+def test_cart_items_resolves_catalog():
+    """
+    Prüft, ob Positionen mit Name und Preis aus dem Katalog angereichert
+    und nicht mehr vorhandene Produkte ausgelassen werden.
+    """
+    store = InMemoryCartStore()
+    store.add("korb", 1, quantity=2)
+    store.add("korb", 99)
+    catalog = {1: CatalogProduct(id=1, name="CRM-System", description="", price=49.99)}
+
+    assert cart_items(store, "korb", catalog) == [
+        {"id": 1, "name": "CRM-System", "price": 49.99, "quantity": 2}
+    ]
+    assert cart_items(store, None, catalog) == []
+
+# ✅ Test: Mehrere Worker dürfen keinen prozesslokalen Warenkorb nutzen
+def test_multiple_workers_use_shared_store(monkeypatch, tmp_path):
+    """
+    Ohne CART_STORE wählt ein Worker memory, mehrere Worker den geteilten SQLite-Speicher;
+    CART_STORE=memory mit mehreren Workern bricht `manage.py serve` vor dem Start ab.
+    """
+    import manage
+
+    monkeypatch.delenv("CART_STORE", raising=False)
+    monkeypatch.setenv("CART_STORE_PATH", str(tmp_path / "carts.db"))
+    assert isinstance(create_cart_store(workers=1), InMemoryCartStore)
+    assert isinstance(create_cart_store(workers=4), SQLiteCartStore)
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert isinstance(create_cart_store(), SQLiteCartStore)
+
+    monkeypatch.setenv("CART_STORE", "memory")
+    with pytest.raises(ValueError):
+        create_cart_store()
+    with pytest.raises(SystemExit, match="CART_STORE=memory"):
+        manage.main(["serve", "--workers", "2", "--skip-init"])
+
+# ✅ Test: Async-Varianten – SQLite im Threadpool, In-Memory direkt im Event-Loop
+def test_async_operations_do_not_block_event_loop(store):
+    """
+    Prüft, dass die `*_async`-Methoden dieselben Ergebnisse liefern und der
+    SQLite-Speicher dabei nicht im Thread des Event-Loops arbeitet.
+    """
+    import asyncio
+    import threading
+
+    threads = []
+    original_get = store.get
+
+    def get_mit_thread(cart_id):
+        threads.append(threading.get_ident())
+        return original_get(cart_id)
+
+    store.get = get_mit_thread
+    katalog = {3: CatalogProduct(id=3, name="CRM-System", description="", price=49.99)}
+
+    async def ablauf():
+        await store.add_async("korb-a", 3)
+        await store.add_async("korb-a", 3)
+        await store.add_async("korb-a", 9)
+        await store.remove_async("korb-a", 9)
+        items = await cart_items_async(store, "korb-a", katalog)
+        await store.clear_async("korb-a")
+        return threading.get_ident(), items, await store.get_async("korb-a")
+
+    loop_thread, items, leer = asyncio.run(ablauf())
+    assert items == [{"id": 3, "name": "CRM-System", "price": 49.99, "quantity": 2}]
+    assert leer == {}
+    if isinstance(store, SQLiteCartStore):
+        assert threads and loop_thread not in threads
+    else:
+        assert set(threads) == {loop_thread}
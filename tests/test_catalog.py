@@ -0,0 +1,172 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_catalog.py
+'''
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Product
+from catalog import CatalogCache, catalog_cache
+
+# 🛠 In-Memory SQLite-Datenbank für Testzwecke
+TEST_ENGINE = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestSessionLocal = sessionmaker(bind=TEST_ENGINE, autocommit=False, autoflush=False)
+
+@pytest.fixture(scope="function")
+def db():
+    """
+    Erstellt und entfernt die Tabellen für jeden Testlauf.
+    """
+    Base.metadata.create_all(bind=TEST_ENGINE)
+    db = TestSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=TEST_ENGINE)
+
+# ✅ Test: Snapshot enthält entschlüsselte, unveränderliche Produkte
+def test_snapshot_is_decrypted_and_cached(db):
+    """
+    Prüft, ob der Snapshot Klartext enthält und ohne Änderung wiederverwendet wird.
+    """
+    db.add(Product(name="CRM-System", description="Kundenverwaltung", price=49.99))
+    db.commit()
+
+    cache = CatalogCache()
+    snapshot = cache.get(db)
+    assert [p.name for p in snapshot.products] == ["CRM-System"]
+    assert snapshot.get(snapshot.products[0].id).description == "Kundenverwaltung"
+    assert cache.get(db) is snapshot
+
+    with pytest.raises(Exception):
+        snapshot.products[0].price = 0
+
+# ✅ Test: Insert, Update und Delete invalidieren den globalen Katalog nach dem Commit
+def test_write_events_invalidate_after_commit(db):
+    """
+    Prüft, ob Schreibzugriffe auf Product die Version erst beim Commit erhöhen
+    und ein Rollback den Katalog unverändert lässt.
+    """
+    product = Product(name="Cloud Storage", description="Speicher", price=19.99)
+    db.add(product)
+    db.commit()
+    version = catalog_cache.version
+    snapshot = catalog_cache.get(db)
+    assert snapshot.version == version
+
+    product.price = 24.99
+    db.flush()
+    assert catalog_cache.version == version
+    db.commit()
+    assert catalog_cache.version == version + 1
+    assert catalog_cache.get(db).get(product.id).price == 24.99
+
+    product.price = 1.0
+    db.flush()
+    db.rollback()
+    assert catalog_cache.version == version + 1
+
+    db.delete(product)
+    db.commit()
+    assert catalog_cache.version == version + 2
+    assert catalog_cache.get(db).products == ()
+
+# ✅ Test: Empfohlene Namen über Katalog und Aliase auflösen
+def test_product_name_index_resolves_aliases(db, caplog):
+    """
+    Prüft, ob Empfehlungen (auch über Aliase) auf Katalogprodukte zeigen,
+    unbekannte Namen gemeldet (Log-Warnung) werden und der Index je Katalogversion neu entsteht.
+    """
+    import logging
+    from recommendation.product_index import product_index_for, report_unknown_recommendations
+
+    db.add(Product(name="CRM-System", description="Kundenverwaltung", price=49.99))
+    db.add(Product(name="Cloud Storage", description="Speicher", price=19.99))
+    db.commit()
+
+    cache = CatalogCache()
+    index = product_index_for(cache.get(db))
+    resolved = index.resolve(["crm-system", "Cloud-Speicher", "VPN-Lösung"])
+    assert [r.product.name if r.product else None for r in resolved] == ["CRM-System", "Cloud Storage", None]
+    assert index.unknown(["VPN-Lösung", "CRM-System"]) == ["VPN-Lösung"]
+    assert product_index_for(cache.get(db)) is index
+
+    with caplog.at_level(logging.WARNING, logger="recommendation.product_index"):
+        unknown = report_unknown_recommendations(cache.get(db))
+    assert "VPN-Lösung" in unknown
+    assert f"{len(unknown)} Empfehlungen ohne Katalogprodukt" in caplog.text
+
+    cache.invalidate()
+    assert product_index_for(cache.get(db)) is not index
+
+# ✅ Test: Keyset-Paginierung über den Snapshot (ID und Preis)
+def test_snapshot_keyset_pagination(db):
+    """
+    Prüft Vor- und Zurückblättern per Cursor, Preis-Sortierung und ungültige Cursor.
+    """
+    for i, price in enumerate([30, 10, 20, 10, 50]):
+        db.add(Product(name=f"Produkt {i}", description="", price=price))
+    db.commit()
+    snapshot = CatalogCache().get(db)
+
+    erste = snapshot.page("id", limit=2)
+    assert [p.name for p in erste.items] == ["Produkt 0", "Produkt 1"]
+    assert erste.prev_cursor is None
+    zweite = snapshot.page("id", erste.next_cursor, limit=2)
+    assert [p.name for p in zweite.items] == ["Produkt 2", "Produkt 3"]
+    assert snapshot.page("id", zweite.prev_cursor, limit=2).items == erste.items
+
+    preise = snapshot.page("price", limit=3)
+    assert [p.price for p in preise.items] == [10, 10, 20]
+    rest = snapshot.page("price", preise.next_cursor, limit=3)
+    assert [p.price for p in rest.items] == [30, 50] and rest.next_cursor is None
+
+    with pytest.raises(ValueError):
+        snapshot.page("price", erste.next_cursor)
+    with pytest.raises(ValueError):
+        snapshot.page("id", "kaputt")
+
+# ✅ Test: Änderungen eines anderen Prozesses werden über catalog_state erkannt
+def test_shared_version_invalidates_other_workers(db):
+    """
+    Zwei Caches stehen für zwei Worker-Prozesse: Eine Änderung, die nur einer
+    lokal mitbekommt, sieht der andere nach dem nächsten Versionsabgleich.
+    """
+    db.add(Product(name="Alt", description="", price=1.0))
+    db.commit()
+
+    now = [0.0]
+    worker = CatalogCache(check_interval=1.0, clock=lambda: now[0])
+    assert [p.name for p in worker.get(db).products] == ["Alt"]
+
+    db.add(Product(name="Neu", description="", price=2.0))
+    db.commit()
+    assert [p.name for p in worker.get(db).products] == ["Alt"]  # Prüfintervall läuft noch
+
+    now[0] += 1.0
+    assert [p.name for p in worker.get(db).products] == ["Alt", "Neu"]
+
+# ✅ Test: ETag hängt nur vom Inhalt ab, nicht vom Versionszähler des Prozesses
+def test_etag_is_identical_across_workers(db):
+    """
+    Zwei Caches (wie zwei Worker) mit unterschiedlichen lokalen Versionen liefern
+    für denselben Katalog denselben ETag; eine Änderung ergibt einen neuen.
+    """
+    from http_cache import catalog_etag
+
+    db.add(Product(name="CRM-System", description="Kundenverwaltung", price=49.99))
+    db.commit()
+
+    worker_a, worker_b = CatalogCache(), CatalogCache()
+    worker_b.invalidate()
+    worker_b.invalidate()
+    snapshot_a, snapshot_b = worker_a.get(db), worker_b.get(db)
+    assert snapshot_a.version != snapshot_b.version
+    assert catalog_etag(snapshot_a, "html", "", "id") == catalog_etag(snapshot_b, "html", "", "id")
+    assert catalog_etag(snapshot_a, "html", "", "id") != catalog_etag(snapshot_a, "html", "", "price")
+
+    db.query(Product).first().price = 39.99
+    db.commit()
+    worker_a.invalidate()
+    assert catalog_etag(worker_a.get(db), "html", "", "id") != catalog_etag(snapshot_b, "html", "", "id")
@@ -0,0 +1,70 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_cobuy.py
+'''
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, Product
+from orders import bulk_create_bestellungen
+from catalog import CatalogCache
+from recommendation.cobuy import train_cobuy, CobuyModel, related_products
+
+# 🛠 In-Memory SQLite-Datenbank für Testzwecke
+TEST_ENGINE = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestSessionLocal = sessionmaker(bind=TEST_ENGINE, autocommit=False, autoflush=False)
+
+@pytest.fixture(scope="function")
+def db():
+    """
+    Erstellt und entfernt die Tabellen für jeden Testlauf.
+    """
+    Base.metadata.create_all(bind=TEST_ENGINE)
+    db = TestSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=TEST_ENGINE)
+
+
+def bestellung(*product_ids):
+    return {"gast_id": "g", "produkte": "x", "items": [{"product_id": p, "quantity": 1, "unit_price": 1.0} for p in product_ids]}
+
+# ✅ Test: Training schreibt ein mmap-fähiges Modell mit sinnvollen Nachbarn
+def test_train_and_query_cobuy_model(db, tmp_path):
+    """
+    Prüft, ob häufig gemeinsam gekaufte Produkte oben stehen, das Modell per
+    Memory-Map geladen wird und Warenkorb-Abfragen Warenkorbprodukte ausschließen.
+    """
+    orders = [bestellung(1, 2), bestellung(1, 2), bestellung(1, 2, 3), bestellung(3, 4), bestellung(5)]
+    list(bulk_create_bestellungen(db, orders))
+
+    manifest = train_cobuy(db, str(tmp_path), top_k=3)
+    assert manifest["orders"] == 5 and manifest["products"] == 5
+
+    model = CobuyModel.load(str(tmp_path))
+    assert isinstance(model.neighbors, np.memmap)
+    assert [p for p, _ in model.related(1)] == [2, 3]
+    assert model.related(5) == [] and model.related(99) == []
+    assert [p for p, _ in model.for_cart([1, 2], k=5)] == [3]
+
+    # Neues Training ersetzt alte Dateien
+    train_cobuy(db, str(tmp_path), top_k=3)
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+
+# ✅ Test: Kaltstart ohne Modell fällt auf die Regel-Engine zurück
+def test_related_products_cold_start(db):
+    """
+    Prüft, ob ohne trainiertes Modell die Standardempfehlungen (als Katalogprodukte) kommen.
+    """
+    db.add(Product(name="CRM-System", description="Kundenverwaltung", price=49.99))
+    db.add(Product(name="Team Collaboration", description="Teams", price=14.99))
+    db.commit()
+    catalog = CatalogCache().get(db)
+    crm = next(p for p in catalog.products if p.name == "CRM-System")
+
+    leeres_modell = CobuyModel(np.empty(0, dtype=np.int64), np.empty((0, 3), dtype=np.int64), np.empty((0, 3)))
+    result = related_products(catalog, [crm.id], k=3, model=leeres_modell)
+    assert [p.name for p in result] == ["Team Collaboration"]
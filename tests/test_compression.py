@@ -0,0 +1,99 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_compression.py
+'''
+
+import zlib
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from compression import CompressionMiddleware
+
+# 🧪 Minimal-App mit großen, kleinen, binären und gestreamten Antworten
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500, level=6)
+SEITE = "<li class='product-item'>CRM-System – 49.99 €</li>\n" * 200
+
+
+@app.get("/gross", response_class=HTMLResponse)
+def gross():
+    return HTMLResponse(SEITE, headers={"ETag": '"v1"'})
+
+
+@app.get("/klein", response_class=HTMLResponse)
+def klein():
+    return "<p>kurz</p>"
+
+
+@app.get("/bild")
+def bild():
+    return Response(b"\x00" * 5000, media_type="image/png")
+
+
+@app.get("/stream")
+def stream():
+    def zeilen():
+        for i in range(50):
+            yield f'{{"id": {i}, "name": "Produkt {i}"}}\n' * 20
+    return StreamingResponse(zeilen(), media_type="application/x-ndjson")
+
+
+client = TestClient(app)
+
+# ✅ Test: Große HTML-Seite wird komprimiert, ETag wird schwach
+def test_large_html_is_gzipped():
+    """
+    Prüft Content-Encoding, Vary, schwachen ETag und deutlich kleinere Übertragung.
+    """
+    response = client.get("/gross", headers={"Accept-Encoding": "gzip"})
+    assert response.text == SEITE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(SEITE.encode()) / 10
+
+# ✅ Test: Schwellwert, Inhaltstyp und fehlendes Accept-Encoding
+def test_skipped_responses():
+    """
+    Kleine Antworten, Binärdaten und Clients ohne gzip bleiben unverändert.
+    """
+    klein = client.get("/klein", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in klein.headers and klein.headers["vary"] == "Accept-Encoding"
+    bild = client.get("/bild", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in bild.headers and "vary" not in bild.headers
+    ohne = client.get("/gross", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in ohne.headers and ohne.headers["vary"] == "Accept-Encoding"
+
+# ✅ Test: Streaming-Antwort wird blockweise komprimiert
+def test_streaming_response_is_compressed_incrementally():
+    """
+    Ruft die Middleware direkt per ASGI auf: Jeder Block kommt einzeln und sofort
+    dekomprimierbar an (kein Puffern des ganzen Bodys).
+    """
+    import asyncio
+
+    gesendet = []
+    anfragen = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if anfragen:
+            return anfragen.pop()
+        await asyncio.Event().wait()  # Client bleibt verbunden
+
+    async def send(message):
+        gesendet.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream", "query_string": b"",
+             "headers": [(b"accept-encoding", b"gzip")], "root_path": "", "scheme": "http",
+             "server": ("test", 80), "http_version": "1.1"}
+    asyncio.run(app(scope, receive, send))
+
+    start = gesendet[0]
+    assert (b"content-encoding", b"gzip") in start["headers"]
+    assert not any(name == b"content-length" for name, _ in start["headers"])
+
+    decoder = zlib.decompressobj(31)
+    bloecke = [decoder.decompress(m["body"]) for m in gesendet[1:]]
+    assert len(bloecke) > 1 and all(bloecke[:-1])
+    assert b"".join(bloecke).count(b"\n") == 50 * 20
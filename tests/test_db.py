@@ -9,6 +9,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from models import Base, User, Product, BenutzerBestellung, GastBestellung
 from db import create_bestellung as original_create_bestellung
+from db import DatabaseSettings, create_configured_engine, pool_stats, make_sessionmaker
 
 # 🛠 In-Memory SQLite-Datenbank für Testzwecke
 TEST_ENGINE = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
@@ -115,3 +116,190 @@ def test_create_bestellung_db_rollback(db):
 
     bestellung = db.query(BenutzerBestellung).first()
     assert bestellung is None
+
+# ✅ Test: Produktsuche über den Blind Index (ohne Klartext in der Datenbank)
+def test_product_search_blind_index(db):
+    """
+    Prüft, ob die Suche über die HMAC-Tokens Wortanfänge findet,
+    unabhängig von Groß-/Kleinschreibung, und keine falschen Treffer liefert.
+    """
+    db.add_all([
+        Product(name="Netzwerk-Sicherheit", description="Test", price=59.99),
+        Product(name="Cloud Storage", description="Test", price=19.99),
+    ])
+    db.commit()
+
+    def suche(begriff):
+        return [p.decrypt_name() for p in db.query(Product).filter(Product.matches_search(begriff)).all()]
+
+    assert suche("sicher") == ["Netzwerk-Sicherheit"]
+    assert suche("CLOUD sto") == ["Cloud Storage"]
+    assert suche("cloud sicher") == []
+    assert suche("x") == []
+
+# ✅ Test: Engine-Konfiguration aus Umgebungsvariablen (PostgreSQL als Ziel)
+def test_database_settings_from_env(monkeypatch):
+    """
+    Prüft, ob URL und Pool-Parameter aus der Umgebung gelesen werden
+    und für PostgreSQL automatisch asyncpg als async-Treiber gewählt wird.
+    """
+    monkeypatch.setenv("DATABASE_URL", "postgres://shop:pw@db:5432/shop")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+
+    settings = DatabaseSettings.from_env()
+    assert settings.pool_size == 20
+    assert settings.pool_pre_ping is False
+    assert settings.sync_url.drivername == "postgresql"
+    assert settings.resolved_async_url.drivername == "postgresql+asyncpg"
+
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///shop.db")
+    assert DatabaseSettings.from_env().resolved_async_url.drivername == "sqlite+aiosqlite"
+
+# ✅ Test: Pool-Auslastung und Wartezeiten werden gemessen
+def test_pool_stats(tmp_path):
+    """
+    Prüft, ob die konfigurierte Engine Auslastung und Checkout-Wartezeiten meldet.
+    """
+    settings = DatabaseSettings(url=f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=0)
+    test_engine = create_configured_engine(settings)
+
+    with test_engine.connect():
+        stats = pool_stats(test_engine)
+        assert stats["checked_out"] == 1
+        assert stats["utilisation"] == 0.5
+
+    stats = pool_stats(test_engine)
+    assert stats["checked_out"] == 0
+    assert stats["wait_count"] == 1
+    assert stats["timeouts"] == 0
+    test_engine.dispose()
+
+# ✅ Test: SQLite-Produktionsprofil setzt Pragmas und serialisiert Schreibzugriffe
+def test_sqlite_production_profile(tmp_path):
+    """
+    Prüft WAL-Modus und Pragmas auf jeder Verbindung sowie das Routing:
+    Lesen über den Reader-Pool, Schreiben über die einzelne Writer-Verbindung –
+    auch bei vielen parallelen Schreibern ohne "database is locked".
+    """
+    import threading
+    from sqlalchemy import text
+
+    settings = DatabaseSettings(url=f"sqlite:///{tmp_path / 'wal.db'}", sqlite_profile="production",
+                                sqlite_busy_timeout_ms=1234)
+    assert settings.sqlite_production
+    reader = create_configured_engine(settings)
+    writer = create_configured_engine(settings, writer=True)
+    Base.metadata.create_all(bind=writer)
+
+    with reader.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+
+    Sessions = make_sessionmaker(reader, writer)
+    with Sessions() as session:
+        assert session.get_bind() is reader
+        session.add(GastBestellung(gast_id="routing", produkte="A x 1"))
+        session.flush()
+        assert session.get_bind() is writer  # eigene Änderungen bleiben lesbar
+        session.commit()
+        assert session.get_bind() is reader
+
+    fehler = []
+
+    def bestellen(i):
+        try:
+            with Sessions() as session:
+                session.add(GastBestellung(gast_id=f"gast-{i}", produkte="A x 1"))
+                session.commit()
+        except Exception as e:  # pragma: no cover - nur im Fehlerfall
+            fehler.append(e)
+
+    threads = [threading.Thread(target=bestellen, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert fehler == []
+    with Sessions() as session:
+        assert session.query(GastBestellung).count() == 17
+    reader.dispose()
+    writer.dispose()
+
+# ✅ Test: Sync- und async-Writer teilen sich eine Sperre (ein Writer pro Prozess)
+def test_sync_and_async_writers_share_one_gate(tmp_path):
+    """
+    Solange der synchrone Writer eine Verbindung hält, bekommt der asynchrone
+    keine (Timeout); nach der Rückgabe schreibt er normal.
+    """
+    import asyncio
+    from sqlalchemy import text, exc
+    from db import WriterGate, create_configured_async_engine
+
+    settings = DatabaseSettings(url=f"sqlite:///{tmp_path / 'gate.db'}", sqlite_profile="production",
+                                pool_timeout=0.2)
+    gate = WriterGate()
+    writer = create_configured_engine(settings, writer=True, gate=gate)
+    async_writer = create_configured_async_engine(settings, writer=True, gate=gate)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE zaehler (quelle TEXT)"))
+
+    async def async_schreiben():
+        async with async_writer.begin() as conn:
+            await conn.execute(text("INSERT INTO zaehler (quelle) VALUES ('async')"))
+
+    with writer.connect():
+        assert gate.locked()
+        with pytest.raises(exc.TimeoutError):
+            asyncio.run(async_schreiben())
+    assert not gate.locked()
+
+    asyncio.run(async_schreiben())
+    assert not gate.locked()
+    with writer.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM zaehler")).scalar() == 1
+    asyncio.run(async_writer.dispose())
+    writer.dispose()
+
+# ✅ Test: Read-then-Write läuft mit use_writer komplett über den async-Writer
+def test_async_routing_session_use_writer(tmp_path):
+    """
+    Ohne Markierung liest die AsyncSession über den Reader und wechselt erst beim
+    Schreiben; mit `use_writer` läuft schon die erste Abfrage über den Writer.
+    Nach dem ersten Lesen über den Reader ist `use_writer` nicht mehr erlaubt.
+    """
+    import asyncio
+    from sqlalchemy import select
+    from db import WriterGate, create_configured_async_engine, make_async_sessionmaker, use_writer
+
+    settings = DatabaseSettings(url=f"sqlite:///{tmp_path / 'routing.db'}", sqlite_profile="production")
+    writer_sync = create_configured_engine(settings, writer=True, gate=WriterGate())
+    Base.metadata.create_all(bind=writer_sync)
+    writer_sync.dispose()
+    reader = create_configured_async_engine(settings)
+    writer = create_configured_async_engine(settings, writer=True, gate=WriterGate())
+    Sessions = make_async_sessionmaker(reader, writer)
+
+    async def ablauf():
+        async with Sessions() as session:
+            assert session.sync_session.get_bind() is reader.sync_engine
+            await session.execute(select(GastBestellung))
+            with pytest.raises(RuntimeError):
+                use_writer(session)
+            await session.rollback()
+
+            use_writer(session)
+            assert session.sync_session.get_bind() is writer.sync_engine
+            anzahl = len((await session.execute(select(GastBestellung))).scalars().all())
+            session.add(GastBestellung(gast_id="async", produkte=f"A x {anzahl + 1}"))
+            await session.commit()
+            assert session.sync_session.get_bind() is reader.sync_engine  # nur für eine Transaktion
+
+            return (await session.execute(select(GastBestellung.gast_id))).scalars().all()
+
+    assert asyncio.run(ablauf()) == ["async"]
+    asyncio.run(reader.dispose())
+    asyncio.run(writer.dispose())
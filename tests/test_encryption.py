@@ -48,3 +48,20 @@ def test_encrypt_returns_different_ciphertexts_for_same_input():
     assert enc1 != enc2
     assert enc.decrypt(enc1) == input_text
     assert enc.decrypt(enc2) == input_text
+
+# ✅ Test: Massen-API liefert Ergebnisse in Eingabereihenfolge (seriell und parallel)
+@pytest.mark.parametrize("workers", [1, 4])
+def test_encrypt_many_decrypt_many(workers):
+    """
+    Testet, ob encrypt_many/decrypt_many dieselben Ergebnisse wie die Einzelaufrufe
+    liefern – auch oberhalb der Parallelisierungsschwelle mit mehreren Threads.
+    """
+    enc = Encryption()
+    enc.workers = workers
+    werte = [f"Bestellung {i} 🧾" for i in range(600)]
+
+    tokens = enc.encrypt_many(werte)
+    assert len(tokens) == len(werte)
+    assert [enc.decrypt(t) for t in tokens[:3]] == werte[:3]
+    assert enc.decrypt_many(tokens) == werte
+    assert enc.decrypt_many([]) == []
@@ -0,0 +1,131 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_key_rotation.py
+'''
+
+import os
+import pytest
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from encryption import Encryption
+from key_rotation import KeyRotationJob
+from models import Base, Product, GastBestellung
+
+# 🛠 In-Memory SQLite-Datenbank für Testzwecke
+TEST_ENGINE = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestSessionLocal = sessionmaker(bind=TEST_ENGINE, autocommit=False, autoflush=False)
+
+@pytest.fixture(scope="function")
+def db():
+    """
+    Erstellt und entfernt die Tabellen für jeden Testlauf.
+    """
+    Base.metadata.create_all(bind=TEST_ENGINE)
+    db = TestSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=TEST_ENGINE)
+
+# ✅ Test: Mehrere Schlüssel – alter Ciphertext bleibt lesbar
+def test_multiple_keys_decrypt_old_tokens():
+    """
+    Testet, ob mit ENCRYPTION_KEYS (neu, alt) alte Tokens entschlüsselt und neue
+    mit dem neuen Schlüssel erzeugt werden.
+    """
+    alt = Encryption()
+    neu_key = Fernet.generate_key().decode()
+    rotiert = Encryption(keys=[neu_key, os.environ["ENCRYPTION_KEY"]], blind_index_key="fester-index-key")
+
+    token = alt.encrypt("Altbestand")
+    assert rotiert.decrypt(token) == "Altbestand"
+    assert Encryption(keys=[neu_key]).decrypt(rotiert.encrypt("neu")) == "neu"
+    assert rotiert.key_id != alt.key_id
+    assert rotiert.blind_index("crm") == Encryption(keys=[neu_key], blind_index_key="fester-index-key").blind_index("crm")
+
+# ✅ Test: Mehrere Schlüssel ohne festen BLIND_INDEX_KEY werden abgelehnt
+def test_multiple_keys_require_blind_index_key(monkeypatch):
+    """
+    Ohne BLIND_INDEX_KEY hinge der Blind Index an einem Fernet-Schlüssel und änderte
+    sich beim Entfernen des alten Schlüssels unbemerkt.
+    """
+    monkeypatch.delenv("BLIND_INDEX_KEY", raising=False)
+    with pytest.raises(ValueError, match="BLIND_INDEX_KEY"):
+        Encryption(keys=[Fernet.generate_key().decode(), os.environ["ENCRYPTION_KEY"]])
+    monkeypatch.setenv("BLIND_INDEX_KEY", "aus-der-umgebung")
+    assert Encryption(keys=[Fernet.generate_key().decode(), os.environ["ENCRYPTION_KEY"]]).blind_index_key == b"aus-der-umgebung"
+
+# ✅ Test: Rotation in Blöcken, unterbrochen und fortgesetzt
+def test_key_rotation_resumes_from_checkpoint(db):
+    """
+    Testet, ob die Rotation nach einem Abbruch am Checkpoint fortsetzt und danach
+    alle Daten nur noch mit dem neuen Schlüssel lesbar sind.
+    """
+    for i in range(5):
+        db.add(Product(name=f"Produkt {i}", description=f"Beschreibung {i}", price=i))
+    db.add(GastBestellung(gast_id="g1", produkte="Produkt 1 x 2"))
+    db.commit()
+
+    neu_key = Fernet.generate_key().decode()
+    rotiert = Encryption(keys=[neu_key, os.environ["ENCRYPTION_KEY"]], blind_index_key="fester-index-key")
+    nur_neu = Encryption(keys=[neu_key], blind_index_key="fester-index-key")
+
+    # Erster Lauf: nach dem ersten Block anhalten
+    job = KeyRotationJob(TestSessionLocal, batch_size=2, encryption=rotiert)
+    job._throttle = lambda started, rows_done: job._stop.set()
+    assert job.run() is False
+    assert job.status()["tables"]["products"] == {"rows_done": 2, "last_id": 2, "finished": False}
+
+    # Zweiter Lauf: setzt bei ID 3 fort und rotiert beide Tabellen vollständig
+    job = KeyRotationJob(TestSessionLocal, batch_size=2, encryption=rotiert, rows_per_second=10_000)
+    assert job.run() is True
+    status = job.status()["tables"]
+    assert status["products"]["rows_done"] == 5 and status["products"]["finished"]
+    assert status["bestellungen"]["finished"]
+
+    db.expire_all()
+    namen = [nur_neu.decrypt(p.name) for p in db.query(Product).order_by(Product.id)]
+    assert namen == [f"Produkt {i}" for i in range(5)]
+    assert nur_neu.decrypt(db.query(GastBestellung).one().produkte) == "Produkt 1 x 2"
+    with pytest.raises(InvalidToken):
+        Encryption().decrypt(db.query(Product).first().name)
+
+# ✅ Test: Suche funktioniert nach Rotation und Entfernen des alten Schlüssels
+def test_search_tokens_survive_removal_of_old_key(db):
+    """
+    Produkte wurden mit dem alten Schlüssel (abgeleiteter Blind Index) angelegt.
+    Die Rotation baut Such-Tokens und name_index mit dem festen BLIND_INDEX_KEY neu,
+    sodass die Suche ohne den alten Schlüssel weiter trifft.
+    """
+    import search_index
+    from models import ProductSearchToken
+
+    db.add(Product(name="Netzwerk-Sicherheit", description="Firewall", price=1))
+    db.add(Product(name="CRM-System", description="Kunden", price=2))
+    db.commit()
+
+    neu_key = Fernet.generate_key().decode()
+    rotiert = Encryption(keys=[neu_key, os.environ["ENCRYPTION_KEY"]], blind_index_key="fester-index-key")
+    assert KeyRotationJob(TestSessionLocal, encryption=rotiert).run() is True
+
+    # Alter Schlüssel entfernt: nur noch neuer Fernet-Schlüssel + fester Blind-Index-Schlüssel
+    nur_neu = Encryption(keys=[neu_key], blind_index_key="fester-index-key")
+    db.expire_all()
+    treffer = (
+        db.query(ProductSearchToken.product_id)
+        .filter(ProductSearchToken.token.in_(search_index.query_tokens("netz sich", nur_neu)))
+        .group_by(ProductSearchToken.product_id)
+        .all()
+    )
+    netzwerk = db.query(Product).filter_by(price=1).one()
+    assert [product_id for product_id, in treffer] == [netzwerk.id]
+    assert netzwerk.name_index == search_index.name_index("netzwerk-sicherheit", nur_neu)
+    assert nur_neu.decrypt(netzwerk.name) == "Netzwerk-Sicherheit"
+
+    # Nur der Blind-Index-Schlüssel ändert sich → Rotation läuft erneut und baut die Tokens um
+    anderer_index = Encryption(keys=[neu_key], blind_index_key="noch-ein-index-key")
+    assert KeyRotationJob(TestSessionLocal, encryption=anderer_index).status()["tables"]["products"]["finished"] is False
+    assert KeyRotationJob(TestSessionLocal, encryption=anderer_index).run() is True
+    db.expire_all()
+    assert db.query(Product).filter_by(price=1).one().name_index == search_index.name_index("Netzwerk-Sicherheit", anderer_index)
@@ -15,6 +15,7 @@ Ausführung:
 import pytest
 from models import Product, User, BestellungBase, BenutzerBestellung, GastBestellung
 from encryption import encryption
+import search_index
 
 # 🧪 Test: Produkt-Modell mit Verschlüsselung/Entschlüsselung
 def test_product():
@@ -26,6 +27,19 @@ def test_product():
     assert product.decrypt_name() == "Testprodukt"
     assert product.decrypt_description() == "Dies ist ein Testprodukt"
 
+# 🧪 Test: Blind Index enthält keine Klartext-Präfixe
+def test_product_search_tokens():
+    """
+    Prüft, ob für jedes Namenspräfix ein HMAC-Token erzeugt wird
+    und kein Klartext in den Tokens auftaucht.
+    """
+    product = Product("Testprodukt", "Beschreibung", 1.0)
+    tokens = {t.token for t in product.search_tokens}
+    assert len(tokens) == len("testprodukt") - 1
+    assert all("test" not in t for t in tokens)
+    assert set(search_index.query_tokens("TESTpro")) <= tokens
+    assert product.name_index == search_index.name_index(" testprodukt ")
+
 # 🧪 Test: Benutzer-Modell mit Passwortprüfung
 def test_user():
     """
@@ -0,0 +1,117 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_orders.py
+'''
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from datetime import datetime
+from models import Base, BestellungBase, BenutzerBestellung, GastBestellung, OrderItem
+import json
+from orders import bulk_create_bestellungen, sales_by_product, export_orders
+
+# 🛠 In-Memory SQLite-Datenbank für Testzwecke
+TEST_ENGINE = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+TestSessionLocal = sessionmaker(bind=TEST_ENGINE, autocommit=False, autoflush=False)
+
+@pytest.fixture(scope="function")
+def db():
+    """
+    Erstellt und entfernt die Tabellen für jeden Testlauf.
+    """
+    Base.metadata.create_all(bind=TEST_ENGINE)
+    db = TestSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=TEST_ENGINE)
+
+# ✅ Test: Massenimport mit gemischten, teils ungültigen Einträgen
+def test_bulk_create_bestellungen(db):
+    """
+    Prüft, ob gültige Bestellungen blockweise gespeichert, verschlüsselt und
+    mit ID gemeldet werden, während ungültige Einträge einzeln als Fehler erscheinen.
+    """
+    orders = [
+        {"benutzer_id": 1, "produkte": "CRM-System x 1"},
+        {"gast_id": "partner-7", "produkte": "Cloud Storage x 2", "timestamp": "2025-01-31T12:00:00"},
+        {"produkte": "ohne Kunde"},
+        {"gast_id": "partner-8", "produkte": ""},
+        {"gast_id": "partner-9", "produkte": "Zeiterfassung x 1"},
+    ]
+
+    results = list(bulk_create_bestellungen(db, iter(orders), chunk_size=2))
+
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [r.status for r in results] == ["created", "created", "error", "error", "created"]
+    assert results[2].error and results[3].error
+
+    gespeichert = {b.id: b for b in db.query(BestellungBase).all()}
+    assert len(gespeichert) == 3
+    assert isinstance(gespeichert[results[0].id], BenutzerBestellung)
+    gast = gespeichert[results[1].id]
+    assert isinstance(gast, GastBestellung)
+    assert gast.gast_id == "partner-7"
+    assert gast.decrypt_produkte() == "Cloud Storage x 2"
+    assert gast.timestamp.year == 2025
+    assert gast.produkte != "Cloud Storage x 2"
+
+
+# ✅ Test: Bestellpositionen und Verkaufsauswertung per SQL
+def test_sales_by_product(db):
+    """
+    Prüft, ob importierte Positionen in `order_items` landen und Menge, Umsatz
+    und Bestellanzahl je Produkt (auch mit Zeitfilter) aggregiert werden.
+    """
+    orders = [
+        {"gast_id": "a", "produkte": "A x 2, B x 1", "timestamp": "2025-01-10T10:00:00",
+         "items": [{"product_id": 1, "quantity": 2, "unit_price": 10.0}, {"product_id": 2, "quantity": 1, "unit_price": 5.0}]},
+        {"benutzer_id": 3, "produkte": "A x 1", "timestamp": "2025-02-10T10:00:00",
+         "items": [{"product_id": 1, "quantity": 1, "unit_price": 9.0}]},
+        {"gast_id": "b", "produkte": "A x 1", "items": [{"product_id": 1, "quantity": 0, "unit_price": 1.0}]},
+    ]
+
+    results = list(bulk_create_bestellungen(db, orders))
+    assert [r.status for r in results] == ["created", "created", "error"]
+    assert db.query(OrderItem).count() == 3
+    assert db.get(BestellungBase, results[0].id).items[0].created_at.month == 1
+
+    assert sales_by_product(db) == [
+        {"product_id": 1, "quantity": 3, "revenue": 29.0, "orders": 2},
+        {"product_id": 2, "quantity": 1, "revenue": 5.0, "orders": 1},
+    ]
+    assert sales_by_product(db, since=datetime(2025, 2, 1)) == [
+        {"product_id": 1, "quantity": 1, "revenue": 9.0, "orders": 1},
+    ]
+
+
+# ✅ Test: Streaming-Export in kleinen Blöcken mit Filtern
+def test_export_orders(db):
+    """
+    Prüft, ob der Export blockweise entschlüsselt, nach Typ und Zeitraum filtert
+    und gültiges CSV bzw. JSONL liefert.
+    """
+    orders = [
+        {"gast_id": f"g{i}", "produkte": f"Produkt {i} x 1", "timestamp": f"2025-01-{i + 1:02d}T08:00:00"}
+        for i in range(5)
+    ] + [{"benutzer_id": 7, "produkte": "CRM-System x 1", "timestamp": "2025-01-03T09:00:00"}]
+    list(bulk_create_bestellungen(db, orders))
+    # Altbestand ohne Produkte (Spalte ist nullable) darf den Export nicht abbrechen
+    g1 = db.query(GastBestellung).filter_by(gast_id="g1").one()
+    db.execute(BestellungBase.__table__.update().where(BestellungBase.id == g1.id).values(produkte=None))
+    db.commit()
+
+    teile = list(export_orders(TestSessionLocal, "jsonl", typ="gast", batch_size=2))
+    assert len(teile) == 3  # 5 Gastbestellungen in Blöcken zu je 2
+    zeilen = [json.loads(z) for z in "".join(teile).splitlines()]
+    assert [z["gast_id"] for z in zeilen] == ["g0", "g1", "g2", "g3", "g4"]
+    assert [z["produkte"] for z in zeilen[:3]] == ["Produkt 0 x 1", None, "Produkt 2 x 1"]
+
+    csv_null = "".join(export_orders(TestSessionLocal, "csv", typ="gast")).splitlines()
+    assert csv_null[2].endswith(",g1,")
+
+    csv_text = "".join(export_orders(TestSessionLocal, "csv", since=datetime(2025, 1, 3), until=datetime(2025, 1, 4)))
+    kopf, *rest = csv_text.strip().splitlines()
+    assert kopf == "id,typ,timestamp,benutzer_id,gast_id,produkte"
+    assert sorted(zeile.split(",")[1] for zeile in rest) == ["benutzer", "gast"]
@@ -0,0 +1,40 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_password_hashing.py
+'''
+
+import asyncio
+import pytest
+from password_hashing import PasswordHasher, verify_password
+
+# ✅ Test: Hashing und Verifikation im Prozesspool
+@pytest.mark.parametrize("workers", [0, 1])
+def test_hash_and_verify_async(workers):
+    """
+    Prüft, ob Hash und Verifikation über den Pool (bzw. Threadpool bei 0 Workern)
+    korrekt funktionieren und die Metriken mitgezählt werden.
+    """
+    hasher = PasswordHasher(workers=workers, max_concurrency=2)
+
+    async def ablauf():
+        hashed = await hasher.hash("geheim123")
+        ergebnisse = await asyncio.gather(
+            hasher.verify("geheim123", hashed),
+            hasher.verify("falsch", hashed),
+            hasher.verify("geheim123", hashed),
+        )
+        return hashed, ergebnisse
+
+    try:
+        hashed, ergebnisse = asyncio.run(ablauf())
+    finally:
+        hasher.shutdown()
+
+    assert verify_password("geheim123", hashed)
+    assert ergebnisse == [True, False, True]
+    stats = hasher.stats()
+    assert stats["hash_calls"] == 1
+    assert stats["verify_calls"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["queue_seconds_max"] >= 0.0
@@ -8,9 +8,11 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-from models import Base, Product
+from models import Base, Product, OrderItem
 from main import app, get_db
+from db import get_async_db, get_session_factory
 
 # 📂 Testdatenbank: eigene SQLite-Datei (lokal persistent)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_routes.db"
@@ -18,6 +20,8 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread
 
 # 🧪 Eigene Session-Klasse für Tests
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_routes.db")
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # 🚫 Dependency override für get_db → verwendet Testdatenbank
 def override_get_db():
@@ -27,8 +31,9 @@ def override_get_db():
     finally:
         db.close()
 
-# 🧩 Dependency überschreiben
-app.dependency_overrides[get_db] = override_get_db
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
 
 # 🧪 TestClient für FastAPI-App
 client = TestClient(app)
@@ -40,6 +45,10 @@ def setup_database():
     Diese Fixture wird automatisch vor jedem Test ausgeführt.
     Sie erstellt die Tabellen neu und fügt ein Testprodukt ein.
     """
+    # 🧩 Dependencies überschreiben → Testdatenbank
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
@@ -56,6 +65,7 @@ def test_index():
     response = client.get("/")
     assert response.status_code == 200
     assert "SaaS Produkt-Shop" in response.text
+    assert 'href="/static/style.' in response.text and "/static/style.css" not in response.text
 
 
 def test_add_to_cart():
@@ -104,3 +114,248 @@ def test_bestellen_unauthorized(monkeypatch):
     response = client.post("/checkout", follow_redirects=True)
     assert response.status_code == 200
     assert "Bestellung Erfolgreich" in response.text
+
+
+def test_checkout_writes_order_items():
+    """
+    Testet, ob der Checkout neben der verschlüsselten Übersicht die
+    Bestellpositionen mit Menge und Stückpreis speichert.
+    """
+    gast = TestClient(app)
+    db = TestingSessionLocal()
+    product = db.query(Product).first()
+    db.close()
+
+    gast.post("/add_to_cart", data={"product_id": product.id})
+    gast.post("/add_to_cart", data={"product_id": product.id})
+    gast.post("/checkout")
+
+    db = TestingSessionLocal()
+    items = db.query(OrderItem).all()
+    db.close()
+    assert [(i.product_id, i.quantity, i.unit_price) for i in items] == [(product.id, 2, 10.0)]
+
+
+def test_cart_cookie_stays_constant_size():
+    """
+    Testet, ob das Session-Cookie nur die Warenkorb-ID enthält und
+    bei weiteren Produkten nicht wächst.
+    """
+    db = TestingSessionLocal()
+    product = db.query(Product).first()
+    db.close()
+
+    client.post("/add_to_cart", data={"product_id": product.id})
+    groesse = len(client.cookies.get("session"))
+    for _ in range(20):
+        client.post("/add_to_cart", data={"product_id": product.id})
+    assert len(client.cookies.get("session")) == groesse
+
+    response = client.get("/")
+    assert "× 21" in response.text
+
+
+def test_bulk_orders_api(monkeypatch):
+    """
+    Testet den Bestellimport als NDJSON-Stream: ohne API-Schlüssel 403,
+    mit Schlüssel Ergebnis pro Eintrag.
+    """
+    payload = '{"gast_id": "p1", "produkte": "A x 1"}\n{"produkte": "kaputt"}\n'
+    headers = {"content-type": "application/x-ndjson"}
+
+    monkeypatch.delenv("ADMIN_API_KEY", raising=False)
+    assert client.post("/api/orders/bulk", content=payload, headers=headers).status_code == 403
+
+    monkeypatch.setenv("ADMIN_API_KEY", "test-key")
+    response = client.post("/api/orders/bulk", content=payload, headers={**headers, "X-API-Key": "test-key"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 1 and body["failed"] == 1
+    assert body["results"][0]["status"] == "created"
+    assert body["results"][1]["index"] == 1
+
+
+def test_export_orders_api(monkeypatch):
+    """
+    Testet den Streaming-Export: importierte Bestellung erscheint entschlüsselt im CSV.
+    """
+    monkeypatch.setenv("ADMIN_API_KEY", "test-key")
+    headers = {"X-API-Key": "test-key"}
+    client.post("/api/orders/bulk", json=[{"gast_id": "p1", "produkte": "A x 1"}], headers=headers)
+
+    response = client.get("/api/orders/export?format=csv&typ=gast", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "p1,A x 1" in response.text
+
+
+def test_recommendations_batch_api(monkeypatch):
+    """
+    Testet die Batch-Empfehlungen: Ergebnis pro Antwort, ungültiger Body → 400.
+    """
+    monkeypatch.setenv("ADMIN_API_KEY", "test-key")
+    headers = {"X-API-Key": "test-key"}
+
+    response = client.post("/api/recommendations/batch", json={"answers": [{}, {"department": "IT"}]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["recommendations"] == [
+        ["CRM-System", "Projektmanagement", "Team Collaboration"],
+        ["Netzwerk-Sicherheit", "VPN-Lösung", "Zugriffsmanagement"],
+    ]
+    assert client.post("/api/recommendations/batch", json={"answers": "x"}, headers=headers).status_code == 400
+
+
+def test_recommendations_link_catalog_products():
+    """
+    Testet, ob Empfehlungen mit Katalogprodukt Preis und Warenkorb-Button zeigen.
+    """
+    db = TestingSessionLocal()
+    db.add(Product(name="Netzwerk-Sicherheit", description="Schutz", price=59.99))
+    db.commit()
+    db.close()
+
+    response = client.post("/recommendations", data={
+        "department": "IT", "remote_work": "no", "needs_training": "no", "expense_handling": "no",
+        "document_handling": "no", "security_concern": "no", "team_size": "small",
+    })
+    assert response.status_code == 200
+    assert "59.99 €" in response.text
+    assert 'name="product_id"' in response.text
+    assert "VPN-Lösung <em>(derzeit nicht im Sortiment)</em>" in response.text
+
+
+def test_products_api_keyset_pagination():
+    """
+    Testet die JSON-Produktliste: Cursor blättern weiter, mit Suche per SQL-Keyset.
+    """
+    db = TestingSessionLocal()
+    for i in range(4):
+        db.add(Product(name=f"Cloud Paket {i}", description="", price=5.0 + i))
+    db.commit()
+    db.close()
+
+    erste = client.get("/api/products?limit=3").json()
+    assert len(erste["items"]) == 3 and erste["prev_cursor"] is None
+    zweite = client.get(f"/api/products?limit=3&cursor={erste['next_cursor']}").json()
+    assert len(zweite["items"]) == 2 and zweite["next_cursor"] is None
+
+    treffer = client.get("/api/products?search=cloud&sort=price&limit=3").json()
+    assert [p["price"] for p in treffer["items"]] == [5.0, 6.0, 7.0]
+    weiter = client.get(f"/api/products?search=cloud&sort=price&limit=3&cursor={treffer['next_cursor']}").json()
+    assert [p["name"] for p in weiter["items"]] == ["Cloud Paket 3"]
+    zurueck = client.get(f"/api/products?search=cloud&sort=price&limit=3&cursor={weiter['prev_cursor']}").json()
+    assert zurueck["items"] == treffer["items"]
+
+    assert client.get("/api/products?cursor=kaputt").status_code == 400
+    assert "Weiter" in client.get("/?limit=2").text
+
+
+def test_products_api_etag_conditional_get():
+    """
+    Testet ETag und 304 der JSON-Produktliste; eine Katalogänderung erzeugt einen neuen ETag.
+    """
+    antwort = client.get("/api/products")
+    etag = antwort.headers["etag"]
+    assert "max-age=" in antwort.headers["cache-control"]
+    assert "stale-while-revalidate=" in antwort.headers["cache-control"]
+
+    nicht_geaendert = client.get("/api/products", headers={"If-None-Match": etag})
+    assert nicht_geaendert.status_code == 304 and nicht_geaendert.content == b""
+    assert client.get("/api/products?sort=price", headers={"If-None-Match": etag}).status_code == 200
+
+    db = TestingSessionLocal()
+    db.add(Product(name="Neu", description="", price=1.0))
+    db.commit()
+    db.close()
+    neu = client.get("/api/products", headers={"If-None-Match": etag})
+    assert neu.status_code == 200 and neu.headers["etag"] != etag
+
+
+def test_index_cache_headers_depend_on_cart():
+    """
+    Anonym mit leerem Warenkorb ist die Startseite revalidierbar, mit Warenkorb `no-store`.
+    """
+    client.cookies.clear()
+    anonym = client.get("/")
+    assert anonym.headers["cache-control"] == "private, no-cache"
+    assert client.get("/", headers={"If-None-Match": anonym.headers["etag"]}).status_code == 304
+
+    db = TestingSessionLocal()
+    product = db.query(Product).first()
+    db.close()
+    client.post("/add_to_cart", data={"product_id": product.id})
+    mit_warenkorb = client.get("/")
+    assert "no-store" in mit_warenkorb.headers["cache-control"] and "etag" not in mit_warenkorb.headers
+
+
+def test_index_product_list_fragment_cache():
+    """
+    Testet den Fragment-Cache der Produktliste: zweiter Aufruf ist ein Treffer,
+    eine Katalogänderung erscheint trotzdem sofort.
+    """
+    from fragment_cache import product_list_cache
+
+    client.cookies.clear()
+    client.get("/")
+    treffer = product_list_cache.stats()["hits"]
+    assert "Test Produkt" in client.get("/").text
+    assert product_list_cache.stats()["hits"] == treffer + 1
+
+    db = TestingSessionLocal()
+    db.add(Product(name="Frisch im Katalog", description="", price=3.0))
+    db.commit()
+    db.close()
+    assert "Frisch im Katalog" in client.get("/").text
+
+
+def test_metrics_endpoint_exposes_all_families():
+    """
+    Testet `/metrics`: nach Bestellung, Abfrage, Fernet- und bcrypt-Aufruf
+    enthält die Prometheus-Ausgabe jede Kennzahlen-Familie mit Werten.
+    """
+    import asyncio
+    from sqlalchemy import text
+    from db import engine as app_engine
+    from encryption import encryption
+    from metrics import registry
+    from password_hashing import PasswordHasher
+
+    orders = registry.get("shop_orders_total")
+    bestellt = orders.value("committed", "guest")
+    gast = TestClient(app)
+    db = TestingSessionLocal()
+    product = db.query(Product).first()
+    db.close()
+    gast.post("/add_to_cart", data={"product_id": product.id})
+    gast.post("/add_to_cart", data={"product_id": product.id})
+    gast.post("/checkout")
+    assert orders.value("committed", "guest") == bestellt + 1
+
+    with app_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    encryption.decrypt_many(encryption.encrypt_many(["a", "b"]))
+    hasher = PasswordHasher(workers=0, max_concurrency=1)
+    asyncio.run(hasher.verify("geheim", asyncio.run(hasher.hash("geheim"))))
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    for family, typ in [
+        ("shop_http_request_duration_seconds", "histogram"),
+        ("shop_http_requests_in_flight", "gauge"),
+        ("shop_db_query_duration_seconds", "histogram"),
+        ("shop_encryption_duration_seconds", "histogram"),
+        ("shop_encryption_values_total", "counter"),
+        ("shop_password_hash_duration_seconds", "histogram"),
+        ("shop_password_hash_pool", "gauge"),
+        ("shop_cart_size_items", "histogram"),
+        ("shop_orders_total", "counter"),
+    ]:
+        assert f"# TYPE {family} {typ}" in body
+    assert 'shop_http_request_duration_seconds_count{method="POST",route="/checkout",status="303"}' in body
+    assert 'shop_http_requests_in_flight{method="GET",route="/metrics"} 1' in body
+    assert 'shop_db_query_duration_seconds_count{engine="sync",statement="select"}' in body
+    assert 'shop_encryption_values_total{operation="encrypt_many"}' in body
+    assert 'shop_password_hash_duration_seconds_count{operation="verify"}' in body
+    assert 'shop_cart_size_items_bucket{le="2"}' in body and 'shop_orders_total{result="committed",customer="guest"}' in body
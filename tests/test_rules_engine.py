@@ -4,8 +4,51 @@ export PYTHONPATH=$PYTHONPATH:../
 pytest tests/test_rules_engine.py
 '''
 
+import itertools
 import pytest
-from recommendation.rules_engine import recommend_products
+from recommendation.rules_engine import recommend_products, RULES
+from recommendation.decision_table import DecisionTable, load_or_compile
+from recommendation.batch import recommend_products_batch
+
+
+def legacy_recommend_products(answers):
+    """
+    Ursprüngliche if/elif-Implementierung – Referenz für die kompilierte Tabelle.
+    """
+    department = answers.get("department", "").lower()
+    recommended = set()
+    if "hr" in department:
+        recommended.update(["Personalverwaltung", "Lohnabrechnung", "Onboarding-Tool"])
+    elif "it" in department:
+        recommended.update(["Netzwerk-Sicherheit", "VPN-Lösung", "Zugriffsmanagement"])
+    elif "sales" in department:
+        recommended.update(["CRM-System", "Marketing Automation", "Kundensupport-Plattform"])
+    elif "finance" in department:
+        recommended.update(["Finanzbuchhaltung", "Spesenmanagement", "Reisekostenabrechnung"])
+    elif "project" in department or "pm" in department:
+        recommended.update(["Projektmanagement", "Cloud-Speicher", "Aufgabenverwaltung"])
+    elif "admin" in department:
+        recommended.update(["DMS (Dokumentenmanagementsystem)", "Inventarverwaltung", "Digitale Signatur"])
+    if answers.get("remote_work", "").lower() == "yes":
+        recommended.update(["Mobiles Arbeiten", "Video-Konferenzsystem", "Team Collaboration"])
+    if answers.get("needs_training", "").lower() == "yes":
+        recommended.add("E-Learning-Plattform")
+    if answers.get("expense_handling", "").lower() == "yes":
+        recommended.update(["Reisekostenabrechnung", "Spesenmanagement"])
+    if answers.get("document_handling", "").lower() == "yes":
+        recommended.update(["DMS (Dokumentenmanagementsystem)", "Digitale Signatur"])
+    if answers.get("security_concern", "").lower() == "yes":
+        recommended.update(["Netzwerk-Sicherheit", "E-Mail-Archivierung", "Zugriffsmanagement"])
+    if answers.get("team_size", "").lower() == "large":
+        recommended.update(["Zeiterfassung", "Helpdesk-System", "Enterprise Search"])
+    if not recommended:
+        recommended.update(["Projektmanagement", "Team Collaboration", "CRM-System"])
+    return sorted(list(recommended))[:3]
+
+DEPARTMENTS = ["", "HR", "IT", "Sales", "Finance", "Project Office", "PM", "Admin",
+               "Digital Marketing", "Finance & HR", "Logistik"]
+YES_NO = ["yes", "no", "YES", ""]
+FLAG_FIELDS = ["remote_work", "needs_training", "expense_handling", "document_handling", "security_concern"]
 
 def test_recommendation_hr_remote_expense_large_team():
     """
@@ -84,3 +127,46 @@ def test_training_and_documents():
     assert len(result) == 3
     assert result == sorted(result)
     assert "E-Learning-Plattform" in result or "Digitale Signatur" in result
+
+
+def test_decision_table_matches_legacy_engine():
+    """
+    Testfall: Alle Kombinationen aus Beispiel-Abteilungen und Merkmalen
+    Erwartung: Kompilierte Tabelle liefert exakt das Ergebnis der if/elif-Kette
+    """
+    for department, team_size in itertools.product(DEPARTMENTS, ["small", "large", "LARGE", ""]):
+        for flags in itertools.product(YES_NO, repeat=len(FLAG_FIELDS)):
+            answers = {"department": department, "team_size": team_size, **dict(zip(FLAG_FIELDS, flags))}
+            assert recommend_products(answers) == legacy_recommend_products(answers), answers
+
+
+def test_decision_table_serialization(tmp_path):
+    """
+    Testfall: Tabelle als JSON speichern und laden
+    Erwartung: Gleiches Ergebnis; geänderte Regeln erzwingen Neukompilierung
+    """
+    path = str(tmp_path / "rules.json")
+    table = load_or_compile(RULES, path)
+    geladen = load_or_compile(RULES, path)
+    assert geladen.table == table.table and geladen.fingerprint == table.fingerprint
+    assert DecisionTable.from_json(table.to_json()).lookup({"department": "IT"}) == table.lookup({"department": "IT"})
+
+    geaendert = {**RULES, "fallback": ["Nur Fallback"]}
+    assert load_or_compile(geaendert, path).lookup({}) == ("Nur Fallback",)
+
+
+def test_batch_matches_scalar_engine():
+    """
+    Testfall: Alle bisherigen Testantworten plus alle Kombinationen als ein Batch
+    Erwartung: Vektorisierte Auswertung liefert exakt die Ergebnisse der skalaren Engine
+    """
+    answers_list = [{}, {"department": "HR", "remote_work": "yes", "expense_handling": "yes", "team_size": "large"},
+                    {"department": "IT", "security_concern": "yes", "team_size": "small"},
+                    {"department": "Finance", "needs_training": "yes", "document_handling": "yes"}]
+    for department, team_size in itertools.product(DEPARTMENTS, ["small", "large"]):
+        for flags in itertools.product(["yes", "no"], repeat=len(FLAG_FIELDS)):
+            answers_list.append({"department": department, "team_size": team_size, **dict(zip(FLAG_FIELDS, flags))})
+
+    assert recommend_products_batch(answers_list) == [recommend_products(a) for a in answers_list]
+    assert recommend_products_batch([]) == []
+    assert len(recommend_products_batch([{"department": "HR", "remote_work": "yes"}], top_k=5)[0]) == 5
@@ -0,0 +1,109 @@
+'''
+Ausführung:
+    export PYTHONPATH=$PYTHONPATH:../
+    pytest tests/test_startup.py
+'''
+
+import threading
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from models import Product
+from startup import StartupTimings, init_database, run_startup, is_ready
+
+
+def _engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'start.db'}", connect_args={"check_same_thread": False})
+    return engine, sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+# ✅ Test: Schema + Seed einmalig, zweiter Aufruf ändert nichts
+def test_init_database_is_idempotent(tmp_path):
+    """
+    Prüft, ob Tabellen angelegt, der Katalog einmal geseedet und jede Phase gemessen wird.
+    """
+    engine, Session = _engine(tmp_path)
+    timings = StartupTimings()
+
+    assert init_database(engine, Session, timings) == 27
+    assert "products" in inspect(engine).get_table_names()
+    assert set(timings.phases) == {"lock_wait", "schema", "migrate", "seed"}
+    assert (tmp_path / "start.db.init.lock").exists()
+
+    assert init_database(engine, Session, StartupTimings()) == 0
+    with Session() as db:
+        assert db.query(Product).count() == 27
+
+# ✅ Test: Datenbank mit altem Schema (ohne Blind Index) wird migriert und nachindiziert
+def test_init_database_backfills_search_index_on_old_schema(tmp_path):
+    """
+    Legt `products` wie vor Einführung des Blind Index an (ohne `name_index`, ohne Tokens).
+    Der Start ergänzt die Spalte, schreibt name_index und Such-Tokens – danach findet die Suche die Produkte.
+    """
+    from sqlalchemy import text
+    from encryption import encryption
+    from models import ProductSearchToken
+    import search_index
+
+    engine, Session = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR UNIQUE, description VARCHAR, price FLOAT)"
+        ))
+        for i, name in enumerate(["CRM-System", "Netzwerk-Sicherheit", "Cloud Storage"], start=1):
+            conn.execute(text("INSERT INTO products (id, name, description, price) VALUES (:id, :name, :d, :p)"),
+                         {"id": i, "name": encryption.encrypt(name), "d": encryption.encrypt("alt"), "p": 9.99})
+
+    assert init_database(engine, Session, StartupTimings()) == 0  # Altbestand → kein Demo-Seed
+    assert "name_index" in {c["name"] for c in inspect(engine).get_columns("products")}
+    assert "ix_products_name_index" in {i["name"] for i in inspect(engine).get_indexes("products")}
+
+    with Session() as db:
+        netzwerk = db.get(Product, 2)
+        assert netzwerk.name_index == search_index.name_index("Netzwerk-Sicherheit")
+        assert db.query(ProductSearchToken).filter_by(product_id=2).count() == len(search_index.name_tokens("Netzwerk-Sicherheit"))
+        assert [p.id for p in db.query(Product).filter(Product.matches_search("netz sich"))] == [2]
+        assert [p.id for p in db.query(Product).filter(Product.matches_search("cloud"))] == [3]
+
+    # Zweiter Start: nichts mehr nachzutragen
+    from startup import migrate_search_index
+    assert migrate_search_index(engine, Session) == 0
+
+# ✅ Test: Parallele Starts seeden nicht doppelt
+def test_concurrent_init_seeds_once(tmp_path):
+    """
+    Startet mehrere Initialisierungen gleichzeitig (wie mehrere Worker) – die Sperre serialisiert sie.
+    """
+    engine, Session = _engine(tmp_path)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(init_database(engine, Session, StartupTimings())))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [0, 0, 0, 27]
+    with Session() as db:
+        assert db.query(Product).count() == 27
+
+# ✅ Test: Worker-Start ohne Initialisierung wärmt Caches und meldet Bereitschaft
+def test_run_startup_warms_worker(tmp_path):
+    """
+    Simuliert Master (init_database) und Worker (run_startup mit init_db=False).
+    """
+    from catalog import catalog_cache
+
+    engine, Session = _engine(tmp_path)
+    init_database(engine, Session, StartupTimings())
+
+    timings = StartupTimings()
+    assert not is_ready(timings)
+    try:
+        result = run_startup(engine, Session, init_db=False, timings=timings)
+        assert is_ready(timings)
+        assert {"catalog", "templates", "recommendations"} <= set(result["phases"])
+        assert "schema" not in result["phases"]
+        assert len(catalog_cache.snapshot.products) == 27
+    finally:
+        catalog_cache.invalidate()